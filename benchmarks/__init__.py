@@ -0,0 +1,15 @@
+"""
+Standalone benchmark scripts, run from the repository root with e.g. ``python -m benchmarks.bench_download``.
+
+These use the test settings and are not part of the test suite.
+"""
+import os
+
+
+def setup_django():
+    """
+    Configure Django with the test settings so the benchmarks can import the app.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_settings")
+    import django  # pylint: disable=import-outside-toplevel
+    django.setup()
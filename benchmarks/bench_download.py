@@ -0,0 +1,107 @@
+"""
+Benchmark reading a tracking log through ``transform_tracking_logs`` with libcloud's LOCAL driver.
+
+Compares the sequential stream with concurrent byte-range downloads, and the line splitter with the
+previous per-character loop. Note that the LOCAL driver reads the whole file on every range request,
+so it measures correctness and splitting overhead rather than network parallelism.
+
+Usage: python -m benchmarks.bench_download [size_mb]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from libcloud.storage.drivers.local import LocalStorageDriver  # noqa: E402
+
+from event_routing_backends.management.commands import transform_tracking_logs as command  # noqa: E402
+
+FIXTURE = os.path.join(
+    os.path.dirname(command.__file__), "tests", "fixtures", "tracking.log"
+)
+
+
+class CountingSender:
+    """
+    Sender stand-in that only counts lines.
+    """
+
+    def __init__(self):
+        """
+        Start counting from zero.
+        """
+        self.lines = 0
+
+    def transform_and_queue(self, line):  # pylint: disable=unused-argument
+        """
+        Count the line.
+        """
+        self.lines += 1
+
+    def finalize(self):
+        """
+        Nothing to flush.
+        """
+
+
+def per_character_lines(chunks):
+    """
+    Split lines the way the command did before the incremental decoder, for comparison.
+    """
+    line = ""
+    for chunk in chunks:
+        for char in chunk.decode("utf-8"):
+            if char == "\n" and line:
+                yield line
+                line = ""
+            else:
+                line += char
+    if line:
+        yield line
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with open(FIXTURE, "rb") as fixture:
+        lines = [line for line in fixture.read().split(b"\n") if line]
+
+    with tempfile.TemporaryDirectory() as root:
+        os.mkdir(os.path.join(root, "logs"))
+        path = os.path.join(root, "logs", "tracking.log")
+        with open(path, "wb") as log_file:
+            written = 0
+            while written < size_mb * 1024 * 1024:
+                for line in lines:
+                    written += log_file.write(line + b"\n")
+
+        print(f"{written / 1024 / 1024:.1f} MB, LOCAL driver")
+        driver = LocalStorageDriver(root)
+
+        for workers, range_size in ((1, None), (4, 4 * 1024 * 1024), (8, 1024 * 1024)):
+            sender = CountingSender()
+            start = time.perf_counter()
+            command.transform_tracking_logs(
+                driver, "logs", "", sender, download_workers=workers, range_size=range_size
+            )
+            print(f"workers={workers} range_size={range_size}: "
+                  f"{time.perf_counter() - start:.3f}s, {sender.lines} lines")
+
+        obj = next(driver.iterate_container_objects(driver.get_container("logs")))
+        chunks = list(command._get_chunks(driver, obj))  # pylint: disable=protected-access
+        for name, splitter in (("incremental decoder", command._iter_lines),  # pylint: disable=protected-access
+                               ("per character", per_character_lines)):
+            start = time.perf_counter()
+            count = sum(1 for _ in splitter(chunks))
+            print(f"split lines, {name}: {time.perf_counter() - start:.3f}s, {count} lines")
+
+
+if __name__ == "__main__":
+    main()
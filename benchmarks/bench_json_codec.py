@@ -0,0 +1,125 @@
+"""
+Benchmark the JSON codecs at each place the event pipeline parses or serializes events.
+
+For every available codec (``json`` always, ``orjson`` if installed) this times:
+
+* parsing tracking log lines with ``parse_json_event``
+* serializing events for the Redis batching queue (``EventsRouter.queue_event``)
+* deserializing a popped batch (``EventsRouter.send`` and ``get_failed_events``)
+* serializing and re-loading xAPI statements (``XApiProcessor.transform_event``)
+* serializing Caliper events (``CaliperProcessor.transform_event``)
+* writing transformed events to a file (``StreamingEventWriter``)
+
+The xAPI and Caliper payloads are the expected transformer test fixtures.
+
+Usage: python -m benchmarks.bench_json_codec [repeat]
+"""
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from django.conf import settings  # noqa: E402
+
+from event_routing_backends.management.commands import transform_tracking_logs as command  # noqa: E402
+from event_routing_backends.management.commands.helpers.event_log_parser import parse_json_event  # noqa: E402
+from event_routing_backends.management.commands.helpers.queued_sender import StreamingEventWriter  # noqa: E402
+from event_routing_backends.processors import caliper, xapi  # noqa: E402
+from event_routing_backends.utils import json_codec  # noqa: E402
+
+LOG_FIXTURE = os.path.join(os.path.dirname(command.__file__), "tests", "fixtures", "tracking.log")
+
+
+def load_fixtures(package):
+    """
+    Return the expected transformer output fixtures of the given processor package.
+    """
+    paths = glob.glob(os.path.join(os.path.dirname(package.__file__), "tests", "fixtures", "expected", "*.json"))
+    fixtures = []
+    for path in sorted(paths):
+        with open(path, encoding="utf-8") as f:
+            fixtures.append(json.load(f))
+    return fixtures
+
+
+def call_sites(lines, statements, caliper_events):
+    """
+    Return (name, count, callable) for every call site, each callable doing one full pass.
+    """
+    events = [parse_json_event(line) for line in lines]
+    events = [event for event in events if event]
+    for event in events:
+        event["timestamp"] = datetime.now()
+    queued = [json_codec.dumps_bytes(event) for event in events]
+
+    def parse():
+        for line in lines:
+            parse_json_event(line)
+
+    def queue():
+        for event in events:
+            json_codec.dumps(event)
+
+    def dequeue():
+        for item in queued:
+            json_codec.loads(item)
+
+    def xapi_transform():
+        for statement in statements:
+            json_codec.loads(json_codec.dumps(statement))
+
+    def caliper_transform():
+        for event in caliper_events:
+            json_codec.dumps(event)
+
+    def store():
+        for _ in StreamingEventWriter(iter(statements), lambda e: e):
+            pass
+
+    return [
+        ("parse_json_event", len(lines), parse),
+        ("queue_event", len(events), queue),
+        ("send (dequeue)", len(queued), dequeue),
+        ("XApiProcessor", len(statements), xapi_transform),
+        ("CaliperProcessor", len(caliper_events), caliper_transform),
+        ("QueuedSender.store", len(statements), store),
+    ]
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with open(LOG_FIXTURE, encoding="utf-8") as fixture:
+        # Leave out the intentionally broken fixture lines, they only add error logging noise
+        lines = [line for line in fixture if parse_json_event(line)]
+    statements = load_fixtures(xapi)
+    caliper_events = load_fixtures(caliper)
+
+    codecs = [json_codec.CODEC_JSON] + ([json_codec.CODEC_ORJSON] if json_codec.orjson else [])
+    results = {}
+    for name in codecs:
+        settings.EVENT_ROUTING_BACKEND_JSON_CODEC = name
+        for site, count, func in call_sites(lines, statements, caliper_events):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            results[(site, name)] = (time.perf_counter() - start) / (count * repeat) * 1e6
+
+    print(f"{'call site':<20}" + "".join(f"{name + ' us/event':>18}" for name in codecs) + f"{'speedup':>10}")
+    for site, _, _ in call_sites(lines, statements, caliper_events):
+        row = [results[(site, name)] for name in codecs]
+        speedup = f"{row[0] / row[-1]:.1f}x" if len(row) > 1 else "-"
+        print(f"{site:<20}" + "".join(f"{value:>18.2f}" for value in row) + f"{speedup:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark the QueuedSender prefilter that skips tracking log lines for unknown events before parsing them.
+
+Builds a log in which roughly 85% of lines are for events that aren't in the xAPI whitelist, the usual
+mix on a production LMS, and feeds it through ``QueuedSender.transform_and_queue`` with and without
+the prefilter.
+
+Usage: python -m benchmarks.bench_prefilter [lines]
+"""
+import itertools
+import os
+import sys
+import time
+
+from benchmarks import setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from django.conf import settings  # noqa: E402
+from eventtracking.django.django_tracker import override_default_tracker  # noqa: E402
+from eventtracking.processors.whitelist import NameWhitelistProcessor  # noqa: E402
+
+from event_routing_backends.management.commands import transform_tracking_logs as command  # noqa: E402
+from event_routing_backends.management.commands.helpers.event_log_parser import parse_json_event  # noqa: E402
+from event_routing_backends.management.commands.helpers.queued_sender import QueuedSender  # noqa: E402
+from event_routing_backends.settings.common import plugin_settings  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(command.__file__), "tests", "fixtures", "tracking.log")
+
+
+def build_log(line_count, whitelist):
+    """
+    Return `line_count` fixture lines, about 85% of them for events not in the whitelist.
+    """
+    with open(FIXTURE, encoding="utf-8") as fixture:
+        # Leave out the intentionally broken fixture lines, they only add error logging noise
+        lines = [line.rstrip("\n") for line in fixture if parse_json_event(line)]
+    known = [line for line in lines if any(f'"name": "{name}"' in line for name in whitelist)]
+    unknown = [line for line in lines if line not in known]
+    pattern = [known] * 3 + [unknown] * 17
+    return [
+        next(source)
+        for source in itertools.islice(itertools.cycle([itertools.cycle(group) for group in pattern]), line_count)
+    ]
+
+
+def run(lines, prefilter):
+    """
+    Feed the lines through a dry run QueuedSender and return it along with the elapsed time.
+    """
+    sender = QueuedSender("LRS", None, None, "xapi", max_queue_size=len(lines) + 1, dry_run=True,
+                          sleep_between_batches_secs=0, prefilter=prefilter)
+    start = time.perf_counter()
+    for line in lines:
+        sender.transform_and_queue(line)
+    return sender, time.perf_counter() - start
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    plugin_settings(settings)
+    override_default_tracker()
+    from eventtracking.tracker import get_tracker  # pylint: disable=import-outside-toplevel
+    whitelist = settings.EVENT_TRACKING_BACKENDS_ALLOWED_XAPI_EVENTS
+    get_tracker().backends["event_transformer"].processors = [NameWhitelistProcessor(whitelist=whitelist)]
+
+    lines = build_log(line_count, whitelist)
+    full, full_secs = run(lines, prefilter=False)
+    filtered, filtered_secs = run(lines, prefilter=True)
+
+    assert full.queued_lines == filtered.queued_lines
+    print(f"{line_count} lines, {full.queued_lines} queued, {full.skipped_lines} skipped")
+    print(f"full parse:  {full_secs:.3f}s")
+    print(f"prefiltered: {filtered_secs:.3f}s, skip rate {filtered.prefiltered_lines / line_count:.1%}, "
+          f"speedup {full_secs / filtered_secs:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
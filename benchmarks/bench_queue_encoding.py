@@ -0,0 +1,76 @@
+"""
+Benchmark the size and speed of the encodings for events queued in Redis.
+
+Encodes the raw tracking events used as transformer test fixtures, which are what
+``EventsRouter`` pushes to the batching and dead queues, as plain JSON and with
+``EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION`` enabled, and reports the bytes per event and
+the encode and decode times.
+
+Usage: python -m benchmarks.bench_queue_encoding [repeat]
+"""
+import glob
+import json
+import os
+import sys
+import time
+
+from benchmarks import setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from django.test import override_settings  # noqa: E402
+
+from event_routing_backends.processors import tests as processor_tests  # noqa: E402
+from event_routing_backends.utils import json_codec, queue_encoding  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(processor_tests.__file__), "fixtures", "current", "*.json")
+
+
+def measure(events, repeat):
+    """
+    Return the average bytes, encode and decode microseconds per event with the current settings.
+    """
+    payloads = [queue_encoding.encode(event) for event in events]
+    size = sum(len(payload if isinstance(payload, bytes) else payload.encode("utf-8")) for payload in payloads)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for event in events:
+            queue_encoding.encode(event)
+    encode_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for payload in payloads:
+            queue_encoding.decode(payload)
+    decode_secs = time.perf_counter() - start
+
+    count = len(events)
+    return size / count, encode_secs / (count * repeat) * 1e6, decode_secs / (count * repeat) * 1e6
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    events = []
+    for path in sorted(glob.glob(FIXTURES)):
+        with open(path, encoding="utf-8") as f:
+            events.append(json.load(f))
+
+    print(f"{len(events)} events, JSON codec: {json_codec.get_json_codec().name}")
+    print(f"{'encoding':<12}{'bytes/event':>14}{'encode us':>12}{'decode us':>12}")
+    results = {}
+    for compression in (False, True):
+        with override_settings(EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION=compression):
+            results[compression] = measure(events, repeat)
+        name = "deflate v1" if compression else "json"
+        size, encode_us, decode_us = results[compression]
+        print(f"{name:<12}{size:>14.1f}{encode_us:>12.1f}{decode_us:>12.1f}")
+    print(f"reduction: {1 - results[True][0] / results[False][0]:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark the normalization of event timestamps by ``convert_datetime_to_iso``.
+
+Takes the ``timestamp`` and ``time`` values of the raw transformer test fixtures and times
+converting each of them with dateutil, as ``convert_datetime_to_iso`` used to, with the
+``datetime.fromisoformat`` fast path, and with the fast path and its cache, as Caliper
+events with repeated timestamps get them. The timestamps are grouped by format, with digits
+replaced by ``9``.
+
+Usage: python -m benchmarks.bench_timestamps [repeat]
+"""
+import glob
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks import setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from dateutil.parser import parse  # noqa: E402
+
+from event_routing_backends.helpers import convert_datetime_to_iso, convert_iso_string_to_iso  # noqa: E402
+from event_routing_backends.processors import tests as processor_tests  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(processor_tests.__file__), "fixtures", "current", "*.json")
+
+
+def load_timestamps():
+    """
+    Return the timestamps of the raw event fixtures, grouped by format.
+    """
+    timestamps = defaultdict(list)
+    for path in sorted(glob.glob(FIXTURES)):
+        with open(path, encoding="utf-8") as f:
+            event = json.load(f)
+        for key in ("timestamp", "time"):
+            if isinstance(event.get(key), str):
+                timestamps[re.sub(r"\d", "9", event[key])].append(event[key])
+    return timestamps
+
+
+def with_dateutil(timestamp):
+    """
+    Convert a timestamp the way ``convert_datetime_to_iso`` did before the fast path.
+    """
+    return convert_datetime_to_iso(parse(timestamp))
+
+
+def uncached(timestamp):
+    """
+    Convert a timestamp with the fast path, without the cache.
+    """
+    return convert_iso_string_to_iso.__wrapped__(timestamp)
+
+
+def time_per_call(func, timestamps, repeat):
+    """
+    Return the average microseconds of converting each timestamp with func.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for timestamp in timestamps:
+            func(timestamp)
+    return (time.perf_counter() - start) / (len(timestamps) * repeat) * 1e6
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"{'format':<36}{'count':>7}{'dateutil us':>13}{'fast us':>10}{'cached us':>11}{'speedup':>10}")
+    for timestamp_format, timestamps in sorted(load_timestamps().items()):
+        assert all(with_dateutil(timestamp) == uncached(timestamp) for timestamp in timestamps)
+        slow = time_per_call(with_dateutil, timestamps, repeat)
+        fast = time_per_call(uncached, timestamps, repeat)
+        cached = time_per_call(convert_datetime_to_iso, timestamps, repeat)
+        print(
+            f"{timestamp_format:<36}{len(timestamps):>7}{slow:>13.2f}{fast:>10.2f}{cached:>11.2f}{slow / fast:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
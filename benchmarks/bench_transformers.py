@@ -0,0 +1,121 @@
+"""
+Benchmark how transformers resolve the values of their fields.
+
+For every registered xAPI and Caliper transformer with a raw event fixture, this times resolving
+``required_fields + additional_fields`` with the ``hasattr``/``getattr`` lookups
+``BaseTransformerMixin.transform`` used to do for every field of every event, and with the
+resolvers precompiled per transformer class, both of them calling the same field getters. It also
+reports the time of the whole ``transform()`` for reference.
+
+The transformers run against an in-memory test database, like the transformer tests.
+
+Usage: python -m benchmarks.bench_transformers [repeat]
+"""
+import glob
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks import setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from django.db import connection  # noqa: E402
+from eventtracking.processors.exceptions import NoTransformerImplemented  # noqa: E402
+
+from event_routing_backends.processors import tests as processor_tests  # noqa: E402
+from event_routing_backends.processors.caliper.registry import CaliperTransformersRegistry  # noqa: E402
+from event_routing_backends.processors.xapi.registry import XApiTransformersRegistry  # noqa: E402
+from event_routing_backends.tests.factories import UserFactory  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(processor_tests.__file__), "fixtures", "current", "*.json")
+
+
+def lookup_fields(transformer):
+    """
+    Resolve the fields of a transformer the way ``transform`` did before the precompiled resolvers.
+    """
+    transformed_event = {}
+    for key in transformer.required_fields + transformer.additional_fields:
+        if hasattr(transformer, key):
+            transformed_event[key] = getattr(transformer, key)
+        elif hasattr(transformer, f"get_{key}"):
+            transformed_event[key] = getattr(transformer, f"get_{key}")()
+    return transformed_event
+
+
+def resolve_fields(transformer):
+    """
+    Resolve the fields of a transformer with its precompiled resolvers.
+    """
+    transformed_event = {}
+    for key, resolver in transformer._field_resolvers:  # pylint: disable=protected-access
+        if resolver is not None:
+            transformed_event[key] = resolver(transformer)
+    return transformed_event
+
+
+def time_per_call(func, transformers, repeat):
+    """
+    Return the average microseconds of calling func on each transformer.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for transformer in transformers:
+            func(transformer)
+    return (time.perf_counter() - start) / (len(transformers) * repeat) * 1e6
+
+
+def load_transformers(registry, events):
+    """
+    Return the transformers of the registry for the events, grouped by transformer class name.
+    """
+    transformers = defaultdict(list)
+    for event in events:
+        try:
+            transformer = registry.get_transformer(event)
+            transformer.transform()
+            lookup_fields(transformer)
+        except (NoTransformerImplemented, ValueError):
+            # Unknown events and the fixtures of anonymous users or missing data, which are not transformed
+            continue
+        transformers[type(transformer).__name__].append(transformer)
+    return transformers
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    connection.creation.create_test_db(verbosity=0)
+    UserFactory.create(username="edx", email="edx@example.com")
+
+    events = []
+    for path in sorted(glob.glob(FIXTURES)):
+        with open(path, encoding="utf-8") as f:
+            events.append(json.load(f))
+
+    print(f"{'transformer':<50}{'events':>8}{'lookup us':>12}{'resolvers us':>14}{'speedup':>10}{'transform us':>14}")
+    totals = defaultdict(float)
+    for backend, registry in (("xapi", XApiTransformersRegistry), ("caliper", CaliperTransformersRegistry)):
+        for name, transformers in sorted(load_transformers(registry, events).items()):
+            lookup = time_per_call(lookup_fields, transformers, repeat)
+            resolvers = time_per_call(resolve_fields, transformers, repeat)
+            transform = time_per_call(lambda transformer: transformer.transform(), transformers, repeat)
+            totals["lookup"] += lookup * len(transformers)
+            totals["resolvers"] += resolvers * len(transformers)
+            totals["count"] += len(transformers)
+            print(
+                f"{backend + '.' + name:<50}{len(transformers):>8}{lookup:>12.2f}{resolvers:>14.2f}"
+                f"{lookup / resolvers:>9.2f}x{transform:>14.2f}"
+            )
+    lookup, resolvers = totals["lookup"] / totals["count"], totals["resolvers"] / totals["count"]
+    print(f"{'all':<50}{int(totals['count']):>8}{lookup:>12.2f}{resolvers:>14.2f}{lookup / resolvers:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ configured hosts.
 """
 from event_routing_backends.backends.events_router import EventsRouter
 from event_routing_backends.tasks import dispatch_bulk_events, dispatch_event, dispatch_event_persistent
+from event_routing_backends.utils.task_payload import pack_events
 
 
 class AsyncEventsRouter(EventsRouter):
@@ -34,7 +35,7 @@ class AsyncEventsRouter(EventsRouter):
             router_type (str):          type of the router
             host_configurations (dict): host configurations dict
         """
-        dispatch_bulk_events.delay(events, router_type, host_configurations)
+        dispatch_bulk_events.delay(pack_events(events), router_type, host_configurations)
 
     def dispatch_event_persistent(self, event_name, updated_event, router_type, host_configurations):
         """
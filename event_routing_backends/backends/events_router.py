@@ -1,23 +1,34 @@
 """
 Generic router to send events to hosts.
 """
-import json
 import logging
+import time
 from datetime import datetime, timedelta
 
 from django.conf import settings
 from django_redis import get_redis_connection
-from eventtracking.backends.logger import DateTimeJSONEncoder
 from eventtracking.processors.exceptions import EventEmissionExit
 
-from event_routing_backends.helpers import get_business_critical_events
+from event_routing_backends.backends.stream_queue import RedisStreamQueue
+from event_routing_backends.helpers import get_business_critical_events, get_dispatched_event_id
 from event_routing_backends.models import RouterConfiguration
+from event_routing_backends.processors.mixins.base_transformer_processor import BaseTransformerProcessorMixin
+from event_routing_backends.utils import queue_encoding
+from event_routing_backends.utils.dead_queue_spill import get_spill_storage
+from event_routing_backends.utils.rate_limiter import RATE_LIMIT_KEY
 
 logger = logging.getLogger(__name__)
 
 EVENTS_ROUTER_QUEUE_FORMAT = 'events_router_queue_{}'
 EVENTS_ROUTER_DEAD_QUEUE_FORMAT = 'dead_queue_{}'
 EVENTS_ROUTER_LAST_SENT_FORMAT = 'last_sent_{}'
+EVENTS_ROUTER_QUARANTINE_QUEUE_FORMAT = 'quarantine_queue_{}'
+EVENTS_ROUTER_DEAD_QUEUE_CONSUMERS_FORMAT = 'dead_queue_{}_consumers'
+EVENTS_ROUTER_DEAD_QUEUE_PROCESSING_FORMAT = 'dead_queue_{}_processing_{}'
+EVENTS_ROUTER_DEAD_QUEUE_SPILL_CLAIMS_FORMAT = 'dead_queue_{}_spill_claims'
+
+BATCH_QUEUE_LIST = 'list'
+BATCH_QUEUE_STREAM = 'stream'
 
 
 class EventsRouter:
@@ -38,6 +49,10 @@ class EventsRouter:
         self.queue_name = EVENTS_ROUTER_QUEUE_FORMAT.format(self.backend_name)
         self.dead_queue = EVENTS_ROUTER_DEAD_QUEUE_FORMAT.format(self.backend_name)
         self.last_sent_key = EVENTS_ROUTER_LAST_SENT_FORMAT.format(self.backend_name)
+        self.quarantine_queue = EVENTS_ROUTER_QUARANTINE_QUEUE_FORMAT.format(self.backend_name)
+        self.dead_queue_consumers = EVENTS_ROUTER_DEAD_QUEUE_CONSUMERS_FORMAT.format(self.backend_name)
+        self.dead_queue_spill_claims = EVENTS_ROUTER_DEAD_QUEUE_SPILL_CLAIMS_FORMAT.format(self.backend_name)
+        self.stream_queue = RedisStreamQueue(self.backend_name)
 
     def configure_host(self, host, router):
         """
@@ -53,6 +68,10 @@ class EventsRouter:
         elif router.auth_scheme == RouterConfiguration.AUTH_BEARER:
             host['host_configurations'].update({'auth_key': router.auth_key})
 
+        rate_limit = router.get_rate_limit()
+        if rate_limit:
+            host['host_configurations'].update({RATE_LIMIT_KEY: rate_limit})
+
         if router.backend_name == RouterConfiguration.CALIPER_BACKEND:
             host.update({'router_type': 'AUTH_HEADERS'})
             if 'headers' in host:
@@ -83,18 +102,20 @@ class EventsRouter:
             logger.debug('Could not find any enabled router configuration for backend %s', self.backend_name)
             routers = []
 
+        event_names = []
         for event in events:
             try:
-                event_name = event['name']
+                event_names.append(event['name'])
             except TypeError as exc:
                 raise ValueError('Expected event as dict but {type} was given.'.format(type=type(event))) from exc
 
-            try:
-                logger.debug(
-                    'Processing edx event "{}" for router with backend {}'.format(event_name, self.backend_name)
-                )
+        logger.debug('Processing {} edx events for router with backend {}'.format(len(events), self.backend_name))
+        processed_batch = self.process_batch(events)
 
-                processed_events = self.process_event(event)
+        for event, event_name, processed_events in zip(events, event_names, processed_batch):
+            try:
+                if isinstance(processed_events, Exception):
+                    raise processed_events
             except (EventEmissionExit, ValueError):
                 logger.error(
                     'Could not process edx event "%s" for backend %s\'s router',
@@ -133,15 +154,165 @@ class EventsRouter:
 
         return route_events
 
-    def get_failed_events(self, batch_size):
+    def get_failed_events(self, batch_size, consumer=None):
         """
         Get failed events from the dead queue.
+
+        Without a consumer the events are removed from the dead queue. With a consumer they are
+        atomically moved to that consumer's processing list instead, where they stay until
+        `ack_failed_events` is called. If the consumer dies before that, `reclaim_failed_events`
+        moves them back to the dead queue.
+
+        Arguments:
+            batch_size (int):  maximum number of events to get
+            consumer (str):    unique name of the process consuming the dead queue
+
+        Returns:
+            list[dict]
         """
         redis = get_redis_connection()
-        failed_events = redis.rpop(self.dead_queue, batch_size)
+        if consumer is None:
+            failed_events = redis.rpop(self.dead_queue, batch_size)
+        else:
+            pipeline = redis.pipeline()
+            pipeline.hset(self.dead_queue_consumers, consumer, time.time())
+            for _ in range(batch_size):
+                pipeline.rpoplpush(self.dead_queue, self.get_processing_queue(consumer))
+            failed_events = [event for event in pipeline.execute()[1:] if event is not None]
         if not failed_events:
             return []
-        return [json.loads(event.decode('utf-8')) for event in failed_events]
+        return [queue_encoding.decode(event) for event in failed_events]
+
+    def get_processing_queue(self, consumer):
+        """
+        Return the name of the list holding the dead queue events claimed by `consumer`.
+        """
+        return EVENTS_ROUTER_DEAD_QUEUE_PROCESSING_FORMAT.format(self.backend_name, consumer)
+
+    def ack_failed_events(self, consumer):
+        """
+        Acknowledge all dead queue events claimed by `consumer`, removing them for good.
+        """
+        redis = get_redis_connection()
+        pipeline = redis.pipeline()
+        pipeline.delete(self.get_processing_queue(consumer))
+        pipeline.hdel(self.dead_queue_consumers, consumer)
+        pipeline.execute()
+
+    def reclaim_failed_events(self, stale_after):
+        """
+        Move events claimed by consumers that have not been heard of for a while back to the dead queue.
+
+        A consumer is stale if it has not claimed or acknowledged events for `stale_after` seconds.
+
+        Arguments:
+            stale_after (int):  seconds after which a consumer is considered stale
+
+        Returns:
+            int: number of events moved back to the dead queue
+        """
+        redis = get_redis_connection()
+        now = time.time()
+        reclaimed = 0
+        for consumer, claimed_at in redis.hgetall(self.dead_queue_consumers).items():
+            if now - float(claimed_at) < stale_after:
+                continue
+            consumer = consumer.decode('utf-8')
+            reclaimed += self.release_failed_events(consumer)
+            logger.info(f'Reclaimed dead queue events of stale consumer {consumer}')
+        return reclaimed
+
+    def release_failed_events(self, consumer):
+        """
+        Move the dead queue events claimed by `consumer` back to the dead queue, for a later recovery.
+
+        The spilled files claimed by `consumer` are released as well.
+
+        Arguments:
+            consumer (str):     unique name of the process consuming the dead queue
+
+        Returns:
+            int: number of events moved back to the dead queue
+        """
+        redis = get_redis_connection()
+        released = 0
+        # Each event is moved atomically, so nothing is lost if this is interrupted
+        while redis.rpoplpush(self.get_processing_queue(consumer), self.dead_queue):
+            released += 1
+        claims = [
+            object_name for object_name, claimed_by in redis.hgetall(self.dead_queue_spill_claims).items()
+            if claimed_by.decode('utf-8') == consumer
+        ]
+        if claims:
+            redis.hdel(self.dead_queue_spill_claims, *claims)
+        redis.hdel(self.dead_queue_consumers, consumer)
+        return released
+
+    def claim_spilled_file(self, object_name, consumer):
+        """
+        Claim a spilled dead queue file, so that no other consumer recovers its events.
+
+        The claim is held until `ack_spilled_file` is called, or until `release_failed_events` is
+        called for the consumer, e.g. by `reclaim_failed_events` once the consumer is stale.
+
+        Arguments:
+            object_name (str):  name of the spilled file
+            consumer (str):     unique name of the process consuming the dead queue
+
+        Returns:
+            bool: whether the file was claimed, False if another consumer holds it
+        """
+        redis = get_redis_connection()
+        pipeline = redis.pipeline()
+        pipeline.hset(self.dead_queue_consumers, consumer, time.time())
+        pipeline.hsetnx(self.dead_queue_spill_claims, object_name, consumer)
+        return bool(pipeline.execute()[1])
+
+    def ack_spilled_file(self, object_name):
+        """
+        Drop the claim of a spilled file once it has been deleted.
+        """
+        redis = get_redis_connection()
+        redis.hdel(self.dead_queue_spill_claims, object_name)
+
+    def push_to_dead_queue(self, redis, batch):
+        """
+        Push a failed batch to the dead queue, or to the spill storage if the dead queue is full.
+
+        The dead queue is full once it would hold more than `EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE`
+        events. Without a spill storage configured, failed batches that don't fit are dropped; if
+        writing to the spill storage fails they are pushed to the dead queue anyway.
+
+        Arguments:
+            redis (Redis):      redis connection
+            batch (list):       queued events, as stored in the batching queue
+        """
+        max_size = settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE
+        if max_size and redis.llen(self.dead_queue) + len(batch) > max_size:
+            storage = get_spill_storage()
+            if not storage:
+                logger.error(f'Dead queue {self.dead_queue} is full, dropping {len(batch)} failed events.')
+                return
+            try:
+                object_name = storage.spill(self.backend_name, [queue_encoding.decode(event) for event in batch])
+                logger.info(
+                    f'Dead queue {self.dead_queue} is full, spilled {len(batch)} failed events to {object_name}'
+                )
+                return
+            except Exception:  # pylint: disable=broad-except
+                logger.exception(f'Could not spill {len(batch)} failed events of full dead queue {self.dead_queue}')
+
+        logger.info(f'Pushing failed events to the dead queue: {self.dead_queue}')
+        redis.lpush(self.dead_queue, *batch)
+
+    def quarantine_events(self, events):
+        """
+        Push events that could not be recovered from the dead queue to the quarantine queue.
+
+        Quarantined events are not picked up again by `recover_failed_events`.
+        """
+        redis = get_redis_connection()
+        redis.lpush(self.quarantine_queue, *[queue_encoding.encode(event) for event in events])
 
     def bulk_send(self, events, router_urls=None):
         """
@@ -161,11 +332,13 @@ class EventsRouter:
             host = None
             ids = set()
             for _, updated_event, host, _ in events_for_route:
-                if updated_event["id"] in ids:
-                    logger.info(f"Found duplicated event {updated_event['id']}")
+                event_id = get_dispatched_event_id(updated_event)
+                if event_id in ids:
+                    logger.info(f"Found duplicated event {event_id}")
                     continue
                 prepared_events.append(updated_event)
-                ids.add(updated_event["id"])
+                if event_id is not None:
+                    ids.add(event_id)
 
             if prepared_events:  # pragma: no cover
                 self.dispatch_bulk_events(
@@ -187,13 +360,17 @@ class EventsRouter:
         """
         if settings.EVENT_ROUTING_BACKEND_BATCHING_ENABLED:
             redis = get_redis_connection()
-            batch = self.queue_event(redis, event)
+            entry_ids = None
+            if settings.EVENT_ROUTING_BACKEND_BATCH_QUEUE == BATCH_QUEUE_STREAM:
+                entry_ids, batch = self.queue_event_in_stream(redis, event)
+            else:
+                batch = self.queue_event(redis, event)
             if not batch:
                 return
 
             try:
                 redis.set(self.last_sent_key, datetime.now().isoformat())
-                self.bulk_send([json.loads(queued_event.decode('utf-8')) for queued_event in batch])
+                self.bulk_send([queue_encoding.decode(queued_event) for queued_event in batch])
             except Exception:  # pylint: disable=broad-except
                 logger.exception(
                     'Exception occurred while trying to bulk dispatch {} events.'.format(
@@ -201,8 +378,9 @@ class EventsRouter:
                     ),
                     exc_info=True
                 )
-                logger.info(f'Pushing failed events to the dead queue: {self.dead_queue}')
-                redis.lpush(self.dead_queue, *batch)
+                self.push_to_dead_queue(redis, batch)
+            if entry_ids:
+                self.stream_queue.ack(redis, entry_ids)
             return
 
         event_routes = self.prepare_to_send([event])
@@ -230,7 +408,7 @@ class EventsRouter:
         """
         if isinstance(event["timestamp"], datetime):
             event["timestamp"] = event["timestamp"].isoformat()
-        queue_size = redis.lpush(self.queue_name, json.dumps(event, cls=DateTimeJSONEncoder))
+        queue_size = redis.lpush(self.queue_name, queue_encoding.encode(event))
         logger.info(f'Event {event["name"]} has been queued for batching. Queue size: {queue_size}')
 
         if queue_size >= settings.EVENT_ROUTING_BACKEND_BATCH_SIZE or self.time_to_send(redis):
@@ -250,6 +428,28 @@ class EventsRouter:
 
         return None
 
+    def queue_event_in_stream(self, redis, event):
+        """
+        Queue the event in the backend's Redis stream to be sent to configured routers.
+
+        Returns:
+            tuple(list, list): stream entry IDs and serialized events of the batch to send, which
+            are empty if it is not time to send a batch yet
+        """
+        if isinstance(event["timestamp"], datetime):
+            event["timestamp"] = event["timestamp"].isoformat()
+        entries = self.stream_queue.queue_event(redis, queue_encoding.encode(event), lambda: self.time_to_send(redis))
+        if not entries:
+            return [], []
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        # Same deduplication as in queue_event; the IDs of duplicates are still acknowledged.
+        batch = list(dict.fromkeys(payload for _, payload in entries))
+        if len(batch) != len(entries):  # pragma: no cover
+            logger.warning(f"{len(entries) - len(batch)} duplicate events in event-routing-backends batch stream! "
+                           f"This is a likely due to misconfiguration of EVENT_TRACKING_BACKENDS.")
+        return entry_ids, batch
+
     def time_to_send(self, redis):
         """
         Check if it is time to send the batched events.
@@ -262,6 +462,43 @@ class EventsRouter:
 
         return ready
 
+    def process_batch(self, events):
+        """
+        Process a batch of events through this router's processors.
+
+        Transformer processors get the whole batch through `transform_batch`, so that they can share
+        work across its events. Other processors get the events one by one.
+
+        Arguments:
+            events (list[dict]):    Events to be processed
+
+        Returns
+            list: the processed events (list of ANY) of each event, or the exception raised processing it
+        """
+        results = [[event.copy()] for event in events]
+        for processor in self.processors:
+            pending = [index for index, result in enumerate(results) if not isinstance(result, Exception)]
+            if isinstance(processor, BaseTransformerProcessorMixin):
+                batch = [(index, event) for index in pending for event in results[index]]
+                for index in pending:
+                    results[index] = []
+                transformed_batch = processor.transform_batch([event for _, event in batch])
+                for (index, _), transformed_events in zip(batch, transformed_batch):
+                    if isinstance(results[index], Exception):
+                        continue
+                    if isinstance(transformed_events, Exception):
+                        results[index] = transformed_events
+                    else:
+                        results[index].extend(transformed_events)
+            else:
+                for index in pending:
+                    try:
+                        results[index] = processor(results[index])
+                    except Exception as exc:  # pylint: disable=broad-except
+                        results[index] = exc
+
+        return results
+
     def process_event(self, event):
         """
         Process the event through this router's processors.
@@ -0,0 +1,184 @@
+"""
+Redis Streams implementation of the events router batching queue.
+"""
+import logging
+import os
+import socket
+
+from django.conf import settings
+from edx_django_utils.monitoring import set_custom_attribute
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+EVENTS_ROUTER_STREAM_FORMAT = 'events_router_stream_{}'
+EVENTS_ROUTER_STREAM_GROUP = 'events_router'
+
+
+class RedisStreamQueue:
+    """
+    Batching queue for one backend, stored in a Redis stream.
+
+    Every LMS process adds its events to the stream with `XADD`, capped at
+    `EVENT_ROUTING_BACKEND_STREAM_MAXLEN` entries. Once the consumer group has a batch worth
+    of unread events, the process reads the next batch through the group, so that concurrent
+    flushes on different nodes never get the same events. Entries are acknowledged and
+    deleted once the batch has been sent or moved to the dead queue. Entries read by a
+    process that died before acknowledging them are claimed with `XAUTOCLAIM` by the next
+    flush once they have been idle for `EVENT_ROUTING_BACKEND_STREAM_CLAIM_IDLE_TIME` seconds.
+    """
+
+    def __init__(self, backend_name):
+        """
+        Initialize the queue.
+
+        Arguments:
+            backend_name (str): name of the router backend
+        """
+        self.stream = EVENTS_ROUTER_STREAM_FORMAT.format(backend_name)
+        self.group = EVENTS_ROUTER_STREAM_GROUP
+        self.consumer = '{}-{}'.format(socket.gethostname(), os.getpid())
+        self.group_created = False
+
+    def ensure_group(self, redis):
+        """
+        Create the stream and its consumer group if they don't exist yet.
+        """
+        if self.group_created:
+            return
+        try:
+            redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except ResponseError as exc:
+            if 'BUSYGROUP' not in str(exc):
+                raise
+        self.group_created = True
+
+    def queue_event(self, redis, payload, time_to_send):
+        """
+        Add a serialized event to the stream and return the next batch if it is time to send one.
+
+        Arguments:
+            redis (Redis):          redis connection
+            payload (str):          serialized event
+            time_to_send (callable): returns True if the batch interval has passed
+
+        Returns:
+            list[tuple(bytes, bytes)]: (entry id, serialized event) of the batch, or None
+        """
+        self.ensure_group(redis)
+        pipeline = redis.pipeline(transaction=False)
+        pipeline.xadd(
+            self.stream,
+            {'event': payload},
+            maxlen=settings.EVENT_ROUTING_BACKEND_STREAM_MAXLEN,
+            approximate=True,
+        )
+        pipeline.xlen(self.stream)
+        pipeline.xinfo_groups(self.stream)
+        _, stream_length, groups = pipeline.execute()
+        queue_size = self.get_unread_count(stream_length, self.get_group(groups))
+        logger.info(f'Event has been queued for batching in stream {self.stream}. Unread entries: {queue_size}')
+
+        if queue_size >= settings.EVENT_ROUTING_BACKEND_BATCH_SIZE or time_to_send():
+            return self.read_batch(redis)
+        return None
+
+    def read_batch(self, redis):
+        """
+        Claim stuck entries and read new ones, up to a batch size in total.
+
+        Returns:
+            list[tuple(bytes, bytes)]: (entry id, serialized event) of the batch
+        """
+        batch_size = settings.EVENT_ROUTING_BACKEND_BATCH_SIZE
+        claimed = redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=settings.EVENT_ROUTING_BACKEND_STREAM_CLAIM_IDLE_TIME * 1000,
+            count=batch_size,
+        )[1]
+        if claimed:
+            logger.warning(f'Claimed {len(claimed)} stuck entries of stream {self.stream}')
+
+        entries = list(claimed)
+        if len(entries) < batch_size:
+            for _, stream_entries in redis.xreadgroup(
+                self.group, self.consumer, {self.stream: '>'}, count=batch_size - len(entries)
+            ):
+                entries.extend(stream_entries)
+
+        self.record_lag(redis)
+        # Entries trimmed by MAXLEN after being read come back without fields, there is nothing to send
+        self.ack(redis, [entry_id for entry_id, fields in entries if not fields])
+        return [(entry_id, fields[b'event']) for entry_id, fields in entries if fields]
+
+    def ack(self, redis, entry_ids):
+        """
+        Acknowledge and delete handled entries.
+        """
+        if not entry_ids:
+            return
+        pipeline = redis.pipeline()
+        pipeline.xack(self.stream, self.group, *entry_ids)
+        pipeline.xdel(self.stream, *entry_ids)
+        pipeline.execute()
+
+    def get_group(self, groups):
+        """
+        Return the information of our consumer group among the XINFO GROUPS of the stream, None if it is missing.
+        """
+        return next((group for group in groups if group['name'] in (self.group, self.group.encode())), None)
+
+    @staticmethod
+    def get_unread_count(stream_length, group):
+        """
+        Return the number of entries of the stream that the consumer group has not read yet.
+
+        Entries read but not acknowledged are still in the stream while their batch is being sent,
+        or until they are claimed if their consumer died, so they are not counted. The lag of the
+        group is used when Redis reports it (Redis 7 and newer), otherwise the pending entries are
+        subtracted from the length of the stream.
+
+        Arguments:
+            stream_length (int):    XLEN of the stream
+            group (dict):           XINFO GROUPS entry of the consumer group, or None
+
+        Returns:
+            int
+        """
+        if not group:
+            return stream_length
+        if group.get('lag') is not None:
+            return group['lag']
+        return max(stream_length - group['pending'], 0)
+
+    def get_lag_metrics(self, redis):
+        """
+        Return how far the consumer group is behind the stream.
+
+        Returns:
+            dict: `lag` (entries not read yet, None before Redis 7), `pending` (entries read but
+            not acknowledged) and `consumers`, the number of entries pending and the idle time in
+            milliseconds per consumer.
+        """
+        group = self.get_group(redis.xinfo_groups(self.stream))
+        if not group:
+            return {'lag': None, 'pending': 0, 'consumers': {}}
+        consumers = {
+            consumer['name'].decode('utf-8') if isinstance(consumer['name'], bytes) else consumer['name']: {
+                'pending': consumer['pending'],
+                'idle': consumer['idle'],
+            }
+            for consumer in redis.xinfo_consumers(self.stream, self.group)
+        }
+        return {'lag': group.get('lag'), 'pending': group['pending'], 'consumers': consumers}
+
+    def record_lag(self, redis):
+        """
+        Log the lag metrics and report them to the monitoring backend.
+        """
+        metrics = self.get_lag_metrics(redis)
+        logger.info(f'Stream {self.stream} lag: {metrics["lag"]}, pending: {metrics["pending"]}')
+        set_custom_attribute(f'{self.stream}_lag', metrics['lag'])
+        set_custom_attribute(f'{self.stream}_pending', metrics['pending'])
@@ -5,7 +5,7 @@ import datetime
 import json
 from copy import copy
 from json import JSONDecodeError
-from unittest.mock import MagicMock, call, patch, sentinel
+from unittest.mock import ANY, MagicMock, call, patch, sentinel
 
 import ddt
 from django.conf import settings
@@ -19,9 +19,20 @@ from event_routing_backends.backends.events_router import EventsRouter
 from event_routing_backends.backends.sync_events_router import SyncEventsRouter
 from event_routing_backends.helpers import get_business_critical_events
 from event_routing_backends.models import RouterConfiguration
-from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched
+from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched, EventRejected
+from event_routing_backends.processors.xapi.transformer_processor import XApiProcessor
+from event_routing_backends.tasks import (
+    bulk_send_events,
+    bulk_send_with_splitting,
+    dispatch_bulk_events,
+    dispatch_event,
+    send_coalesced_events,
+    send_event,
+)
 from event_routing_backends.tests.factories import RouterConfigurationFactory
+from event_routing_backends.utils import json_codec, queue_encoding
 from event_routing_backends.utils.http_client import HttpClient
+from event_routing_backends.utils.task_payload import pack_events
 from event_routing_backends.utils.xapi_lrs_client import LrsClient
 
 ROUTER_CONFIG_FIXTURE = [
@@ -194,6 +205,30 @@ class TestEventsRouter(TestCase):
             exc_info=True
         ), mocked_logger.error.mock_calls)
 
+    @patch('event_routing_backends.backends.events_router.logger')
+    @patch('event_routing_backends.models.RouterConfiguration.get_enabled_routers')
+    def test_prepare_to_send_batch(self, mocked_get_enabled_routers, mocked_logger):
+        first_event = dict(self.transformed_event, name='first')
+        second_event = dict(self.transformed_event, name='second')
+        processor = XApiProcessor()
+        processors = [MagicMock(side_effect=lambda events: events), processor]
+        mocked_get_enabled_routers.return_value = []
+
+        router = EventsRouter(processors=processors, backend_name='test')
+        with patch.object(processor, 'transform_batch', return_value=[['statement'], ValueError()]) as mocked_batch:
+            self.assertEqual(router.process_batch([first_event, second_event]), [['statement'], ANY])
+            router.prepare_to_send([first_event, second_event])
+
+        # Transformer processors get the whole batch at once, other ones each event
+        self.assertEqual(processors[0].call_count, 4)
+        mocked_batch.assert_called_with([first_event, second_event])
+        mocked_logger.error.assert_called_once_with(
+            'Could not process edx event "%s" for backend %s\'s router',
+            'second',
+            'test',
+            exc_info=True
+        )
+
     @patch('event_routing_backends.utils.http_client.requests.post')
     @patch('event_routing_backends.backends.events_router.logger')
     def test_with_no_router_configurations_available(self, mocked_logger, mocked_post):
@@ -324,7 +359,7 @@ class TestEventsRouter(TestCase):
         redis_mock.lpush.return_value = 2
         router.send(event2)
 
-        redis_mock.lpush.assert_any_call(router.queue_name, json.dumps(event1))
+        redis_mock.lpush.assert_any_call(router.queue_name, json_codec.dumps(event1))
         redis_mock.rpop.assert_any_call(router.queue_name, settings.EVENT_ROUTING_BACKEND_BATCH_SIZE)
         mock_logger.info.assert_any_call(
             f"Event {self.transformed_event['name']} has been queued for batching. Queue size: 1"
@@ -365,6 +400,119 @@ class TestEventsRouter(TestCase):
         )
         redis_mock.lpush.assert_called_once_with(router.dead_queue, *[1])
 
+    @override_settings(
+        EVENT_ROUTING_BACKEND_BATCHING_ENABLED=True,
+        EVENT_ROUTING_BACKEND_BATCH_QUEUE='stream',
+    )
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    @patch('event_routing_backends.backends.events_router.EventsRouter.bulk_send')
+    def test_send_event_with_stream_queue(self, mock_bulk_send, mock_get_redis_connection):
+        router = EventsRouter(processors=[], backend_name='test')
+        router.stream_queue = MagicMock()
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        event = {'name': 'test', 'timestamp': datetime.datetime(2024, 1, 1)}
+        payload = json_codec.dumps({'name': 'test', 'timestamp': '2024-01-01T00:00:00'})
+        router.stream_queue.queue_event.return_value = [(b'1-0', payload), (b'2-0', payload)]
+
+        router.send(event)
+
+        router.stream_queue.queue_event.assert_called_once_with(redis_mock, payload, ANY)
+        redis_mock.lpush.assert_not_called()
+        mock_bulk_send.assert_called_once_with([{'name': 'test', 'timestamp': '2024-01-01T00:00:00'}])
+        router.stream_queue.ack.assert_called_once_with(redis_mock, [b'1-0', b'2-0'])
+
+    @override_settings(
+        EVENT_ROUTING_BACKEND_BATCHING_ENABLED=True,
+        EVENT_ROUTING_BACKEND_BATCH_QUEUE='stream',
+    )
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    @patch('event_routing_backends.backends.events_router.EventsRouter.bulk_send')
+    def test_send_event_with_stream_queue_exception(self, mock_bulk_send, mock_get_redis_connection):
+        router = EventsRouter(processors=[], backend_name='test')
+        router.stream_queue = MagicMock()
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        router.stream_queue.queue_event.return_value = [(b'1-0', b'{"name": "test"}')]
+        mock_bulk_send.side_effect = EventNotDispatched
+
+        router.send({'name': 'test', 'timestamp': '2024-01-01T00:00:00'})
+
+        redis_mock.lpush.assert_called_once_with(router.dead_queue, b'{"name": "test"}')
+        router.stream_queue.ack.assert_called_once_with(redis_mock, [b'1-0'])
+
+    @override_settings(
+        EVENT_ROUTING_BACKEND_BATCHING_ENABLED=True,
+        EVENT_ROUTING_BACKEND_BATCH_QUEUE='stream',
+    )
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    @patch('event_routing_backends.backends.events_router.EventsRouter.bulk_send')
+    def test_send_event_with_stream_queue_not_ready(self, mock_bulk_send, mock_get_redis_connection):
+        router = EventsRouter(processors=[], backend_name='test')
+        router.stream_queue = MagicMock()
+        router.stream_queue.queue_event.return_value = None
+
+        router.send({'name': 'test', 'timestamp': '2024-01-01T00:00:00'})
+
+        mock_bulk_send.assert_not_called()
+        router.stream_queue.ack.assert_not_called()
+
+    @override_settings(EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE=3)
+    @patch('event_routing_backends.backends.events_router.get_spill_storage')
+    def test_push_to_dead_queue(self, mock_get_spill_storage):
+        router = EventsRouter(processors=[], backend_name='test')
+        redis_mock = MagicMock()
+        redis_mock.llen.return_value = 1
+
+        router.push_to_dead_queue(redis_mock, [b'{"name": "a"}', b'{"name": "b"}'])
+
+        redis_mock.lpush.assert_called_once_with(router.dead_queue, b'{"name": "a"}', b'{"name": "b"}')
+        mock_get_spill_storage.assert_not_called()
+
+    @override_settings(EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE=3)
+    @patch('event_routing_backends.backends.events_router.logger')
+    @patch('event_routing_backends.backends.events_router.get_spill_storage')
+    def test_push_to_dead_queue_spills_when_full(self, mock_get_spill_storage, mock_logger):
+        router = EventsRouter(processors=[], backend_name='test')
+        redis_mock = MagicMock()
+        redis_mock.llen.return_value = 2
+        storage = mock_get_spill_storage.return_value
+        storage.spill.return_value = 'dead_queue_test/1.jsonl.gz'
+
+        router.push_to_dead_queue(redis_mock, [b'{"name": "a"}', b'{"name": "b"}'])
+
+        redis_mock.lpush.assert_not_called()
+        storage.spill.assert_called_once_with('test', [{'name': 'a'}, {'name': 'b'}])
+        mock_logger.info.assert_called_once_with(
+            f'Dead queue {router.dead_queue} is full, spilled 2 failed events to dead_queue_test/1.jsonl.gz'
+        )
+
+    @override_settings(EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE=3)
+    @patch('event_routing_backends.backends.events_router.logger')
+    @patch('event_routing_backends.backends.events_router.get_spill_storage')
+    def test_push_to_dead_queue_full_without_spill_storage(self, mock_get_spill_storage, mock_logger):
+        router = EventsRouter(processors=[], backend_name='test')
+        redis_mock = MagicMock()
+        redis_mock.llen.return_value = 3
+        mock_get_spill_storage.return_value = None
+
+        router.push_to_dead_queue(redis_mock, [b'{"name": "a"}'])
+
+        redis_mock.lpush.assert_not_called()
+        mock_logger.error.assert_called_once_with(f'Dead queue {router.dead_queue} is full, dropping 1 failed events.')
+
+    @override_settings(EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE=3)
+    @patch('event_routing_backends.backends.events_router.get_spill_storage')
+    def test_push_to_dead_queue_spill_error(self, mock_get_spill_storage):
+        router = EventsRouter(processors=[], backend_name='test')
+        redis_mock = MagicMock()
+        redis_mock.llen.return_value = 3
+        mock_get_spill_storage.return_value.spill.side_effect = OSError('Storage is down')
+
+        router.push_to_dead_queue(redis_mock, [b'{"name": "a"}'])
+
+        redis_mock.lpush.assert_called_once_with(router.dead_queue, b'{"name": "a"}')
+
     @override_settings(
         EVENT_ROUTING_BACKEND_BATCH_INTERVAL=1,
     )
@@ -1339,6 +1487,135 @@ class TestSyncEventsRouter(TestEventsRouter):  # pylint: disable=test-inherits-t
 
         redis_mock.rpop.assert_called_once_with(router.dead_queue, 1)
 
+    @patch('event_routing_backends.backends.events_router.time')
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    def test_get_failed_events_with_consumer(self, mock_get_redis_connection, mock_time):
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        pipeline = redis_mock.pipeline.return_value
+        mock_time.time.return_value = 1000.0
+        pipeline.execute.return_value = [1, json.dumps({'name': 'test'}).encode('utf-8'), None]
+
+        router = SyncEventsRouter(processors=[], backend_name='test')
+        events = router.get_failed_events(2, consumer='worker-1')
+
+        self.assertEqual(events, [{'name': 'test'}])
+        redis_mock.rpop.assert_not_called()
+        pipeline.hset.assert_called_once_with('dead_queue_test_consumers', 'worker-1', 1000.0)
+        self.assertEqual(
+            pipeline.rpoplpush.mock_calls,
+            [call(router.dead_queue, 'dead_queue_test_processing_worker-1')] * 2
+        )
+
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    def test_ack_failed_events(self, mock_get_redis_connection):
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        pipeline = redis_mock.pipeline.return_value
+
+        router = SyncEventsRouter(processors=[], backend_name='test')
+        router.ack_failed_events('worker-1')
+
+        pipeline.delete.assert_called_once_with('dead_queue_test_processing_worker-1')
+        pipeline.hdel.assert_called_once_with('dead_queue_test_consumers', 'worker-1')
+        pipeline.execute.assert_called_once_with()
+
+    @patch('event_routing_backends.backends.events_router.time')
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    def test_reclaim_failed_events(self, mock_get_redis_connection, mock_time):
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        mock_time.time.return_value = 1000.0
+        redis_mock.hgetall.return_value = {b'stale': b'100.0', b'active': b'950.0'}
+        redis_mock.rpoplpush.side_effect = [b'{"name": "a"}', b'{"name": "b"}', None]
+
+        router = SyncEventsRouter(processors=[], backend_name='test')
+        self.assertEqual(router.reclaim_failed_events(60), 2)
+
+        redis_mock.rpoplpush.assert_called_with('dead_queue_test_processing_stale', router.dead_queue)
+        redis_mock.hdel.assert_called_once_with('dead_queue_test_consumers', 'stale')
+
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    def test_release_failed_events(self, mock_get_redis_connection):
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        redis_mock.hgetall.return_value = {}
+        redis_mock.rpoplpush.side_effect = [b'{"name": "a"}', None]
+
+        router = SyncEventsRouter(processors=[], backend_name='test')
+        self.assertEqual(router.release_failed_events('worker'), 1)
+
+        redis_mock.rpoplpush.assert_called_with('dead_queue_test_processing_worker', router.dead_queue)
+        redis_mock.hdel.assert_called_once_with('dead_queue_test_consumers', 'worker')
+
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    def test_release_failed_events_releases_spilled_files(self, mock_get_redis_connection):
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        redis_mock.rpoplpush.return_value = None
+        redis_mock.hgetall.return_value = {b'first.jsonl.gz': b'worker', b'second.jsonl.gz': b'other'}
+
+        router = SyncEventsRouter(processors=[], backend_name='test')
+        self.assertEqual(router.release_failed_events('worker'), 0)
+
+        redis_mock.hgetall.assert_called_once_with('dead_queue_test_spill_claims')
+        self.assertEqual(redis_mock.hdel.mock_calls, [
+            call('dead_queue_test_spill_claims', b'first.jsonl.gz'),
+            call('dead_queue_test_consumers', 'worker'),
+        ])
+
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    def test_claim_spilled_file(self, mock_get_redis_connection):
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        pipeline = redis_mock.pipeline.return_value
+        pipeline.execute.side_effect = [[0, 1], [0, 0]]
+
+        router = SyncEventsRouter(processors=[], backend_name='test')
+        self.assertTrue(router.claim_spilled_file('first.jsonl.gz', 'worker'))
+        self.assertFalse(router.claim_spilled_file('first.jsonl.gz', 'other'))
+
+        pipeline.hset.assert_called_with('dead_queue_test_consumers', 'other', ANY)
+        pipeline.hsetnx.assert_called_with('dead_queue_test_spill_claims', 'first.jsonl.gz', 'other')
+
+        router.ack_spilled_file('first.jsonl.gz')
+        redis_mock.hdel.assert_called_once_with('dead_queue_test_spill_claims', 'first.jsonl.gz')
+
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    def test_quarantine_events(self, mock_get_redis_connection):
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        events = [{'name': 'test', 'data': {'key': 'value'}}, {'name': 'test2'}]
+
+        router = SyncEventsRouter(processors=[], backend_name='test')
+        router.quarantine_events(events)
+
+        self.assertEqual(router.quarantine_queue, 'quarantine_queue_test')
+        redis_mock.lpush.assert_called_once_with(router.quarantine_queue, *[json_codec.dumps(e) for e in events])
+
+    @override_settings(
+        EVENT_ROUTING_BACKEND_BATCHING_ENABLED=True,
+        EVENT_ROUTING_BACKEND_BATCH_SIZE=2,
+        EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION=True,
+    )
+    @patch('event_routing_backends.backends.events_router.get_redis_connection')
+    @patch('event_routing_backends.backends.events_router.EventsRouter.bulk_send')
+    def test_queue_event_compressed(self, mock_bulk_send, mock_get_redis_connection):
+        redis_mock = MagicMock()
+        mock_get_redis_connection.return_value = redis_mock
+        event = {'name': 'test', 'timestamp': '2020-01-01T12:12:12', 'data': {'key': 'value'}}
+        legacy_event = {'name': 'legacy', 'timestamp': '2020-01-01T12:12:12'}
+        redis_mock.lpush.return_value = 2
+        redis_mock.rpop.return_value = [json_codec.dumps_bytes(legacy_event), queue_encoding.encode(event)]
+
+        router = SyncEventsRouter(processors=[], backend_name='test')
+        router.send(event)
+
+        payload = redis_mock.lpush.call_args[0][1]
+        self.assertEqual(payload[:1], bytes([queue_encoding.FORMAT_DEFLATE_V1]))
+        self.assertLess(len(payload), len(json_codec.dumps_bytes(event)))
+        mock_bulk_send.assert_called_once_with([legacy_event, event])
+
     @patch('event_routing_backends.backends.events_router.get_redis_connection')
     def test_get_failed_events_empty(self, mock_get_redis_connection):
         redis_mock = MagicMock()
@@ -1349,3 +1626,293 @@ class TestSyncEventsRouter(TestEventsRouter):  # pylint: disable=test-inherits-t
         events = router.get_failed_events(1)
 
         self.assertEqual(events, [])
+
+    def test_bulk_send_with_splitting_isolates_rejected_event(self):
+        events = [{'id': str(i)} for i in range(5)]
+        client = MagicMock()
+
+        def bulk_send(batch):
+            if {'id': '3'} in batch:
+                raise EventRejected
+            return [event['id'] for event in batch]
+
+        client.bulk_send.side_effect = bulk_send
+
+        with patch('event_routing_backends.tasks.logger') as mock_logger:
+            self.assertEqual(bulk_send_with_splitting(client, events), ([], None))
+
+        mock_logger.error.assert_called_once_with("Event rejected by the receiver and dropped: {'id': '3'}")
+        self.assertEqual(
+            [c.args[0] for c in client.bulk_send.call_args_list],
+            [events, events[:2], events[2:], events[2:3], events[3:], events[3:4], events[4:]],
+        )
+
+    def test_bulk_send_with_splitting_does_not_split_other_failures(self):
+        events = [{'id': str(i)} for i in range(5)]
+        client = MagicMock()
+        client.bulk_send.side_effect = EventNotDispatched(retry_after=30)
+
+        self.assertEqual(bulk_send_with_splitting(client, events), (events, 30))
+        client.bulk_send.assert_called_once_with(events)
+
+    def test_bulk_send_with_splitting_keeps_longest_retry_after(self):
+        events = [{'id': str(i)} for i in range(4)]
+        client = MagicMock()
+        client.bulk_send.side_effect = [
+            EventRejected, EventNotDispatched(retry_after=10), EventRejected,
+            EventNotDispatched(retry_after=60), ['3'],
+        ]
+
+        self.assertEqual(bulk_send_with_splitting(client, events), (events[:3], 60))
+
+    def test_bulk_send_with_splitting_missing_accepted_ids(self):
+        events = [{'id': '1'}, {'id': '2'}, {'id': '3'}]
+        client = MagicMock()
+        client.bulk_send.return_value = ['1', '3']
+
+        self.assertEqual(bulk_send_with_splitting(client, events), ([{'id': '2'}], None))
+
+        client.bulk_send.return_value = None
+        self.assertEqual(bulk_send_with_splitting(client, events), ([], None))
+
+    @patch('event_routing_backends.tasks.LrsClient.bulk_send')
+    def test_bulk_send_events_retries_failed_events_only(self, mock_bulk_send):
+        events = [{'id': '1'}, {'id': '2'}]
+        host_config = {'url': 'http://test3.com', 'version': '1.0.3', 'auth_scheme': 'Basic',
+                       'username': 'abc', 'password': 'xyz'}
+        mock_bulk_send.return_value = ['1']
+        task = MagicMock()
+        task.request.retries = 0
+        task.retry.return_value = Exception('retry')
+
+        with self.assertRaises(Exception):
+            bulk_send_events(task, events, 'XAPI_LRS', host_config)
+
+        task.retry.assert_called_once_with(
+            args=([{'id': '2'}], 'XAPI_LRS', host_config),
+            exc=ANY,
+            countdown=ANY,
+            max_retries=3,
+        )
+
+    @patch('event_routing_backends.tasks.get_retry_countdown', return_value=12)
+    @patch('event_routing_backends.utils.http_client.requests.post')
+    def test_send_event_retry_after(self, mocked_post, mock_get_retry_countdown):
+        mocked_post.return_value = MagicMock(status_code=429, headers={'Retry-After': '120'})
+        task = MagicMock()
+        task.request.retries = 2
+        task.retry.return_value = Exception('retry')
+
+        with self.assertRaises(Exception):
+            send_event(task, 'test', {'id': '1'}, 'AUTH_HEADERS', {'url': 'http://test3.com'})
+
+        mock_get_retry_countdown.assert_called_once_with(2, 120.0)
+        task.retry.assert_called_once_with(exc=ANY, countdown=12, max_retries=3)
+
+    @patch('event_routing_backends.tasks.get_retry_countdown', return_value=12)
+    @patch('event_routing_backends.tasks.LrsClient.bulk_send', side_effect=EventNotDispatched(retry_after=120.0))
+    def test_bulk_send_events_retry_after(self, mock_bulk_send, mock_get_retry_countdown):
+        task = MagicMock()
+        task.request.retries = 1
+        task.retry.return_value = Exception('retry')
+        host_config = {'url': 'http://test3.com', 'version': '1.0.3'}
+
+        with self.assertRaises(Exception):
+            bulk_send_events(task, [{'id': '1'}], 'XAPI_LRS', host_config)
+
+        mock_bulk_send.assert_called_once()
+        mock_get_retry_countdown.assert_called_once_with(1, 120.0)
+        task.retry.assert_called_once_with(
+            args=([{'id': '1'}], 'XAPI_LRS', host_config), exc=ANY, countdown=12, max_retries=3
+        )
+
+    @patch('event_routing_backends.tasks.consume_retry_budget', return_value=False)
+    @patch('event_routing_backends.tasks.LrsClient.bulk_send', side_effect=EventNotDispatched)
+    def test_bulk_send_events_retry_budget_exhausted(self, mock_bulk_send, mock_consume_retry_budget):
+        task = MagicMock()
+        task.request.retries = 0
+
+        with self.assertRaises(EventNotDispatched):
+            bulk_send_events(task, [{'id': '1'}], 'XAPI_LRS', {'url': 'http://test3.com', 'version': '1.0.3'})
+
+        mock_bulk_send.assert_called_once()
+        mock_consume_retry_budget.assert_called_once_with('http://test3.com')
+        task.retry.assert_not_called()
+
+    @override_settings(EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD='claim_check', EVENT_ROUTING_BACKEND_MAX_RETRIES=3)
+    @patch('event_routing_backends.tasks.consume_retry_budget')
+    @patch('event_routing_backends.tasks.task_payload.pack_events')
+    @patch('event_routing_backends.tasks.LrsClient.bulk_send', side_effect=EventNotDispatched)
+    def test_bulk_send_events_max_retries_does_not_pack(self, mock_bulk_send, mock_pack_events,
+                                                        mock_consume_retry_budget):
+        task = MagicMock()
+        task.request.retries = 3
+
+        with self.assertRaises(EventNotDispatched):
+            bulk_send_events(task, [{'id': '1'}], 'XAPI_LRS', {'url': 'http://test3.com', 'version': '1.0.3'})
+
+        mock_bulk_send.assert_called_once()
+        mock_pack_events.assert_not_called()
+        mock_consume_retry_budget.assert_not_called()
+        task.retry.assert_not_called()
+
+    @ddt.data(
+        (400, EventRejected),
+        (422, EventRejected),
+        (429, EventNotDispatched),
+        (500, EventNotDispatched),
+    )
+    @ddt.unpack
+    @patch('event_routing_backends.utils.xapi_lrs_client.RemoteLRS')
+    def test_lrs_client_bulk_send_errors(self, status_code, expected_exception, mocked_remote_lrs):
+        mock_response = MagicMock()
+        mock_response.success = False
+        mock_response.response.code = status_code
+        mocked_remote_lrs.return_value.save_statements.return_value = mock_response
+        client = LrsClient(url='http://test3.com', version='1.0.3')
+
+        with self.assertRaises(EventNotDispatched) as context:
+            client.bulk_send([self.transformed_event])
+
+        self.assertIs(type(context.exception), expected_exception)
+
+    @patch('event_routing_backends.utils.xapi_lrs_client.RemoteLRS')
+    def test_lrs_client_bulk_send_returns_statement_ids(self, mocked_remote_lrs):
+        mock_response = MagicMock()
+        mock_response.success = True
+        mock_response.data = '["1", "2"]'
+        mocked_remote_lrs.return_value.save_statements.return_value = mock_response
+        client = LrsClient(url='http://test3.com', version='1.0.3')
+
+        self.assertEqual(client.bulk_send([self.transformed_event]), ['1', '2'])
+
+    @ddt.data((400, EventRejected), (401, EventNotDispatched), (503, EventNotDispatched))
+    @ddt.unpack
+    @patch('event_routing_backends.utils.http_client.requests.post')
+    def test_http_client_bulk_send_errors(self, status_code, expected_exception, mocked_post):
+        mocked_post.return_value = MagicMock(status_code=status_code)
+        client = HttpClient(url='http://test3.com', auth_scheme=RouterConfiguration.AUTH_BEARER, auth_key='key')
+
+        with self.assertRaises(EventNotDispatched) as context:
+            client.bulk_send([{'id': '1'}])
+
+        self.assertIs(type(context.exception), expected_exception)
+
+    def test_configure_host_rate_limit(self):
+        router = RouterConfigurationFactory.create(
+            backend_name=RouterConfiguration.XAPI_BACKEND,
+            route_url='http://test3.com',
+            auth_scheme=None,
+            max_requests_per_second=5,
+        )
+
+        host = SyncEventsRouter(processors=[], backend_name='test').configure_host({}, router)
+
+        self.assertEqual(host['host_configurations'], {
+            'url': 'http://test3.com',
+            'auth_scheme': None,
+            'rate_limit': {'requests_per_second': 5, 'statements_per_second': None},
+        })
+
+    @patch('event_routing_backends.tasks.RateLimiter.wait')
+    @patch('event_routing_backends.tasks.LrsClient')
+    def test_bulk_send_events_rate_limit(self, mock_lrs_client, mock_wait):
+        events = [{'id': '1'}, {'id': '2'}]
+        mock_lrs_client.return_value.bulk_send.return_value = None
+        host_config = {'url': 'http://test3.com', 'rate_limit': {'statements_per_second': 10}}
+
+        with patch.dict('event_routing_backends.tasks.ROUTER_STRATEGY_MAPPING', {'XAPI_LRS': mock_lrs_client}):
+            bulk_send_events(None, events, 'XAPI_LRS', host_config)
+
+        mock_lrs_client.assert_called_once_with(url='http://test3.com')
+        mock_wait.assert_called_once_with(2)
+
+    @override_settings(EVENT_ROUTING_BACKEND_COALESCING_ENABLED=True)
+    @patch('event_routing_backends.tasks.send_event')
+    @patch('event_routing_backends.tasks.get_coalescer')
+    def test_dispatch_event_coalesced(self, mock_get_coalescer, mock_send_event):
+        host_config = {'url': 'http://test3.com'}
+        dispatch_event('test', {'id': '1'}, 'XAPI_LRS', host_config)
+
+        mock_get_coalescer.assert_called_once_with(send_coalesced_events)
+        mock_get_coalescer.return_value.add.assert_called_once_with({'id': '1'}, 'XAPI_LRS', host_config)
+        mock_send_event.assert_not_called()
+
+        # Eager tasks keep sending events on their own
+        dispatch_event.apply(args=('test', {'id': '2'}, 'XAPI_LRS', host_config))
+        mock_send_event.assert_called_once()
+        mock_get_coalescer.return_value.add.assert_called_once()
+
+    @patch('event_routing_backends.tasks.dispatch_bulk_events')
+    @patch('event_routing_backends.tasks.LrsClient')
+    def test_send_coalesced_events(self, mock_lrs_client, mock_dispatch_bulk_events):
+        events = [{'id': '1'}, {'id': '2'}]
+        host_config = {'url': 'http://test3.com'}
+
+        with patch.dict('event_routing_backends.tasks.ROUTER_STRATEGY_MAPPING', {'XAPI_LRS': mock_lrs_client}):
+            mock_lrs_client.return_value.bulk_send.return_value = ['1', '2']
+            send_coalesced_events(events, 'XAPI_LRS', host_config)
+            mock_dispatch_bulk_events.delay.assert_not_called()
+
+            mock_lrs_client.return_value.bulk_send.return_value = ['1']
+            send_coalesced_events(events, 'XAPI_LRS', host_config)
+            mock_dispatch_bulk_events.delay.assert_called_once_with([{'id': '2'}], 'XAPI_LRS', host_config)
+
+            mock_dispatch_bulk_events.reset_mock()
+            mock_lrs_client.side_effect = EventNotDispatched
+            send_coalesced_events(events, 'XAPI_LRS', host_config)
+            mock_dispatch_bulk_events.delay.assert_called_once_with(events, 'XAPI_LRS', host_config)
+
+        send_coalesced_events(events, 'INVALID', host_config)
+        mock_dispatch_bulk_events.delay.assert_called_once()
+
+    @override_settings(EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD='compressed')
+    @patch('event_routing_backends.tasks.task_payload.release_events')
+    @patch('event_routing_backends.tasks.bulk_send_events')
+    def test_dispatch_bulk_events_compressed(self, mock_bulk_send_events, mock_release_events):
+        events = [{'id': '1'}, {'id': '2'}]
+        payload = pack_events(events)
+        mock_bulk_send_events.side_effect = EventNotDispatched
+
+        with self.assertRaises(EventNotDispatched):
+            dispatch_bulk_events(payload, 'XAPI_LRS', {'url': 'http://test3.com'})
+
+        mock_bulk_send_events.assert_called_once_with(ANY, events, 'XAPI_LRS', {'url': 'http://test3.com'})
+        mock_release_events.assert_called_once_with(payload)
+
+    @override_settings(EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_EVENTS=2)
+    @patch('event_routing_backends.utils.http_client.requests.post')
+    def test_http_client_bulk_send_merged_envelopes(self, mocked_post):
+        envelopes = [
+            {'sensor': 'http://lms', 'sendTime': str(i), 'data': [{'id': str(i)}], 'dataVersion': 'v1p1'}
+            for i in range(5)
+        ]
+        mocked_post.side_effect = [MagicMock(status_code=200), MagicMock(status_code=200), MagicMock(status_code=503)]
+        client = HttpClient(url='http://test3.com', auth_scheme=RouterConfiguration.AUTH_BEARER, auth_key='key')
+
+        self.assertEqual(client.bulk_send(envelopes), ['0', '1', '2', '3'])
+
+        payloads = [c.kwargs['json'] for c in mocked_post.call_args_list]
+        self.assertEqual(
+            [[event['id'] for event in payload['data']] for payload in payloads],
+            [['0', '1'], ['2', '3'], ['4']],
+        )
+        self.assertEqual(len({payload['sendTime'] for payload in payloads}), 1)
+
+        # Nothing delivered, the failure is raised
+        mocked_post.side_effect = [MagicMock(status_code=400)]
+        with self.assertRaises(EventRejected):
+            client.bulk_send(envelopes[:2])
+
+        # Plain events keep being sent as one array
+        mocked_post.reset_mock(side_effect=True)
+        mocked_post.return_value = MagicMock(status_code=200)
+        self.assertIsNone(client.bulk_send([{'id': '1'}, {'id': '2'}]))
+        mocked_post.assert_called_once()
+
+    def test_bulk_send_with_splitting_envelopes(self):
+        envelopes = [{'sensor': 'http://lms', 'data': [{'id': str(i)}]} for i in range(3)]
+        client = MagicMock()
+        client.bulk_send.return_value = ['0', '2']
+
+        self.assertEqual(bulk_send_with_splitting(client, envelopes), (envelopes[1:2], None))
@@ -0,0 +1,118 @@
+"""
+Test the Redis Streams batching queue.
+"""
+from unittest.mock import MagicMock, call, patch
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from redis.exceptions import ResponseError
+
+from event_routing_backends.backends.stream_queue import RedisStreamQueue
+
+
+@override_settings(
+    EVENT_ROUTING_BACKEND_BATCH_SIZE=3,
+    EVENT_ROUTING_BACKEND_STREAM_MAXLEN=1000,
+    EVENT_ROUTING_BACKEND_STREAM_CLAIM_IDLE_TIME=60,
+)
+class TestRedisStreamQueue(TestCase):
+    """
+    Test cases for RedisStreamQueue.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.redis = MagicMock()
+        self.pipeline = self.redis.pipeline.return_value
+        self.redis.xautoclaim.return_value = [b'0-0', [], []]
+        self.redis.xreadgroup.return_value = []
+        self.redis.xinfo_groups.return_value = [{'name': b'events_router', 'pending': 2, 'lag': 5}]
+        self.redis.xinfo_consumers.return_value = [{'name': b'worker-1', 'pending': 2, 'idle': 1500}]
+        self.queue = RedisStreamQueue('xapi')
+
+    def test_ensure_group(self):
+        self.redis.xgroup_create.side_effect = ResponseError('BUSYGROUP Consumer Group name already exists')
+
+        self.queue.ensure_group(self.redis)
+        self.queue.ensure_group(self.redis)
+
+        self.redis.xgroup_create.assert_called_once_with('events_router_stream_xapi', 'events_router', id='0',
+                                                         mkstream=True)
+
+    def test_ensure_group_error(self):
+        self.redis.xgroup_create.side_effect = ResponseError('WRONGTYPE')
+
+        with self.assertRaises(ResponseError):
+            self.queue.ensure_group(self.redis)
+
+    def test_queue_event_below_batch_size(self):
+        self.pipeline.execute.return_value = [b'1-0', 2, []]
+        time_to_send = MagicMock(return_value=False)
+
+        self.assertIsNone(self.queue.queue_event(self.redis, '{"name": "a"}', time_to_send))
+
+        self.pipeline.xadd.assert_called_once_with(
+            'events_router_stream_xapi', {'event': '{"name": "a"}'}, maxlen=1000, approximate=True
+        )
+        time_to_send.assert_called_once_with()
+        self.redis.xreadgroup.assert_not_called()
+
+    @patch('event_routing_backends.backends.stream_queue.set_custom_attribute')
+    def test_queue_event_reads_batch(self, mock_set_custom_attribute):
+        self.pipeline.execute.return_value = [b'3-0', 3, [{'name': b'events_router', 'pending': 0, 'lag': 3}]]
+        self.redis.xautoclaim.return_value = [b'0-0', [(b'1-0', {b'event': b'a'}), (b'2-0', None)], []]
+        self.redis.xreadgroup.return_value = [[b'events_router_stream_xapi', [(b'3-0', {b'event': b'c'})]]]
+
+        batch = self.queue.queue_event(self.redis, 'c', MagicMock(return_value=False))
+
+        self.assertEqual(batch, [(b'1-0', b'a'), (b'3-0', b'c')])
+        self.redis.xautoclaim.assert_called_once_with(
+            'events_router_stream_xapi', 'events_router', self.queue.consumer, min_idle_time=60000, count=3
+        )
+        self.redis.xreadgroup.assert_called_once_with(
+            'events_router', self.queue.consumer, {'events_router_stream_xapi': '>'}, count=1
+        )
+        # The trimmed entry is acknowledged right away
+        self.pipeline.xack.assert_called_once_with('events_router_stream_xapi', 'events_router', b'2-0')
+        mock_set_custom_attribute.assert_has_calls([
+            call('events_router_stream_xapi_lag', 5),
+            call('events_router_stream_xapi_pending', 2),
+        ])
+
+    def test_queue_event_pending_entries_not_counted(self):
+        time_to_send = MagicMock(return_value=False)
+        # Another process is sending a batch, its entries are in the stream until they are acknowledged
+        self.pipeline.execute.return_value = [b'5-0', 5, [{'name': b'events_router', 'pending': 3, 'lag': 2}]]
+        self.assertIsNone(self.queue.queue_event(self.redis, 'e', time_to_send))
+
+        # Redis 6 doesn't report the lag
+        self.pipeline.execute.return_value = [b'5-0', 5, [{'name': 'events_router', 'pending': 3, 'lag': None}]]
+        self.assertIsNone(self.queue.queue_event(self.redis, 'e', time_to_send))
+
+        self.redis.xreadgroup.assert_not_called()
+
+    def test_get_unread_count(self):
+        self.assertEqual(RedisStreamQueue.get_unread_count(5, {'pending': 3, 'lag': 1}), 1)
+        self.assertEqual(RedisStreamQueue.get_unread_count(5, {'pending': 3}), 2)
+        self.assertEqual(RedisStreamQueue.get_unread_count(2, {'pending': 3, 'lag': None}), 0)
+        self.assertEqual(RedisStreamQueue.get_unread_count(5, None), 5)
+
+    def test_ack(self):
+        self.queue.ack(self.redis, [b'1-0', b'2-0'])
+
+        self.pipeline.xack.assert_called_once_with('events_router_stream_xapi', 'events_router', b'1-0', b'2-0')
+        self.pipeline.xdel.assert_called_once_with('events_router_stream_xapi', b'1-0', b'2-0')
+
+        self.redis.reset_mock()
+        self.queue.ack(self.redis, [])
+        self.redis.pipeline.assert_not_called()
+
+    def test_get_lag_metrics(self):
+        self.assertEqual(self.queue.get_lag_metrics(self.redis), {
+            'lag': 5,
+            'pending': 2,
+            'consumers': {'worker-1': {'pending': 2, 'idle': 1500}},
+        })
+
+        self.redis.xinfo_groups.return_value = []
+        self.assertEqual(self.queue.get_lag_metrics(self.redis), {'lag': None, 'pending': 0, 'consumers': {}})
@@ -3,16 +3,31 @@ Helper utilities for event transformers.
 """
 import datetime
 import logging
+import re
+import threading
 import uuid
 from functools import lru_cache
-from urllib.parse import parse_qs, urlparse
 
 from dateutil.parser import parse
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from edx_django_utils.cache.utils import get_cache_key
+from edx_django_utils.monitoring import increment
 from isodate import duration_isoformat
+from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
 
+from event_routing_backends.utils.block_ids import (  # pylint: disable=unused-import  # noqa: F401
+    BLOCK_ID_FORMAT,
+    get_block_id_from_event_data,
+    get_block_id_from_event_referrer,
+    get_block_version,
+    get_problem_block_id,
+    make_video_block_id,
+)
+from event_routing_backends.utils.ttl_cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
 # Imported from edx-platform
@@ -31,7 +46,20 @@ except ImportError as exc:  # pragma: no cover
 
 User = get_user_model()
 UTC_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
-BLOCK_ID_FORMAT = '{block_version}:{course_id}+type@{block_type}+block@{block_id}'
+# Calendar date and time, the format of tracking log timestamps, which `datetime.fromisoformat` parses
+ISO_DATETIME_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}')
+
+# Users loaded in bulk for the batch of events being transformed by this thread
+_prefetched = threading.local()
+
+# Courses loaded by `get_course_from_id` or `prefetch_courses`, by course id
+_courses = TTLCache(maxsize=128)
+
+# Usernames and user ids recently looked up by `get_user` without finding a user
+_unknown_users = TTLCache(maxsize=10000)
+
+# Anonymous user ids of this process, by username or id and external type, in front of the shared cache
+_external_user_ids = TTLCache(maxsize=10000)
 
 
 def get_uuid5(namespace_key, name):
@@ -46,14 +74,113 @@ def get_uuid5(namespace_key, name):
         str
 
     """
+    return uuid.uuid5(get_uuid5_namespace(namespace_key), name)
+
+
+@lru_cache(maxsize=1024)
+def get_uuid5_namespace(namespace_key):
+    """
+    Return the custom UUID5 namespace of a key.
+
+    Namespace keys are mostly made of verbs, so the few distinct namespaces are cached.
+
+    Arguments:
+    namespace_key (str):    key to be used to create a custom namespace
+
+    Returns:
+        UUID
+    """
     # We are not pulling base uuid from settings to avoid
     # data discrepancies incase setting is changed inadvertently
     base_uuid = uuid.UUID('6ba7b810-9dad-11d1-80b4-00c04fd430c8')
-    base_namespace = uuid.uuid5(base_uuid, namespace_key)
-    return uuid.uuid5(base_namespace, name)
+    return uuid.uuid5(base_uuid, namespace_key)
+
+
+def get_prefetched(kind):
+    """
+    Return the objects of a kind prefetched by this thread, by key.
+
+    Arguments:
+        kind (str):     'users'
+
+    Returns:
+        dict
+    """
+    if not hasattr(_prefetched, kind):
+        setattr(_prefetched, kind, {})
+    return getattr(_prefetched, kind)
+
+
+def clear_prefetched():
+    """
+    Forget the users prefetched by this thread, once its batch of events is transformed.
+    """
+    _prefetched.__dict__.clear()
+
+
+def prefetch_users(usernames_or_ids, external_type=None):
+    """
+    Load the users of a batch of events with two queries, so that `get_user` finds them without querying.
+
+    Users are looked up by id first, then by username, like `get_user` does. Users that aren't
+    found are left to `get_user`, which also looks for retired users. Users that `get_user`
+    recently failed to find, and users whose anonymous id of `external_type` is cached by this
+    process, are not loaded.
+
+    Arguments:
+        usernames_or_ids (iterable):    usernames or user ids of the learners
+        external_type (str):            external type of the anonymous ids the users are needed for, if any
+    """
+    prefetched_users = get_prefetched('users')
+    ids, usernames = set(), set()
+    for username_or_id in usernames_or_ids:
+        if not username_or_id or str(username_or_id) in prefetched_users or _unknown_users.get(str(username_or_id)):
+            continue
+        if external_type and _external_user_ids.get((str(username_or_id), external_type)) is not None:
+            continue
+        try:
+            ids.add(int(username_or_id))
+        except ValueError:
+            usernames.add(str(username_or_id))
+
+    if ids:
+        for user in User.objects.filter(id__in=ids):
+            prefetched_users[str(user.id)] = user
+        usernames.update(str(user_id) for user_id in ids if str(user_id) not in prefetched_users)
+    if usernames:
+        for user in User.objects.filter(username__in=usernames):
+            prefetched_users.setdefault(user.username, user)
+
+
+def prefetch_courses(course_ids):
+    """
+    Load the courses of a batch of events at once, so that `get_course_from_id` finds them without querying.
+
+    Courses already cached by this process are not loaded again.
+
+    Arguments:
+        course_ids (iterable):  IDs of the courses
+    """
+    if not get_course_overviews:
+        raise ImportError("Could not import course_overviews.api from edx-platform.")  # pragma: no cover
+
+    course_keys = []
+    for course_id in {course_id for course_id in course_ids if course_id}:
+        if _courses.get(course_id) is not None:
+            continue
+        try:
+            course_keys.append(CourseKey.from_string(course_id))
+        except InvalidKeyError:
+            # Left to get_course_from_id, which raises the error for the event
+            continue
+
+    if course_keys:
+        for course in get_course_overviews(course_keys):
+            course_id = getattr(course, 'id', None)
+            if course_id is not None:
+                _courses.set(str(course_id), course, None)
 
 
-@lru_cache
 def get_anonymous_user_id(username_or_id, external_type):
     """
     Generate anonymous user id.
@@ -61,6 +188,64 @@ def get_anonymous_user_id(username_or_id, external_type):
     Generate anonymous id for student.
     In case of anonymous user, return random uuid.
 
+    Ids are cached by each process and in the EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE cache shared by all of
+    them, so that workers don't each look up the ids of the same learners after a restart.
+
+    Arguments:
+        username_or_id (str):     username for the learner
+        external_type  (str):     external type id e.g. caliper or xapi
+
+    Returns:
+        str
+    """
+    local_key = (str(username_or_id), external_type)
+    anonymous_id = _external_user_ids.get(local_key)
+    if anonymous_id is not None:
+        return anonymous_id
+
+    ttl = getattr(settings, 'EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE_TTL', 86400)
+    shared_cache = get_external_id_cache()
+    if shared_cache is not None:
+        shared_key = get_cache_key(
+            namespace="event_routing_backends.external_user_id", resource=local_key[0], external_type=external_type
+        )
+        anonymous_id = shared_cache.get(shared_key)
+
+    if anonymous_id is None:
+        anonymous_id = create_anonymous_user_id(username_or_id, external_type)
+        if shared_cache is not None:
+            # Workers creating the same id at once get the same ExternalId, the first write is kept
+            shared_cache.add(shared_key, anonymous_id, ttl)
+
+    _external_user_ids.maxsize = getattr(settings, 'EVENT_ROUTING_BACKEND_EXTERNAL_ID_LOCAL_CACHE_SIZE', 10000)
+    _external_user_ids.set(local_key, anonymous_id, ttl)
+    return anonymous_id
+
+
+def get_external_id_cache():
+    """
+    Return the cache of anonymous user ids shared by all processes, None if it is disabled.
+
+    Returns:
+        django.core.cache.backends.base.BaseCache or None
+    """
+    alias = getattr(settings, 'EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE', 'default')
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def clear_external_user_ids():
+    """
+    Forget the anonymous user ids cached by this process.
+    """
+    _external_user_ids.clear()
+
+
+def create_anonymous_user_id(username_or_id, external_type):
+    """
+    Get the anonymous user id of a learner from the database, creating it if it doesn't exist.
+
     Arguments:
         username_or_id (str):     username for the learner
         external_type  (str):     external type id e.g. caliper or xapi
@@ -116,6 +301,13 @@ def get_user(username_or_id):
     if not username_or_id:
         return None
 
+    prefetched_users = get_prefetched('users')
+    if str(username_or_id) in prefetched_users:
+        return prefetched_users[str(username_or_id)]
+
+    if is_unknown_user(username_or_id):
+        return None
+
     try:
         user = User.objects.get(id=int(username_or_id))
     except (User.DoesNotExist, ValueError):
@@ -128,9 +320,52 @@ def get_user(username_or_id):
         except Exception as ex:  # pylint: disable=broad-except
             logger.info('User with username "%s" does not exist.%s', username, ex)
 
+    if not user:
+        remember_unknown_user(username_or_id)
+
     return user
 
 
+def is_unknown_user(username_or_id):
+    """
+    Return whether `get_user` recently failed to find the user, counting hits and misses in monitoring.
+
+    Arguments:
+        username_or_id (str):     username or user id of the learner
+
+    Returns:
+        bool
+    """
+    if _unknown_users.get(str(username_or_id)):
+        increment('event_routing_backends.unknown_user_cache.hits')
+        return True
+    increment('event_routing_backends.unknown_user_cache.misses')
+    return False
+
+
+def remember_unknown_user(username_or_id):
+    """
+    Remember that a user does not exist for EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_TTL seconds.
+
+    Events of bots, deleted accounts and malformed user ids are then transformed without querying
+    the database again for each of them.
+
+    Arguments:
+        username_or_id (str):     username or user id of the learner
+    """
+    _unknown_users.maxsize = getattr(settings, 'EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_SIZE', 10000)
+    _unknown_users.set(
+        str(username_or_id), True, getattr(settings, 'EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_TTL', 60)
+    )
+
+
+def clear_unknown_users():
+    """
+    Forget the users that `get_user` failed to find, e.g. once they have been created.
+    """
+    _unknown_users.clear()
+
+
 def get_user_email(username_or_id):
     """
     Get user's email from username or user id.
@@ -152,11 +387,12 @@ def get_user_email(username_or_id):
     return user_email
 
 
-@lru_cache
 def get_course_from_id(course_id):
     """
     Get Course object using the `course_id`.
 
+    The most recently used courses are cached by the process.
+
     Arguments:
         course_id (str) :   ID of the course
 
@@ -166,13 +402,25 @@ def get_course_from_id(course_id):
     if not get_course_overviews:
         raise ImportError("Could not import course_overviews.api from edx-platform.")  # pragma: no cover
 
+    course = _courses.get(course_id)
+    if course is not None:
+        return course
+
     course_key = CourseKey.from_string(course_id)
     course_overviews = get_course_overviews([course_key])
     if course_overviews:
+        _courses.set(course_id, course_overviews[0], None)
         return course_overviews[0]
     raise ValueError(f"Course with id {course_id} does not exist.")
 
 
+def clear_courses():
+    """
+    Forget the courses cached by this process.
+    """
+    _courses.clear()
+
+
 def convert_seconds_to_iso(seconds):
     """
     Convert seconds from integer to ISO format.
@@ -218,7 +466,7 @@ def convert_datetime_to_iso(current_datetime):
     """
     # convert current_datetime to a datetime object if it is string
     if isinstance(current_datetime, str):
-        current_datetime = parse(current_datetime)
+        return convert_iso_string_to_iso(current_datetime)
 
     utc_offset = current_datetime.utcoffset()
     utc_datetime = current_datetime - utc_offset
@@ -228,109 +476,57 @@ def convert_datetime_to_iso(current_datetime):
     return formatted_datetime
 
 
-def get_block_id_from_event_referrer(referrer):
+@lru_cache(maxsize=1024)
+def convert_iso_string_to_iso(datetime_string):
     """
-    Derive and return block id from event referrer.
-
-    Arguments:
-        referrer (str):   referrer string.
-
-    Returns:
-        str or None
-    """
-    if referrer is not None:
-        parsed = urlparse(referrer)
-        block_id = parse_qs(parsed.query)['activate_block_id'][0]\
-            if 'activate_block_id' in parse_qs(parsed.query) and parse_qs(parsed.query)['activate_block_id'][0] \
-            else None
-
-    else:
-        block_id = None
-
-    return block_id
+    Convert a datetime string into UTC format.
 
-
-def get_block_id_from_event_data(data, course_id):
-    """
-    Derive and return block id from event data.
+    Timestamps in the tracking log format are parsed with `datetime.fromisoformat`, other ones
+    with dateutil. Results are cached, as the child events of an event share its timestamp.
 
     Arguments:
-        data (str):   data string.
-        course_id       (str) : course key string
+        datetime_string (str):     datetime string
 
     Returns:
-        str or None
-    """
-    if data is not None and course_id is not None:
-        data_array = data.split('_')
-        course_id_array = course_id.split(':')
-        block_version = get_block_version(course_id)
-        if len(data_array) > 1 and len(course_id_array) > 1:
-            block_id = BLOCK_ID_FORMAT.format(
-                block_version=block_version,
-                course_id=course_id_array[1],
-                block_type='problem',
-                block_id=data_array[1]
-            )
-        else:
-            block_id = None  # pragma: no cover
-    else:
-        block_id = None
-
-    return block_id
+        str
+    """
+    current_datetime = None
+    if ISO_DATETIME_PATTERN.match(datetime_string):
+        try:
+            current_datetime = datetime.datetime.fromisoformat(datetime_string)
+        except ValueError:
+            pass
+    if current_datetime is None:
+        current_datetime = parse(datetime_string)
+    return convert_datetime_to_iso(current_datetime)
 
 
-def get_problem_block_id(referrer, data, course_id):
+def backend_cache_ttl():
     """
-    Derive and return block id from event data.
-
-    Arguments:
-        referrer (str):   referrer string.
-        data (str):   data string.
-        course_id       (str) : course key string
+    Return cache time out.
 
     Returns:
-        str or None
+        int
     """
-    block_id = get_block_id_from_event_referrer(referrer)
-    if block_id is None:
-        block_id = get_block_id_from_event_data(
-            data,
-            course_id
-        )
-
-    return block_id
+    return getattr(settings, 'EVENT_TRACKING_BACKENDS_CACHE_TTL', 600)
 
 
-def make_video_block_id(video_id, course_id):
+def get_dispatched_event_id(event):
     """
-    Return formatted video block id for provided video and course.
+    Return the ID of a transformed event, as dispatched to a router.
 
     Arguments:
-        video_id        (str) : id for the video object
-        course_id       (str) : course key string
-
-    Returns:
-        str
-    """
-    course_id_array = course_id.split(':')
-    block_version = get_block_version(course_id)
-    return BLOCK_ID_FORMAT.format(
-        block_version=block_version,
-        course_id=course_id_array[1],
-        block_type='video',
-        block_id=video_id
-    )
-
-
-def backend_cache_ttl():
-    """
-    Return cache time out.
+        event (dict):   xAPI statement, Caliper event or Caliper envelope
 
     Returns:
-        int
+        str: the ID of the statement or event, or of the only event of an envelope. None if there is none.
     """
-    return getattr(settings, 'EVENT_TRACKING_BACKENDS_CACHE_TTL', 600)
+    if 'id' in event:
+        return event['id']
+    data = event.get('data')
+    if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
+        return data[0].get('id')
+    return None
 
 
 def get_business_critical_events():
@@ -345,21 +541,3 @@ def get_business_critical_events():
         'edx.course.enrollment.deactivated',
         'edx.course.grade.passed.first_time'
     ])
-
-
-def get_block_version(course_id):
-    """
-    Return versioned block id.
-
-    Arguments:
-        course_id (str):    course id
-        block_id (str):     block id
-
-    Returns:
-        str
-    """
-    course_id_array = course_id.split(':')
-    block_version = "block-{0}".format(course_id_array[0].split("-")[-1])
-    if "ccx" in course_id_array[0]:
-        block_version = "ccx-{block_version}".format(block_version=block_version)
-    return block_version
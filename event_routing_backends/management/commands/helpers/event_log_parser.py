@@ -3,14 +3,34 @@ Support for reading tracking event logs.
 
 Taken entirely from edx-analytics-pipeline.
 """
-import json
 import logging
 import re
 from json.decoder import JSONDecodeError
 
+from event_routing_backends.utils import json_codec
+
 log = logging.getLogger(__name__)
 
 PATTERN_JSON = re.compile(r'^.*?(\{.*\})\s*$')
+PATTERN_NAME = re.compile(r'"name"\s*:\s*"([^"\\]*)"')
+
+
+def get_event_names(line):
+    """
+    Cheaply find the values of all "name" keys in a tracking log line, without parsing it as JSON.
+
+    The top level event name is one of the returned values, but nested "name" keys are returned
+    too, so callers should only use this to rule events out. Returns None if the names can't be
+    found reliably (no "name" key, or one whose value isn't a plain string), in which case the line
+    needs to be fully parsed.
+
+    Arguments:
+    * line:  the eventlog text
+    """
+    names = PATTERN_NAME.findall(line)
+    if not names or len(names) != line.count('"name"'):
+        return None
+    return names
 
 
 def parse_json_event(line):
@@ -22,7 +42,7 @@ def parse_json_event(line):
     """
     try:
         json_match = PATTERN_JSON.match(line)
-        parsed = json.loads(json_match.group(1))
+        parsed = json_codec.loads(json_match.group(1))
 
         # The representation of an event that event-routing-backends receives
         # from the async sender if significantly different from the one that
@@ -33,7 +53,7 @@ def parse_json_event(line):
         try:
             # The async version uses "data" for what the log file calls "event".
             # Sometimes "event" is a nested string of JSON that needs to be parsed.
-            parsed["data"] = json.loads(parsed["event"])
+            parsed["data"] = json_codec.loads(parsed["event"])
         except (TypeError, JSONDecodeError):
             # If it's a TypeError then the "event" was not a string to be parsed,
             # so probably already a dict. If it's a JSONDecodeError that means the
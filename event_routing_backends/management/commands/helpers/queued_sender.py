@@ -2,14 +2,79 @@
 Class to handle batching and sending bulk transformed statements.
 """
 import datetime
-import json
+import itertools
 import os
-from io import BytesIO
+import zlib
 from time import sleep
 
 from eventtracking.tracker import get_tracker
 
-from event_routing_backends.management.commands.helpers.event_log_parser import parse_json_event
+from event_routing_backends.management.commands.helpers.event_log_parser import get_event_names, parse_json_event
+from event_routing_backends.models import RouterConfiguration
+from event_routing_backends.processors.transformer_utils.registry import TransformerRegistry
+from event_routing_backends.utils import json_codec
+from event_routing_backends.utils.rate_limiter import RateLimiter
+
+_NO_EVENT = object()
+
+# Sleep between batches when neither --sleep_between_batches_secs nor router rate limits are set
+DEFAULT_SLEEP_BETWEEN_BATCHES_SECS = 10.0
+
+
+class StreamingEventWriter:
+    """
+    Lazily serialize events to newline-delimited JSON, for use with libcloud's `upload_object_via_stream`.
+
+    Only one serialized event is held in memory at a time. The events iterator may be shared
+    between several writers: iteration stops once roughly `max_bytes` have been produced, and
+    the next writer picks up from the following event. This lets callers roll output files by size.
+    """
+
+    def __init__(self, events, transform, max_bytes=None, compress=False):
+        """
+        Initialize the writer.
+
+        Arguments:
+            events (iterator):  iterator of events to be written
+            transform (func):   callable applied to each event before serialization
+            max_bytes (int):    stop after (approximately) this many output bytes, or never if None
+            compress (bool):    gzip the output
+        """
+        self.events = events
+        self.transform = transform
+        self.max_bytes = max_bytes
+        self.compress = compress
+
+        self.events_written = 0
+        self.bytes_written = 0
+        self.exhausted = False
+
+    def __iter__(self):
+        """
+        Yield the serialized, optionally gzipped, bytes for the events.
+        """
+        # wbits=31 produces a gzip container rather than a raw zlib stream
+        compressor = zlib.compressobj(wbits=31) if self.compress else None
+
+        for event in self.events:
+            data = json_codec.dumps_bytes(self.transform(event)) + b"\n"
+            self.events_written += 1
+
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                self.bytes_written += len(data)
+                yield data
+
+            if self.max_bytes and self.bytes_written >= self.max_bytes:
+                break
+        else:
+            self.exhausted = True
+
+        if compressor:
+            data = compressor.flush()
+            self.bytes_written += len(data)
+            yield data
 
 
 class QueuedSender:
@@ -23,9 +88,12 @@ class QueuedSender:
         destination_prefix,
         transformer_type,
         max_queue_size=10000,
-        sleep_between_batches_secs=1.0,
+        sleep_between_batches_secs=None,
         dry_run=False,
-        lrs_urls=None
+        lrs_urls=None,
+        max_file_size=None,
+        compress=False,
+        prefilter=True,
     ):
         self.destination = destination
         self.destination_container = destination_container
@@ -34,35 +102,90 @@ class QueuedSender:
         self.event_queue = []
         self.max_queue_size = max_queue_size
         self.sleep_between_batches = sleep_between_batches_secs
+        self.rate_limiters = None
         self.dry_run = dry_run
         self.lrs_urls = lrs_urls or []
+        self.max_file_size = max_file_size
+        self.compress = compress
+        self.prefilter = prefilter
 
         # Bookkeeping
         self.queued_lines = 0
         self.skipped_lines = 0
+        self.prefiltered_lines = 0
         self.unparsable_lines = 0
         self.batches_sent = 0
 
         self.tracker = get_tracker()
         self.engine = self.tracker.backends["event_transformer"]
         self.backend = self.engine.backends[self.transformer_type]
+        self.registry_revision = TransformerRegistry.revision
+        self.known_event_names = self.get_known_event_names(self.transformer_type)
+
+    def get_known_event_names(self, transformer_type=None):
+        """
+        Return the names of all events whitelisted or registered by any processor.
+
+        If `transformer_type` is given, names that the processors of that backend would
+        filter out (because they are not in its whitelist or transformer registry) are left out,
+        so that e.g. an xAPI run does not queue Caliper-only events.
+
+        Arguments:
+            transformer_type (str):  optional backend name, e.g. "xapi" or "caliper"
+
+        Returns:
+            frozenset of str
+        """
+        known_event_names = set()
+        for processor in self.engine.processors:
+            if hasattr(processor, 'whitelist'):
+                known_event_names.update(processor.whitelist)
+            if hasattr(processor, 'registry'):
+                known_event_names.update(processor.registry.mapping)
+
+        if transformer_type:
+            for processor in getattr(self.engine.backends[transformer_type], 'processors', []):
+                if hasattr(processor, 'whitelist'):
+                    known_event_names.intersection_update(processor.whitelist)
+                if hasattr(processor, 'registry'):
+                    known_event_names.intersection_update(processor.registry.mapping)
+
+        return frozenset(known_event_names)
+
+    def refresh_known_event_names(self):
+        """
+        Recompute the known event names if a transformer was registered since they were computed.
+        """
+        if self.registry_revision != TransformerRegistry.revision:
+            self.registry_revision = TransformerRegistry.revision
+            self.known_event_names = self.get_known_event_names(self.transformer_type)
 
     def is_known_event(self, event):
         """
-        Check whether any processor cares about this event.
+        Check whether the processors for our transformer type care about this event.
         """
-        if "name" in event:
-            for processor in self.engine.processors:
-                if hasattr(processor, 'whitelist') and event["name"] in processor.whitelist:
-                    return True
-                elif hasattr(processor, 'registry') and event["name"] in processor.registry.mapping:
-                    return True
-        return False
+        if "name" not in event:
+            return False
+
+        self.refresh_known_event_names()
+        return event["name"] in self.known_event_names
 
     def transform_and_queue(self, line):
         """
         Queue the JSON representation of this log line, if valid and known to any processor.
+
+        Most lines are for events we don't transform, so unless prefiltering is turned off we
+        first look for the event name with a cheap scan and skip the line without parsing it
+        when none of the names found are known.
         """
+        if self.prefilter:
+            self.refresh_known_event_names()
+            names = get_event_names(line)
+            if names is not None and self.known_event_names.isdisjoint(names):
+                self.skipped_lines += 1
+                self.prefiltered_lines += 1
+                return
+
         event = parse_json_event(line)
 
         if not event:
@@ -92,8 +215,38 @@ class QueuedSender:
                     self.store()
 
                 self.batches_sent += 1
+            batch_size = len(self.event_queue)
             self.event_queue.clear()
-            sleep(self.sleep_between_batches)
+            sleep(self.get_sleep_between_batches(batch_size))
+
+    def get_rate_limiters(self):
+        """
+        Return the rate limiters of the routers the events are sent to.
+        """
+        if self.rate_limiters is None:
+            routers = RouterConfiguration.get_enabled_routers(self.backend.backend_name) or []
+            self.rate_limiters = [
+                RateLimiter(router.route_url, **router.get_rate_limit())
+                for router in routers
+                if router.get_rate_limit() and (not self.lrs_urls or router.route_url in self.lrs_urls)
+            ]
+        return self.rate_limiters
+
+    def get_sleep_between_batches(self, batch_size):
+        """
+        Return the seconds to wait after sending a batch.
+
+        If no sleep was given and the events are sent to routers with rate limits, batches are
+        paced at the rate of the slowest router, so that the command doesn't queue up more
+        events than the routers accept.
+        """
+        if self.sleep_between_batches is not None:
+            return self.sleep_between_batches
+        if self.destination == "LRS" and not self.dry_run:
+            rate_limiters = self.get_rate_limiters()
+            if rate_limiters:
+                return max(rate_limiter.get_interval(batch_size) for rate_limiter in rate_limiters)
+        return DEFAULT_SLEEP_BETWEEN_BATCHES_SECS
 
     def send(self):
         """
@@ -123,21 +276,38 @@ class QueuedSender:
         container = self.destination.get_container(self.destination_container)
 
         datestr = datetime.datetime.now().strftime('%y-%m-%d_%H-%M-%S')
-        object_name = f"{self.destination_prefix}/{datestr}_{self.transformer_type}.log"
-        print(f"Writing to {self.destination_container}/{object_name}")
-
-        out = BytesIO()
-        for event in self.event_queue:
-            transformed_event = self.engine.processors[0](event)
-            out.write(str.encode(json.dumps(transformed_event)))
-            out.write(str.encode("\n"))
-        out.seek(0)
-
-        self.destination.upload_object_via_stream(
-            out,
-            container,
-            object_name
-        )
+        extension = "log.gz" if self.compress else "log"
+        events = iter(self.event_queue)
+        part = 0
+
+        # Events are serialized as the upload consumes them, and a new file is started each
+        # time the current one grows past max_file_size.
+        while True:
+            suffix = f"_{part}" if part else ""
+            object_name = f"{self.destination_prefix}/{datestr}_{self.transformer_type}{suffix}.{extension}"
+            print(f"Writing to {self.destination_container}/{object_name}")
+
+            writer = StreamingEventWriter(
+                events,
+                self.engine.processors[0],
+                max_bytes=self.max_file_size,
+                compress=self.compress,
+            )
+            self.destination.upload_object_via_stream(
+                iter(writer),
+                container,
+                object_name
+            )
+
+            if writer.exhausted:
+                break
+
+            # Don't start an empty file if the last one happened to end on the final event
+            next_event = next(events, _NO_EVENT)
+            if next_event is _NO_EVENT:
+                break
+            events = itertools.chain([next_event], events)
+            part += 1
 
     def finalize(self):
         """
@@ -162,3 +332,7 @@ class QueuedSender:
               f"could not parse {self.unparsable_lines} log lines, "
               f"skipped {self.skipped_lines} log lines, "
               f"sent {self.batches_sent} batches.")
+        if self.prefilter:
+            total_lines = self.queued_lines + self.unparsable_lines + self.skipped_lines
+            skip_rate = self.prefiltered_lines / total_lines if total_lines else 0
+            print(f"Skipped {self.prefiltered_lines} log lines ({skip_rate:.1%}) without parsing them.")
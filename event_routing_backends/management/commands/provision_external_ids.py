@@ -0,0 +1,202 @@
+"""
+Bulk create the missing xAPI and Caliper external ids of users.
+
+Anonymous user ids are otherwise created one at a time, the first time an event of a user is
+transformed. Running this before a backfill with transform_tracking_logs lets the transforms only
+read them.
+"""
+import time
+from itertools import islice
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand
+
+from event_routing_backends.helpers import ExternalId, ExternalIdType, User
+from event_routing_backends.management.commands.helpers.event_log_parser import parse_json_event
+from event_routing_backends.management.commands.transform_tracking_logs import (
+    CHUNK_SIZE,
+    _get_chunks,
+    _iter_lines,
+    get_libcloud_drivers,
+    get_source_config_from_options,
+    validate_source_and_files,
+)
+from event_routing_backends.processors.mixins.base_transformer import BaseTransformerMixin
+
+EXTERNAL_TYPES = ("XAPI", "CALIPER")
+
+
+def _batches(iterable, size):
+    """
+    Yield the items of an iterable in tuples of up to `size` items.
+    """
+    iterator = iter(iterable)
+    while batch := tuple(islice(iterator, size)):
+        yield batch
+
+
+def _rows_per_second(rows, elapsed):
+    """
+    Return the rate of rows created, 0 if no time has elapsed.
+    """
+    return rows / elapsed if elapsed > 0 else 0
+
+
+def get_usernames_or_ids_from_tracking_logs(source, source_container, source_prefix, chunk_size=None):
+    """
+    Return the usernames and user ids of the events of the tracking log files of the given source.
+
+    The user of an event is found the same way transformers find it.
+    """
+    usernames_or_ids = set()
+    container = source.get_container(container_name=source_container)
+    for file in source.iterate_container_objects(container, source_prefix):
+        print(f"Reading users from file {file}...")
+        for line in _iter_lines(_get_chunks(source, file, chunk_size=chunk_size)):
+            event = parse_json_event(line)
+            if not event:
+                continue
+            username_or_id = BaseTransformerMixin(event).extract_username_or_userid()
+            if username_or_id:
+                usernames_or_ids.add(str(username_or_id))
+    return usernames_or_ids
+
+
+def get_user_ids(usernames_or_ids, batch_size):
+    """
+    Return the ids of the users with the given usernames or ids, in batches of queries.
+
+    Like `get_user`, a value is looked up as an id first, then as a username. Retired users are not
+    looked up, their external ids are still created when their events are transformed.
+    """
+    ids, usernames = set(), set()
+    for username_or_id in usernames_or_ids:
+        try:
+            ids.add(int(username_or_id))
+        except ValueError:
+            usernames.add(username_or_id)
+
+    user_ids = set()
+    for batch in _batches(sorted(ids), batch_size):
+        found = set(User.objects.filter(id__in=batch).values_list("id", flat=True))
+        user_ids.update(found)
+        usernames.update(str(user_id) for user_id in batch if user_id not in found)
+    for batch in _batches(sorted(usernames), batch_size):
+        user_ids.update(User.objects.filter(username__in=batch).values_list("id", flat=True))
+    return sorted(user_ids)
+
+
+def provision_external_ids(user_ids, external_type, batch_size):
+    """
+    Bulk create the external ids of the given type that the given users are missing.
+
+    Rows created concurrently, e.g. by events being transformed, are left as they are.
+
+    Arguments:
+        user_ids (iterable):    ids of the users
+        external_type (str):    'XAPI' or 'CALIPER'
+        batch_size (int):       number of users per query
+
+    Returns:
+        int: number of external ids created
+    """
+    if not (ExternalId and ExternalIdType):
+        raise ImportError("Could not import external_user_ids from edx-platform.")  # pragma: no cover
+
+    external_id_type = ExternalIdType.objects.get(name=getattr(ExternalIdType, external_type))
+    created = 0
+    start = time.perf_counter()
+
+    for batch in _batches(user_ids, batch_size):
+        existing = set(
+            ExternalId.objects.filter(external_id_type=external_id_type, user_id__in=batch)
+            .values_list("user_id", flat=True)
+        )
+        external_ids = [
+            ExternalId(user_id=user_id, external_id_type=external_id_type)
+            for user_id in batch if user_id not in existing
+        ]
+        if external_ids:
+            ExternalId.objects.bulk_create(external_ids, ignore_conflicts=True)
+        created += len(external_ids)
+        rate = _rows_per_second(created, time.perf_counter() - start)
+        print(f"{external_type}: {created} external ids created, {rate:.0f} rows/sec")
+
+    return created
+
+
+class Command(BaseCommand):
+    """
+    Bulk create the missing xAPI and Caliper external ids of all users, or of the users of tracking logs.
+    """
+    help = dedent(__doc__).strip()
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--external_types',
+            nargs='+',
+            choices=EXTERNAL_TYPES,
+            default=list(EXTERNAL_TYPES),
+            help="The types of external ids to create, all of them by default.",
+        )
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            default=1000,
+            help="How many users to create the external ids of with each query.",
+        )
+        parser.add_argument(
+            '--source_provider',
+            type=str,
+            default=None,
+            help="An Apache Libcloud 'provider constant' from: "
+                 "https://libcloud.readthedocs.io/en/stable/storage/supported_providers.html . "
+                 "Ex: LOCAL for local storage or S3 for AWS S3. If given, only the users of the events of "
+                 "the tracking logs of this source get external ids, otherwise all users do.",
+        )
+        parser.add_argument(
+            '--source_config',
+            type=str,
+            help="A JSON dictionary of configuration for the source provider, as for transform_tracking_logs, "
+                 "with the 'container' and 'prefix' of the tracking log files.",
+        )
+        parser.add_argument(
+            '--chunk_size',
+            type=int,
+            default=CHUNK_SIZE,
+            help="Number of bytes to read at a time from each tracking log file.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Find the users and create their external ids.
+        """
+        batch_size = options["batch_size"]
+
+        if options["source_provider"]:
+            source_config, source_container, source_prefix = get_source_config_from_options(
+                options["source_config"]
+            )
+            source_driver, _ = get_libcloud_drivers(options["source_provider"], source_config, "LRS", None)
+            source_file_list = validate_source_and_files(source_driver, source_container, source_prefix)
+            print(f"Found {len(source_file_list)} source files: ", *source_file_list, sep="\n")
+
+            usernames_or_ids = get_usernames_or_ids_from_tracking_logs(
+                source_driver,
+                source_container,
+                source_prefix,
+                chunk_size=options["chunk_size"],
+            )
+            user_ids = get_user_ids(usernames_or_ids, batch_size)
+            print(f"Found {len(user_ids)} users out of {len(usernames_or_ids)} usernames and user ids")
+        else:
+            user_ids = list(User.objects.order_by("id").values_list("id", flat=True))
+
+        for external_type in options["external_types"]:
+            start = time.perf_counter()
+            created = provision_external_ids(user_ids, external_type, batch_size)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{external_type}: created {created} external ids for {len(user_ids)} users in {elapsed:.1f}s "
+                f"({_rows_per_second(created, elapsed):.0f} rows/sec)"
+            )
@@ -3,13 +3,17 @@ Management command for resending events when a failure occurs.
 """
 
 import logging
+import os
+import socket
 from textwrap import dedent
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from eventtracking.tracker import get_tracker
+from libcloud.storage.types import ObjectDoesNotExistError
 
-from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched
+from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched, EventRejected
+from event_routing_backends.utils.dead_queue_spill import get_spill_storage
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +36,29 @@ class Command(BaseCommand):
         parser.add_argument(
             "--batch_size",
             default=100,
+            type=int,
             help="The number of events to recover at a time. Default is 100.",
         )
+        parser.add_argument(
+            "--consumer",
+            default=None,
+            help="Unique name of this recovery process, used to track the events it is working on. Defaults to "
+                 "the host name and process ID.",
+        )
+        parser.add_argument(
+            "--stale_after",
+            default=3600,
+            type=int,
+            help="Seconds after which the events claimed by a recovery process that did not finish are put back "
+                 "in the dead queue. Default is 3600.",
+        )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Send each batch of events with a single bulk request. Batches that fail are split in "
+                 "halves until the failing events are isolated, which are then moved to the quarantine "
+                 "queue instead of being dropped.",
+        )
 
     def handle(self, *args, **options):
         """
@@ -56,25 +81,157 @@ class Command(BaseCommand):
         malformed = 0
         failed = 0
 
-        while failed_events := backend.get_failed_events(batch_size):
+        # Events are moved to a processing list for this consumer and only removed from there once they
+        # have been handled, so several recovery processes can run at the same time without losing events
+        # if any of them crashes.
+        consumer = options["consumer"] or "{}-{}".format(socket.gethostname(), os.getpid())
+        reclaimed = backend.reclaim_failed_events(options["stale_after"])
+        if reclaimed:
+            logger.info("Moved {} events of stale recovery processes back to the dead queue".format(reclaimed))
+
+        while failed_events := backend.get_failed_events(batch_size, consumer=consumer):
             logger.info(
                 "Recovering {} failed events for backend {}".format(
                     len(failed_events), transformer_type
                 )
             )
-            for event in failed_events:
-                try:
-                    backend.send(event)
-                    success += 1
-                except EventNotDispatched:
-                    logger.error("Malformed event: {}".format(event["name"]))
-                    malformed += 1
-                except Exception as e:  # pylint: disable=broad-except
-                    # Backend can still be in a bad state, so we need to catch all exceptions
-                    logger.error("Failed to send event: {}".format(e))
-                    failed += 1
+            try:
+                counts = self.recover_events(backend, failed_events, options["bulk"])
+            except Exception as e:  # pylint: disable=broad-except
+                # The receivers are failing, so the batch is left in the dead queue for a later recovery
+                logger.error("Stopping the recovery, could not send {} events: {}".format(len(failed_events), e))
+                backend.release_failed_events(consumer)
+                break
+            success, malformed, failed = success + counts[0], malformed + counts[1], failed + counts[2]
+            backend.ack_failed_events(consumer)
+        else:
+            counts = self.recover_spilled_events(backend, batch_size, options["bulk"], consumer)
+            success, malformed, failed = success + counts[0], malformed + counts[1], failed + counts[2]
 
         logger.info("Recovery process completed.")
         logger.info("Recovered events  : {}".format(success))
         logger.info("Failed to recover : {}".format(failed))
         logger.info("Malformed events  : {} ".format(malformed))
+
+    def recover_spilled_events(self, backend, batch_size, bulk, consumer):
+        """
+        Send the batches that did not fit in the dead queue, see `EventsRouter.push_to_dead_queue`.
+
+        Each file is claimed for `consumer` before it is read, so that parallel recovery processes
+        don't send it twice, and deleted once its events are handled. If they can't be sent, the
+        recovery stops and the file is released for a later one. The files claimed by a process that
+        crashed are released once it is stale, their events are then sent again.
+
+        Arguments:
+            backend (EventsRouter): backend to send the events with
+            batch_size (int):       number of events to send at a time
+            bulk (bool):            whether to send them with `bulk_recover`
+            consumer (str):         unique name of this recovery process
+
+        Returns:
+            tuple(int, int, int): number of recovered, malformed and failed events
+        """
+        success = malformed = failed = 0
+        storage = get_spill_storage()
+        if not storage:
+            return success, malformed, failed
+        for spilled in storage.list_spilled(backend.backend_name):
+            if not backend.claim_spilled_file(spilled.name, consumer):
+                continue
+            try:
+                failed_events = storage.read(spilled)
+            except ObjectDoesNotExistError:
+                # Another process recovered it since it was listed
+                backend.ack_spilled_file(spilled.name)
+                continue
+            logger.info(
+                "Recovering {} failed events for backend {} from {}".format(
+                    len(failed_events), backend.backend_name, spilled.name
+                )
+            )
+            for start in range(0, len(failed_events), batch_size):
+                try:
+                    counts = self.recover_events(backend, failed_events[start:start + batch_size], bulk)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.error("Stopping the recovery, could not send the events of {}: {}".format(spilled.name, e))
+                    backend.release_failed_events(consumer)
+                    return success, malformed, failed
+                success, malformed, failed = success + counts[0], malformed + counts[1], failed + counts[2]
+            storage.delete(spilled)
+            backend.ack_spilled_file(spilled.name)
+        backend.release_failed_events(consumer)
+        return success, malformed, failed
+
+    def recover_events(self, backend, failed_events, bulk):
+        """
+        Send one batch of failed events.
+
+        Arguments:
+            backend (EventsRouter):     backend to send the events with
+            failed_events (list[dict]): events to send
+            bulk (bool):                whether to send them with `bulk_recover`
+
+        Returns:
+            tuple(int, int, int): number of recovered, malformed and failed events
+        """
+        if bulk:
+            recovered, quarantined = self.bulk_recover(backend, failed_events)
+            if quarantined:
+                logger.info(
+                    "Moving {} events to the quarantine queue: {}".format(
+                        len(quarantined), backend.quarantine_queue
+                    )
+                )
+                backend.quarantine_events(quarantined)
+            return recovered, 0, len(quarantined)
+
+        success = malformed = failed = 0
+        for event in failed_events:
+            try:
+                backend.send(event)
+                success += 1
+            except EventNotDispatched:
+                logger.error("Malformed event: {}".format(event["name"]))
+                malformed += 1
+            except Exception as e:  # pylint: disable=broad-except
+                # Backend can still be in a bad state, so we need to catch all exceptions
+                logger.error("Failed to send event: {}".format(e))
+                failed += 1
+        return success, malformed, failed
+
+    def bulk_recover(self, backend, events):
+        """
+        Send the events with `bulk_send`, splitting the batch in halves whenever the receiver rejects it.
+
+        A single bad event makes the whole bulk request fail, so bisecting isolates it in
+        O(log n) extra requests and still sends the rest of the batch in bulk. Parts of a failed
+        batch may already have been delivered to some routers before the failure, in which case
+        they are sent again; the xAPI client treats the LRS's 409 response for known statement
+        IDs as delivered. Other failures, such as outages, don't depend on the events and are raised
+        without splitting the batch.
+
+        Note that with an asynchronous router `bulk_send` only queues celery tasks, so rejections
+        are not seen here and events are never quarantined.
+
+        Arguments:
+            backend (EventsRouter): backend to send the events with
+            events (list[dict]):    events popped from the dead queue
+
+        Returns:
+            tuple(int, list[dict]): number of recovered events and the events that were rejected on their own
+
+        Raises:
+            Exception: if sending failed for another reason than the events being rejected
+        """
+        try:
+            backend.bulk_send(events)
+            return len(events), []
+        except EventRejected as e:
+            if len(events) == 1:
+                logger.error("Failed to send event {}: {}".format(events[0].get("name"), e))
+                return 0, events
+
+        middle = len(events) // 2
+        recovered_head, failed_head = self.bulk_recover(backend, events[:middle])
+        recovered_tail, failed_tail = self.bulk_recover(backend, events[middle:])
+        return recovered_head + recovered_tail, failed_head + failed_tail
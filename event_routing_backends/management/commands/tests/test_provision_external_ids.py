@@ -0,0 +1,77 @@
+"""
+Tests for the provision_external_ids management command.
+"""
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from event_routing_backends.management.commands.provision_external_ids import get_user_ids
+from event_routing_backends.tests.factories import UserFactory
+
+COMMAND_PATH = "event_routing_backends.management.commands.provision_external_ids"
+TEST_DIR_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+@patch(COMMAND_PATH + ".ExternalIdType")
+@patch(COMMAND_PATH + ".ExternalId")
+class TestProvisionExternalIds(TestCase):
+    """
+    Test the provision_external_ids management command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # The user of the events of the tracking log fixture
+        self.log_user = UserFactory.create(id=6, username="bmtcril")
+        self.other_user = UserFactory.create(username="other")
+
+    def get_created_user_ids(self, mock_external_id):
+        """
+        Return the user ids of the external ids passed to bulk_create, for each call.
+        """
+        return [
+            [external_id.user_id for external_id in bulk_create_call.args[0]]
+            for bulk_create_call in mock_external_id.objects.bulk_create.call_args_list
+        ]
+
+    def test_all_users(self, mock_external_id, mock_external_id_type):
+        mock_external_id.side_effect = MagicMock
+        mock_external_id.objects.filter.return_value.values_list.return_value = [self.log_user.id]
+
+        call_command("provision_external_ids", batch_size=1)
+
+        mock_external_id_type.objects.get.assert_any_call(name=mock_external_id_type.XAPI)
+        mock_external_id_type.objects.get.assert_any_call(name=mock_external_id_type.CALIPER)
+        self.assertEqual(self.get_created_user_ids(mock_external_id), [[self.other_user.id]] * 2)
+        for bulk_create_call in mock_external_id.objects.bulk_create.call_args_list:
+            self.assertTrue(bulk_create_call.kwargs["ignore_conflicts"])
+
+    def test_tracking_log_users(self, mock_external_id, mock_external_id_type):
+        mock_external_id.side_effect = MagicMock
+        mock_external_id.objects.filter.return_value.values_list.return_value = []
+
+        with patch("sys.stdout") as mock_stdout:
+            call_command(
+                "provision_external_ids",
+                external_types=["XAPI"],
+                source_provider="LOCAL",
+                source_config=json.dumps({"key": TEST_DIR_PATH, "container": "fixtures", "prefix": "tracking"}),
+            )
+
+        mock_external_id_type.objects.get.assert_called_once_with(name=mock_external_id_type.XAPI)
+        self.assertEqual(self.get_created_user_ids(mock_external_id), [[self.log_user.id]])
+        output = "".join(str(write_call.args[0]) for write_call in mock_stdout.write.call_args_list)
+        self.assertIn("XAPI: created 1 external ids for 1 users", output)
+        self.assertIn("rows/sec", output)
+
+    def test_get_user_ids(self, mock_external_id, mock_external_id_type):  # pylint: disable=unused-argument
+        # An id that isn't the id of a user is looked up as a username
+        numeric_username = UserFactory.create(username="12345678")
+
+        with self.assertNumQueries(2):
+            user_ids = get_user_ids(["6", "12345678", "bmtcril", "other", "unknown"], batch_size=10)
+
+        self.assertEqual(user_ids, sorted([6, numeric_username.id, self.other_user.id]))
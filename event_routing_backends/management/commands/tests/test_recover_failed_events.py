@@ -2,14 +2,15 @@
 Tests for the transform_tracking_logs management command.
 """
 
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, Mock, call, patch
 
 from django.core.management import call_command
 from django.test import TestCase
 from django.test.utils import override_settings
 from eventtracking.django.django_tracker import DjangoTracker
+from libcloud.storage.types import ObjectDoesNotExistError
 
-from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched
+from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched, EventRejected
 
 XAPI_PROCESSOR = {
     "ENGINE": "event_routing_backends.backends.async_events_router.AsyncEventsRouter",
@@ -33,7 +34,7 @@ class Mocker:
     def __init__(self):
         self.called = False
 
-    def custom_get_failed_events(self, batch_size):
+    def custom_get_failed_events(self, batch_size, consumer=None):
         if not self.called:
             self.called = True
             return [{"name": "test"}]
@@ -162,3 +163,271 @@ class TestRecoverFailedEvents(TestCase):
         call_command("recover_failed_events", transformer_type="xapi")
 
         mock_backend.send.assert_not_called()
+
+    @override_settings(
+        EVENT_TRACKING_BACKENDS={
+            "event_transformer": {
+                "ENGINE": "eventtracking.backends.event_bus.EventBusRoutingBackend",
+                "OPTIONS": {
+                    "backends": {"xapi": XAPI_PROCESSOR},
+                },
+            },
+        }
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_tracker"
+    )
+    def test_bulk_recover(self, mock_get_tracker):
+        """
+        Test that bulk mode sends each batch with a single bulk_send call
+        """
+        tracker = DjangoTracker()
+        mock_get_tracker.return_value = tracker
+        mock_backend = Mock()
+        tracker.backends["event_transformer"].backends["xapi"] = mock_backend
+        mock_backend.get_failed_events = Mocker().custom_get_failed_events
+
+        call_command("recover_failed_events", transformer_type="xapi", bulk=True)
+
+        mock_backend.bulk_send.assert_called_once_with([{"name": "test"}])
+        mock_backend.send.assert_not_called()
+        mock_backend.quarantine_events.assert_not_called()
+
+    @override_settings(
+        EVENT_TRACKING_BACKENDS={
+            "event_transformer": {
+                "ENGINE": "eventtracking.backends.event_bus.EventBusRoutingBackend",
+                "OPTIONS": {
+                    "backends": {"xapi": XAPI_PROCESSOR},
+                },
+            },
+        }
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_tracker"
+    )
+    @patch("event_routing_backends.management.commands.recover_failed_events.logger")
+    def test_bulk_recover_quarantines_failing_events(self, mock_logger, mock_get_tracker):
+        """
+        Test that failing batches are bisected and only the failing events are quarantined
+        """
+        tracker = DjangoTracker()
+        mock_get_tracker.return_value = tracker
+        mock_backend = Mock()
+        tracker.backends["event_transformer"].backends["xapi"] = mock_backend
+        events = [{"name": f"event_{i}"} for i in range(8)]
+        mock_backend.get_failed_events.side_effect = [events, []]
+        poison = [events[2], events[7]]
+        sent = []
+
+        def bulk_send(batch):
+            if any(event in poison for event in batch):
+                raise EventRejected("Error")
+            sent.extend(batch)
+
+        mock_backend.bulk_send.side_effect = bulk_send
+
+        call_command("recover_failed_events", transformer_type="xapi", batch_size=8, bulk=True)
+
+        mock_backend.get_failed_events.assert_called_with(8, consumer=ANY)
+        self.assertEqual(sent, [event for event in events if event not in poison])
+        mock_backend.quarantine_events.assert_called_once_with(poison)
+        mock_logger.error.assert_any_call("Failed to send event event_2: Error")
+        mock_logger.info.assert_any_call("Recovered events  : 6")
+        mock_logger.info.assert_any_call("Failed to recover : 2")
+
+    @override_settings(
+        EVENT_TRACKING_BACKENDS={
+            "event_transformer": {
+                "ENGINE": "eventtracking.backends.event_bus.EventBusRoutingBackend",
+                "OPTIONS": {
+                    "backends": {"xapi": XAPI_PROCESSOR},
+                },
+            },
+        }
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_spill_storage"
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_tracker"
+    )
+    def test_bulk_recover_stops_on_outage(self, mock_get_tracker, mock_get_spill_storage):
+        """
+        Test that a batch that fails for another reason than a rejection is not split but left in the dead queue
+        """
+        tracker = DjangoTracker()
+        mock_get_tracker.return_value = tracker
+        mock_backend = Mock()
+        tracker.backends["event_transformer"].backends["xapi"] = mock_backend
+        events = [{"name": f"event_{i}"} for i in range(8)]
+        mock_backend.get_failed_events.side_effect = [events, events]
+        mock_backend.bulk_send.side_effect = EventNotDispatched("Service unavailable")
+
+        call_command("recover_failed_events", transformer_type="xapi", batch_size=8, bulk=True, consumer="worker-1")
+
+        mock_backend.bulk_send.assert_called_once_with(events)
+        mock_backend.get_failed_events.assert_called_once()
+        mock_backend.quarantine_events.assert_not_called()
+        mock_backend.ack_failed_events.assert_not_called()
+        mock_backend.release_failed_events.assert_called_once_with("worker-1")
+        mock_get_spill_storage.assert_not_called()
+
+    @override_settings(
+        EVENT_TRACKING_BACKENDS={
+            "event_transformer": {
+                "ENGINE": "eventtracking.backends.event_bus.EventBusRoutingBackend",
+                "OPTIONS": {
+                    "backends": {"xapi": XAPI_PROCESSOR},
+                },
+            },
+        }
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_tracker"
+    )
+    def test_recover_acknowledges_claimed_events(self, mock_get_tracker):
+        """
+        Test that stale claims are reclaimed first and that each handled batch is acknowledged
+        """
+        tracker = DjangoTracker()
+        mock_get_tracker.return_value = tracker
+        mock_backend = Mock()
+        tracker.backends["event_transformer"].backends["xapi"] = mock_backend
+        mock_backend.reclaim_failed_events.return_value = 3
+        mock_backend.get_failed_events.side_effect = [[{"name": "a"}], [{"name": "b"}], []]
+
+        call_command("recover_failed_events", transformer_type="xapi", consumer="worker-1", stale_after=60)
+
+        mock_backend.reclaim_failed_events.assert_called_once_with(60)
+        mock_backend.get_failed_events.assert_called_with(100, consumer="worker-1")
+        self.assertEqual(mock_backend.method_calls[1:], [
+            call.get_failed_events(100, consumer="worker-1"),
+            call.send({"name": "a"}),
+            call.ack_failed_events("worker-1"),
+            call.get_failed_events(100, consumer="worker-1"),
+            call.send({"name": "b"}),
+            call.ack_failed_events("worker-1"),
+            call.get_failed_events(100, consumer="worker-1"),
+        ])
+
+    @override_settings(
+        EVENT_TRACKING_BACKENDS={
+            "event_transformer": {
+                "ENGINE": "eventtracking.backends.event_bus.EventBusRoutingBackend",
+                "OPTIONS": {
+                    "backends": {"xapi": XAPI_PROCESSOR},
+                },
+            },
+        }
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_spill_storage"
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_tracker"
+    )
+    def test_recover_spilled_events(self, mock_get_tracker, mock_get_spill_storage):
+        """
+        Test that spilled files are read back in batches and deleted once handled
+        """
+        tracker = DjangoTracker()
+        mock_get_tracker.return_value = tracker
+        mock_backend = Mock(backend_name="xapi")
+        tracker.backends["event_transformer"].backends["xapi"] = mock_backend
+        mock_backend.get_failed_events.return_value = []
+        storage = mock_get_spill_storage.return_value
+        spilled = [Mock(), Mock()]
+        storage.list_spilled.return_value = spilled
+        storage.read.side_effect = [[{"name": "a"}, {"name": "b"}, {"name": "c"}], [{"name": "d"}]]
+
+        call_command("recover_failed_events", transformer_type="xapi", batch_size=2, bulk=True, consumer="worker-1")
+
+        storage.list_spilled.assert_called_once_with("xapi")
+        self.assertEqual(mock_backend.claim_spilled_file.mock_calls, [
+            call(spilled[0].name, "worker-1"),
+            call(spilled[1].name, "worker-1"),
+        ])
+        self.assertEqual(mock_backend.bulk_send.mock_calls, [
+            call([{"name": "a"}, {"name": "b"}]),
+            call([{"name": "c"}]),
+            call([{"name": "d"}]),
+        ])
+        self.assertEqual(storage.delete.mock_calls, [call(spilled[0]), call(spilled[1])])
+        self.assertEqual(mock_backend.ack_spilled_file.mock_calls, [call(spilled[0].name), call(spilled[1].name)])
+
+    @override_settings(
+        EVENT_TRACKING_BACKENDS={
+            "event_transformer": {
+                "ENGINE": "eventtracking.backends.async_routing.AsyncRoutingBackend",
+                "OPTIONS": {
+                    "backends": {"xapi": XAPI_PROCESSOR},
+                },
+            },
+        }
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_spill_storage"
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_tracker"
+    )
+    def test_recover_spilled_events_skips_claimed_files(self, mock_get_tracker, mock_get_spill_storage):
+        """
+        Test that spilled files claimed by other recovery processes, or already deleted, are skipped
+        """
+        tracker = DjangoTracker()
+        mock_get_tracker.return_value = tracker
+        mock_backend = Mock(backend_name="xapi")
+        tracker.backends["event_transformer"].backends["xapi"] = mock_backend
+        mock_backend.get_failed_events.return_value = []
+        mock_backend.claim_spilled_file.side_effect = [False, True, True]
+        storage = mock_get_spill_storage.return_value
+        spilled = [Mock(), Mock(), Mock()]
+        storage.list_spilled.return_value = spilled
+        storage.read.side_effect = [ObjectDoesNotExistError(None, None, "gone"), [{"name": "a"}]]
+
+        call_command("recover_failed_events", transformer_type="xapi", bulk=True, consumer="worker-1")
+
+        self.assertEqual(storage.read.mock_calls, [call(spilled[1]), call(spilled[2])])
+        mock_backend.bulk_send.assert_called_once_with([{"name": "a"}])
+        storage.delete.assert_called_once_with(spilled[2])
+        self.assertEqual(mock_backend.ack_spilled_file.mock_calls, [call(spilled[1].name), call(spilled[2].name)])
+
+    @override_settings(
+        EVENT_TRACKING_BACKENDS={
+            "event_transformer": {
+                "ENGINE": "eventtracking.backends.async_routing.AsyncRoutingBackend",
+                "OPTIONS": {
+                    "backends": {"xapi": XAPI_PROCESSOR},
+                },
+            },
+        }
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_spill_storage"
+    )
+    @patch(
+        "event_routing_backends.management.commands.recover_failed_events.get_tracker"
+    )
+    def test_recover_spilled_events_releases_file_on_outage(self, mock_get_tracker, mock_get_spill_storage):
+        """
+        Test that a spilled file that can't be sent is kept and its claim released
+        """
+        tracker = DjangoTracker()
+        mock_get_tracker.return_value = tracker
+        mock_backend = Mock(backend_name="xapi")
+        tracker.backends["event_transformer"].backends["xapi"] = mock_backend
+        mock_backend.get_failed_events.return_value = []
+        mock_backend.bulk_send.side_effect = EventNotDispatched
+        storage = mock_get_spill_storage.return_value
+        spilled = [Mock(), Mock()]
+        storage.list_spilled.return_value = spilled
+        storage.read.return_value = [{"name": "a"}]
+
+        call_command("recover_failed_events", transformer_type="xapi", bulk=True, consumer="worker-1")
+
+        mock_backend.claim_spilled_file.assert_called_once_with(spilled[0].name, "worker-1")
+        storage.delete.assert_not_called()
+        mock_backend.ack_spilled_file.assert_not_called()
+        mock_backend.release_failed_events.assert_called_once_with("worker-1")
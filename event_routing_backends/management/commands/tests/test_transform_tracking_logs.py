@@ -1,9 +1,10 @@
 """
 Tests for the transform_tracking_logs management command.
 """
+import gzip
 import json
 import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 import pytest
 from django.core.management import call_command
@@ -11,19 +12,28 @@ from django.test.utils import override_settings
 from eventtracking.backends.async_routing import AsyncRoutingBackend
 from eventtracking.backends.event_bus import EventBusRoutingBackend
 from eventtracking.django.django_tracker import override_default_tracker
+from eventtracking.processors.whitelist import NameWhitelistProcessor
 from eventtracking.tracker import get_tracker
+from libcloud.storage.drivers.local import LocalStorageDriver
 from libcloud.storage.types import ContainerDoesNotExistError
 
 import event_routing_backends.management.commands.transform_tracking_logs as transform_tracking_logs
 from event_routing_backends.backends.events_router import EventsRouter
-from event_routing_backends.management.commands.helpers.queued_sender import QueuedSender
+from event_routing_backends.management.commands.helpers.event_log_parser import get_event_names
+from event_routing_backends.management.commands.helpers.queued_sender import QueuedSender, StreamingEventWriter
 from event_routing_backends.management.commands.transform_tracking_logs import (
     _get_chunks,
+    _get_chunks_parallel,
+    _get_range,
+    _iter_lines,
     get_dest_config_from_options,
     get_libcloud_drivers,
     get_source_config_from_options,
     validate_source_and_files,
 )
+from event_routing_backends.processors.caliper.registry import CaliperTransformersRegistry
+from event_routing_backends.processors.xapi.registry import XApiTransformersRegistry
+from event_routing_backends.utils import json_codec
 
 override_default_tracker()
 
@@ -42,6 +52,13 @@ REMOTE_CONFIG = json.dumps({
 })
 
 
+def _read_upload(iterator, *args, **kwargs):
+    """
+    Read the stream of an upload to a mocked libcloud driver, like a real driver does.
+    """
+    return b"".join(iterator)
+
+
 @pytest.fixture
 def mock_common_calls():
     """
@@ -65,6 +82,7 @@ def command_options():
             "source_config": LOCAL_CONFIG,
             "batch_size": 1,
             "sleep_between_batches_secs": 0,
+            "no_prefilter": True,
             "chunk_size": 1024,  # We use this to override the default size of bytes to download
             "expected_results": {
                 "expected_batches_sent": 2,
@@ -84,6 +102,7 @@ def command_options():
             "source_provider": "MINIO",
             "source_config": REMOTE_CONFIG,
             "sleep_between_batches_secs": 0,
+            "no_prefilter": True,
             "dry_run": True,
             "expected_results": {
                 # Dry run, nothing should be sent
@@ -103,6 +122,7 @@ def command_options():
             "source_provider": "MINIO",
             "source_config": REMOTE_CONFIG,
             "sleep_between_batches_secs": 0,
+            "no_prefilter": True,
             "expected_results": {
                 # No batch size given, default is 10k so only one batch sent
                 "expected_batches_sent": 1,
@@ -125,6 +145,7 @@ def command_options():
             "destination_config": REMOTE_CONFIG,
             "batch_size": 2,
             "sleep_between_batches_secs": 0,
+            "no_prefilter": True,
             "expected_results": {
                 # Remote files only get written once
                 "expected_batches_sent": 1,
@@ -150,6 +171,7 @@ def command_options():
             "batch_size": 1,
             "dry_run": True,
             "sleep_between_batches_secs": 0,
+            "no_prefilter": True,
             "expected_results": {
                 # Dry run, nothing should be sent
                 "expected_batches_sent": 0,
@@ -169,6 +191,7 @@ def command_options():
             "source_provider": "MINIO",
             "source_config": REMOTE_CONFIG,
             "lrs_urls": ["http://lrs1.com", "http://lrs2.com"],
+            "no_prefilter": True,
             "expected_results": {
                 "expected_batches_sent": 1,
                 "log_lines": [
@@ -181,6 +204,38 @@ def command_options():
             },
             "whitelist": ["problem_check"],
         },
+        # Prefiltering, lines for unknown events are skipped before parsing so the broken ones are not reported
+        {
+            "transformer_type": "xapi",
+            "source_provider": "LOCAL",
+            "source_config": LOCAL_CONFIG,
+            "batch_size": 1,
+            "sleep_between_batches_secs": 0,
+            "expected_results": {
+                "expected_batches_sent": 2,
+                "log_lines": [
+                    "Max queue size of 1 reached, sending.",
+                    "Queued 2 log lines, could not parse 0 log lines, skipped 10 log lines, sent 3 batches.",
+                    "Skipped 10 log lines (83.3%) without parsing them.",
+                ]
+            },
+            "registry_mapping": {"problem_check": 1},
+        },
+        # Prefiltering with a whitelist that includes the event names of the broken lines
+        {
+            "transformer_type": "xapi",
+            "source_provider": "MINIO",
+            "source_config": REMOTE_CONFIG,
+            "sleep_between_batches_secs": 0,
+            "expected_results": {
+                "expected_batches_sent": 1,
+                "log_lines": [
+                    "Queued 4 log lines, could not parse 2 log lines, skipped 6 log lines, sent 1 batches.",
+                    "Skipped 6 log lines (50.0%) without parsing them.",
+                ]
+            },
+            "whitelist": ["problem_check", "edx.course.grade.now_failed", "edx.grades.course.grade_calculated"],
+        },
     ]
 
     for option in options:
@@ -233,6 +288,7 @@ def test_transform_command(MockRouterConfiguration, command_opts, mock_common_ca
     # Fake finding one log file in each container, it will be loaded and parsed twice
     mm.return_value.iterate_container_objects.return_value = [mock_log_object]
     mm.return_value.download_object_range_as_stream = _get_raw_log_stream
+    mm.return_value.upload_object_via_stream.side_effect = _read_upload
     mock_libcloud_get_driver.return_value = mm
 
     mm2 = MagicMock()
@@ -259,10 +315,14 @@ def test_transform_command(MockRouterConfiguration, command_opts, mock_common_ca
     assert "Streaming file tracking.log..." in captured.out
 
     # There are intentionally broken log statements in the test file that cause these
-    # lines to be emitted.
-    assert "EXCEPTION!!!" in caplog.text
-    assert "'NoneType' object has no attribute 'group'" in caplog.text
-    assert "Expecting ',' delimiter: line 1 column 63 (char 62)" in caplog.text
+    # lines to be emitted, unless they are skipped before parsing.
+    if command_opts.get("no_prefilter") or "could not parse 2 log lines" in "".join(expected_results["log_lines"]):
+        assert "EXCEPTION!!!" in caplog.text
+        assert "'NoneType' object has no attribute 'group'" in caplog.text
+        # The message prefix depends on the configured JSON codec, the position does not.
+        assert "line 1 column 63 (char 62)" in caplog.text
+    else:
+        assert "EXCEPTION!!!" not in caplog.text
 
     # Check the specific expected log lines for this set of options
     for line in expected_results["log_lines"]:
@@ -319,6 +379,87 @@ def test_queued_sender_store_on_lrs(mock_common_calls, capsys):
     assert "Store is being called on an LRS destination, skipping." in captured.out
 
 
+@pytest.mark.parametrize("line,expected", [
+    ('prefix {"name": "problem_check", "context": {}}', ["problem_check"]),
+    ('{"name":"a", "event": {"name" : "b"}}', ["a", "b"]),
+    ('{"name": "problem\\u005fcheck"}', None),
+    ('{"name": null}', None),
+    ('{"event_type": "problem_check"}', None),
+    ('{"event": "{\\"name\\": \\"nested\\"}", "name": "a"}', ["a"]),
+])
+def test_get_event_names(line, expected):
+    """
+    Test the cheap name scan used to prefilter log lines.
+    """
+    assert get_event_names(line) == expected
+
+
+def test_queued_sender_prefilter(mock_common_calls):
+    """
+    Test that only lines that may be for known events are parsed.
+    """
+    qs = QueuedSender("LRS", "fake_container", None, "xapi", dry_run=True)
+    qs.known_event_names = frozenset(["problem_check"])
+
+    with patch("event_routing_backends.management.commands.helpers.queued_sender.parse_json_event") as mock_parse:
+        mock_parse.return_value = {"name": "problem_check"}
+        qs.transform_and_queue('{"name": "edx.ui.lms.link_clicked", "event": {"name": "other"}}')
+        qs.transform_and_queue('{"name": "edx.ui.lms.link_clicked", "event": {"name": "problem_check"}}')
+        qs.transform_and_queue('{"event_type": "no name key"}')
+
+    assert mock_parse.call_count == 2
+    assert qs.prefiltered_lines == 1
+
+
+@pytest.fixture
+def caliper_only_event():
+    """
+    Temporarily register a transformer for an event only known to the Caliper backend.
+    """
+    CaliperTransformersRegistry.register("test.caliper_only")(MagicMock())
+    yield "test.caliper_only"
+    del CaliperTransformersRegistry.mapping["test.caliper_only"]
+
+
+def test_queued_sender_known_events_per_transformer_type(caliper_only_event):
+    """
+    Test that each transformer type only knows the events its own backend would transform.
+    """
+    whitelist = NameWhitelistProcessor(whitelist=["problem_check", caliper_only_event, "not.registered"])
+    with patch.object(tracker.backends["event_transformer"], "processors", [whitelist]):
+        xapi_sender = QueuedSender("LRS", "fake_container", None, "xapi")
+        caliper_sender = QueuedSender("LRS", "fake_container", None, "caliper")
+
+        assert xapi_sender.known_event_names == frozenset(["problem_check"])
+        assert caliper_sender.known_event_names == frozenset(["problem_check", caliper_only_event])
+        assert xapi_sender.get_known_event_names() == frozenset(whitelist.whitelist)
+
+        assert not xapi_sender.is_known_event({"name": caliper_only_event})
+        assert caliper_sender.is_known_event({"name": caliper_only_event})
+
+
+def test_queued_sender_known_events_refresh():
+    """
+    Test that the known events are only recomputed when a transformer is registered.
+    """
+    whitelist = NameWhitelistProcessor(whitelist=["problem_check", "test.late_registration"])
+    with patch.object(tracker.backends["event_transformer"], "processors", [whitelist]):
+        qs = QueuedSender("LRS", "fake_container", None, "xapi")
+
+        with patch.object(qs, "get_known_event_names", wraps=qs.get_known_event_names) as mock_get_names:
+            assert not qs.is_known_event({"name": "test.late_registration"})
+            assert qs.is_known_event({"name": "problem_check"})
+            mock_get_names.assert_not_called()
+
+            XApiTransformersRegistry.register("test.late_registration")(MagicMock())
+            try:
+                assert qs.is_known_event({"name": "test.late_registration"})
+                assert qs.is_known_event({"name": "problem_check"})
+            finally:
+                del XApiTransformersRegistry.mapping["test.late_registration"]
+            mock_get_names.assert_called_once_with("xapi")
+
+
 def test_queued_sender_broken_event(mock_common_calls, capsys):
     """
     Test that we don't attempt to store on an LRS backend.
@@ -327,6 +468,39 @@ def test_queued_sender_broken_event(mock_common_calls, capsys):
     assert not qs.is_known_event({"this has no name key and will fail": 1})
 
 
+def test_queued_sender_sleep_between_batches(mock_common_calls):
+    """
+    Test that batches sent to rate limited LRSs are paced to the limits instead of a fixed sleep.
+    """
+    limited_router = MagicMock(route_url="http://lrs1.com")
+    limited_router.get_rate_limit.return_value = {"requests_per_second": 1, "statements_per_second": 50}
+    other_router = MagicMock(route_url="http://lrs2.com")
+    other_router.get_rate_limit.return_value = {"requests_per_second": None, "statements_per_second": 10}
+    unlimited_router = MagicMock(route_url="http://lrs3.com")
+    unlimited_router.get_rate_limit.return_value = None
+
+    assert QueuedSender("LRS", "fake_container", None, "xapi", sleep_between_batches_secs=2.5) \
+        .get_sleep_between_batches(100) == 2.5
+    assert QueuedSender("NOT LRS", "fake_container", None, "xapi").get_sleep_between_batches(100) == 10.0
+
+    with patch(
+        "event_routing_backends.management.commands.helpers.queued_sender.RouterConfiguration.get_enabled_routers"
+    ) as mock_get_enabled_routers:
+        mock_get_enabled_routers.return_value = [limited_router, other_router, unlimited_router]
+        qs = QueuedSender("LRS", "fake_container", None, "xapi")
+        assert qs.get_sleep_between_batches(100) == 10.0
+        assert qs.get_sleep_between_batches(10) == 1.0
+
+        qs = QueuedSender("LRS", "fake_container", None, "xapi", lrs_urls=["http://lrs1.com"])
+        assert qs.get_sleep_between_batches(100) == 2.0
+
+        mock_get_enabled_routers.return_value = [unlimited_router]
+        qs = QueuedSender("LRS", "fake_container", None, "xapi")
+        assert qs.get_sleep_between_batches(100) == 10.0
+        # Once per sender
+        assert mock_get_enabled_routers.call_args_list == [call("xapi")] * 3
+
+
 def test_queued_sender_store_empty_queue(mock_common_calls, capsys):
     """
     Test that we don't attempt to store() when there's nothing in the queue.
@@ -364,6 +538,92 @@ def test_queued_sender_container_does_not_exist(mock_common_calls, caplog):
         qs.store()
 
 
+def _expected_file_sizes(events, max_file_size):
+    """
+    Return the sizes of the uncompressed files store() should write for these events.
+    """
+    sizes = [0]
+    for event in events:
+        if max_file_size and sizes[-1] >= max_file_size:
+            sizes.append(0)
+        sizes[-1] += len(json_codec.dumps_bytes(event) + b"\n")
+    return sizes
+
+
+def _part_number(path):
+    """
+    Return the rollover part number from a stored file name, e.g. 2 for "..._xapi_2.log".
+    """
+    stem = path.name.split(".")[0]
+    _, suffix = stem.rsplit("_", 1)
+    return int(suffix) if suffix.isdigit() else 0
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("max_file_size", [None, 10 * 1024 * 1024, 1, 200])
+def test_queued_sender_store_streaming(tmp_path, compress, max_file_size):
+    """
+    Test that store() streams events to one or more (optionally gzipped) files, rolling by size.
+    """
+    (tmp_path / "out").mkdir()
+    events = [{"name": f"event {i}", "data": {"ünïcödé": "☃" * i}} for i in range(20)]
+
+    qs = QueuedSender(
+        LocalStorageDriver(str(tmp_path)), "out", "prefix", "xapi", max_file_size=max_file_size, compress=compress
+    )
+    qs.engine = MagicMock()
+    qs.engine.processors = [lambda event: event]
+    qs.event_queue = list(events)
+    qs.store()
+
+    written = sorted((tmp_path / "out" / "prefix").iterdir(), key=_part_number)
+    assert [_part_number(f) for f in written] == list(range(len(written)))
+    assert all(f.name.endswith(".log.gz" if compress else ".log") for f in written)
+
+    lines = []
+    for f in written:
+        content = gzip.decompress(f.read_bytes()) if compress else f.read_bytes()
+        lines += content.decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == events
+
+    if not compress:
+        # Uncompressed files roll on the first line that reaches max_file_size
+        expected_sizes = _expected_file_sizes(events, max_file_size)
+        assert [f.stat().st_size for f in written] == expected_sizes
+        if max_file_size:
+            longest_line = max(len(json_codec.dumps_bytes(event) + b"\n") for event in events)
+            assert all(max_file_size <= f.stat().st_size < max_file_size + longest_line for f in written[:-1])
+
+
+def test_queued_sender_store_rolls_files():
+    """
+    Test that store() starts a new file for each event once every file is past max_file_size.
+    """
+    mock_destination = MagicMock()
+    mock_destination.upload_object_via_stream.side_effect = _read_upload
+    qs = QueuedSender(mock_destination, "fake_container", "fake_prefix", "xapi", max_file_size=1)
+    qs.engine = MagicMock()
+    qs.engine.processors = [lambda event: event]
+    qs.event_queue = [{"name": "a"}, {"name": "b"}]
+    qs.store()
+
+    assert mock_destination.upload_object_via_stream.call_count == 2
+
+
+def test_streaming_event_writer_shares_iterator():
+    """
+    Test that consecutive writers over the same iterator continue where the previous one stopped.
+    """
+    events = iter([{"a": 1}, {"b": 2}, {"c": 3}])
+    first = StreamingEventWriter(events, lambda e: e, max_bytes=1)
+    assert [json.loads(line) for line in first] == [{"a": 1}]
+    assert not first.exhausted
+    second = StreamingEventWriter(events, lambda e: e)
+    assert [json.loads(line) for line in second] == [{"b": 2}, {"c": 3}]
+    assert second.exhausted
+    assert second.events_written == 2
+
+
 def test_invalid_libcloud_source_driver(capsys, mock_common_calls):
     """
     Check error cases when non-existent libcloud drivers are passed in.
@@ -500,3 +760,85 @@ def test_get_chunks():
 
     # Make sure we got the correct number of retries
     assert fake_source_err.download_object_range_as_stream.call_count == 3
+
+
+def test_get_chunks_range():
+    """
+    Check that a byte range is only passed on to the driver when an end is given.
+    """
+    fake_source = MagicMock()
+    _get_chunks(fake_source, "file", 10, 20, chunk_size=5)
+    fake_source.download_object_range_as_stream.assert_called_once_with(
+        "file", chunk_size=5, start_bytes=10, end_bytes=20
+    )
+
+
+def test_get_range_retries_failed_read():
+    """
+    Check that a failure while reading a range retries the whole range, not just opening the stream.
+    """
+    def broken_stream():
+        yield b"partial"
+        raise ConnectionError("connection reset")
+
+    fake_source = MagicMock()
+    fake_source.download_object_range_as_stream.side_effect = [broken_stream(), iter([b"all ", b"good"])]
+
+    with patch("event_routing_backends.management.commands.transform_tracking_logs.sleep"):
+        assert _get_range(fake_source, "file", 0, 8, 4) == b"all good"
+    assert fake_source.download_object_range_as_stream.call_count == 2
+
+
+def test_get_chunks_parallel_resplits_ranges():
+    """
+    Check that fetched ranges are handed on in chunk_size pieces, in file order.
+    """
+    data = bytes(range(256)) * 4
+    fake_file = MagicMock(size=len(data))
+    fake_source = MagicMock()
+    fake_source.download_object_range_as_stream.side_effect = (
+        lambda _, chunk_size, start_bytes, end_bytes=None: iter([data[start_bytes:end_bytes]])
+    )
+
+    chunks = list(_get_chunks_parallel(fake_source, fake_file, 3, 100, chunk_size=30))
+
+    assert b"".join(chunks) == data
+    assert max(len(chunk) for chunk in chunks) == 30
+
+
+def test_iter_lines_split_across_chunks():
+    """
+    Check that lines and multibyte characters split across chunk boundaries are stitched back together.
+    """
+    data = "first ☃ line\n\nsecond line\nno trailing newline ☃".encode("utf-8")
+    chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+
+    assert list(_iter_lines(chunks)) == ["first ☃ line", "second line", "no trailing newline ☃"]
+
+
+@pytest.mark.parametrize("download_workers,range_size", [(1, 7), (4, 7), (4, 1024 * 1024), (3, 1)])
+def test_transform_tracking_logs_parallel_ranges(tmp_path, download_workers, range_size):
+    """
+    Check that downloading a file as concurrent byte ranges yields the same lines as a single stream.
+    """
+    (tmp_path / "logs").mkdir()
+    with open(_get_tracking_log_file_path(), "rb") as log_file:
+        raw = log_file.read()
+    # Add some multibyte characters so range boundaries land in the middle of them
+    raw += "\n".join(f'{{"name": "ünïcödé ☃ {i}"}}' for i in range(50)).encode("utf-8")
+    (tmp_path / "logs" / "tracking.log").write_bytes(raw)
+
+    sender = MagicMock()
+    transform_tracking_logs.transform_tracking_logs(
+        LocalStorageDriver(str(tmp_path)),
+        "logs",
+        "",
+        sender,
+        download_workers=download_workers,
+        range_size=range_size,
+        chunk_size=5,
+    )
+
+    expected = [line for line in raw.decode("utf-8").split("\n") if line]
+    assert [c.args[0] for c in sender.transform_and_queue.call_args_list] == expected
+    sender.finalize.assert_called_once()
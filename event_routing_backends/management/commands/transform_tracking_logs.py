@@ -1,8 +1,11 @@
 """
 Management command for transforming tracking log files.
 """
+import codecs
+import itertools
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from textwrap import dedent
 from time import sleep
@@ -18,15 +21,17 @@ from event_routing_backends.models import RouterConfiguration
 # Number of bytes to download at a time, this is 2 MB
 CHUNK_SIZE = 1024 * 1024 * 2
 
+# Size of each byte range fetched concurrently when --download_workers > 1, this is 64 MB
+RANGE_SIZE = 1024 * 1024 * 64
 
-def _get_chunks(source, file):
+
+def _with_retries(download):
     """
-    Fetch a chunk from the upstream source, retry 3 times if necessary.
+    Call `download`, retrying according to the bulk download retry settings.
 
     Often an upstream provider like S3 will fail occasionally on big jobs. This
     tries to handle any of those cases gracefully.
     """
-    chunks = None
     num_retries = getattr(settings, 'EVENT_ROUTING_BACKEND_BULK_DOWNLOAD_MAX_RETRIES', 3)
     retry_countdown = getattr(settings, 'EVENT_ROUTING_BACKEND_BULK_DOWNLOAD_COUNTDOWN', 1)
 
@@ -34,12 +39,7 @@ def _get_chunks(source, file):
     # be hit (for -> return)
     for try_number in range(1, num_retries+1):  # pragma: no cover
         try:
-            chunks = source.download_object_range_as_stream(
-                file,
-                start_bytes=0,
-                chunk_size=CHUNK_SIZE
-            )
-            break
+            return download()
         # Catching all exceptions here because there's no telling what all
         # the possible errors from different libcloud providers are.
         except Exception as e:  # pylint: disable=broad-except
@@ -50,18 +50,113 @@ def _get_chunks(source, file):
             print(f"Try {try_number}: Error occurred downloading source file chunk. Trying again in 1 second.")
             sleep(retry_countdown)
 
-    return chunks
+    return None
+
+
+def _get_chunks(source, file, start_bytes=0, end_bytes=None, chunk_size=None):
+    """
+    Fetch a chunk from the upstream source, retry 3 times if necessary.
+
+    Only opening the stream is retried, a failure while reading it is raised to the caller.
+    If `end_bytes` is given only the range [start_bytes, end_bytes) is fetched.
+    """
+    range_kwargs = {"start_bytes": start_bytes}
+    if end_bytes is not None:
+        range_kwargs["end_bytes"] = end_bytes
+
+    return _with_retries(lambda: source.download_object_range_as_stream(
+        file,
+        chunk_size=chunk_size or CHUNK_SIZE,
+        **range_kwargs
+    ))
+
+
+def _get_range(source, file, start_bytes, end_bytes, chunk_size):
+    """
+    Download a single byte range of the file into memory.
+
+    Ranges are independent of each other, so the whole download (opening and reading
+    the stream) is retried, rather than failing the whole file on a dropped connection.
+    """
+    range_kwargs = {"start_bytes": start_bytes}
+    if end_bytes is not None:
+        range_kwargs["end_bytes"] = end_bytes
+
+    return _with_retries(lambda: b"".join(source.download_object_range_as_stream(
+        file,
+        chunk_size=chunk_size or CHUNK_SIZE,
+        **range_kwargs
+    )))
 
 
-def transform_tracking_logs(
+def _get_chunks_parallel(source, file, workers, range_size, chunk_size=None):
+    """
+    Fetch the file as byte ranges over several concurrent connections, yielding them in order.
+
+    Ranges are yielded in file order, re-split into `chunk_size` pieces, so the caller sees
+    exactly the same byte stream as `_get_chunks`. While one range is being consumed up to
+    `workers` more are being fetched, so at most `workers + 1` ranges are held in memory.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    ranges = iter([
+        (start, start + range_size if start + range_size < file.size else None)
+        for start in range(0, file.size, range_size)
+    ])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = [
+            executor.submit(_get_range, source, file, start, end, chunk_size)
+            for start, end in itertools.islice(ranges, workers)
+        ]
+        while in_flight:
+            data = in_flight.pop(0).result()
+            for start, end in itertools.islice(ranges, 1):
+                in_flight.append(executor.submit(_get_range, source, file, start, end, chunk_size))
+
+            for offset in range(0, len(data), chunk_size):
+                yield data[offset:offset + chunk_size]
+            del data
+
+
+def _iter_lines(chunks):
+    """
+    Split a stream of byte chunks into lines, handling lines and UTF-8 characters split across chunks.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    line = ""
+
+    for chunk in chunks:
+        lines = (line + decoder.decode(chunk)).split("\n")
+        # The last piece is either empty or a partial line continued in the next chunk
+        line = lines.pop()
+        for full_line in lines:
+            if full_line:
+                yield full_line
+
+    # Sometimes the file doesn't end with a newline, we try to use
+    # any remaining bytes as a final line.
+    line += decoder.decode(b"", final=True)
+    if line:
+        yield line
+
+
+def transform_tracking_logs(  # pylint: disable=too-many-positional-arguments
     source,
     source_container,
     source_prefix,
-    sender
+    sender,
+    download_workers=1,
+    range_size=None,
+    chunk_size=None,
 ):
     """
     Transform one or more tracking log files from the given source to the given destination.
+
+    When `download_workers` is greater than 1, files larger than `range_size` bytes are
+    downloaded as concurrent byte-range requests instead of a single sequential stream.
     """
+    range_size = range_size or RANGE_SIZE
+
     # Containers are effectively directories, this recursively tries to find files
     # matching the given prefix in the given source.
     container = source.get_container(container_name=source_container)
@@ -73,26 +168,15 @@ def transform_tracking_logs(
         # Download the file as a stream of characters to save on memory
         print(f"Streaming file {file}...")
 
-        line = ""
-
-        chunks = _get_chunks(source, file)
-
-        for chunk in chunks:
-            chunk = chunk.decode('utf-8')
-
-            # Loop through this chunk, if we find a newline it's time to process
-            # otherwise just keep appending.
-            for char in chunk:
-                if char == "\n" and line:
-                    sender.transform_and_queue(line)
-                    line = ""
-                else:
-                    line += char
+        if download_workers > 1 and file.size and file.size > range_size:
+            print(f"Downloading {file.size} bytes in ranges of {range_size} bytes "
+                  f"using {download_workers} workers")
+            chunks = _get_chunks_parallel(source, file, download_workers, range_size, chunk_size)
+        else:
+            chunks = _get_chunks(source, file, chunk_size=chunk_size)
 
-        # Sometimes the file doesn't end with a newline, we try to use
-        # any remaining bytes as a final line.
-        if line:
-            sender.transform_and_queue(line)  # pragma: no cover
+        for line in _iter_lines(chunks):
+            sender.transform_and_queue(line)
 
     # Give the queue a chance to send any remaining events left in the queue
     sender.finalize()
@@ -266,9 +350,51 @@ class Command(BaseCommand):
         parser.add_argument(
             '--sleep_between_batches_secs',
             type=float,
-            default=10.0,
+            default=None,
             help="Fractional seconds to sleep between sending batches to a destination, used to reduce load on the LMS "
-                 "and LRSs when performing large operations.",
+                 "and LRSs when performing large operations. By default batches sent to LRSs with rate limits are "
+                 "paced to those limits, otherwise the command sleeps 10 seconds between batches.",
+        )
+        parser.add_argument(
+            '--max_file_size',
+            type=int,
+            default=None,
+            help="For libcloud destinations, start a new output file once the current one reaches approximately this "
+                 "many bytes. A new file is still started for every --batch_size events, so this only splits the "
+                 "output of a batch further, raise --batch_size for larger files. By default one file is written per "
+                 "--batch_size events.",
+        )
+        parser.add_argument(
+            '--gzip',
+            action="store_true",
+            help="For libcloud destinations, gzip the output files.",
+        )
+        parser.add_argument(
+            '--chunk_size',
+            type=int,
+            default=CHUNK_SIZE,
+            help="Number of bytes to read at a time from each download stream.",
+        )
+        parser.add_argument(
+            '--download_workers',
+            type=int,
+            default=1,
+            help="Number of concurrent byte-range requests to use when downloading large source files. The default "
+                 "of 1 downloads each file as a single sequential stream.",
+        )
+        parser.add_argument(
+            '--download_range_size',
+            type=int,
+            default=RANGE_SIZE,
+            help="Size in bytes of each byte range when --download_workers is greater than 1. Files smaller than "
+                 "this are always downloaded as a single stream. Each worker holds one range in memory at a time.",
+        )
+        parser.add_argument(
+            '--no_prefilter',
+            action="store_true",
+            help="Fully parse every log line before checking whether its event is known. By default lines whose "
+                 "event name is not known are skipped without parsing, so they are counted as skipped even if they "
+                 "are not valid JSON.",
         )
         parser.add_argument(
             '--dry_run',
@@ -318,12 +444,18 @@ class Command(BaseCommand):
             max_queue_size=options["batch_size"],
             sleep_between_batches_secs=options["sleep_between_batches_secs"],
             dry_run=options["dry_run"],
-            lrs_urls=lrs_urls
+            lrs_urls=lrs_urls,
+            max_file_size=options["max_file_size"],
+            compress=options["gzip"],
+            prefilter=not options["no_prefilter"],
         )
 
         transform_tracking_logs(
             source_driver,
             source_container,
             source_prefix,
-            sender
+            sender,
+            download_workers=options["download_workers"],
+            range_size=options["download_range_size"],
+            chunk_size=options["chunk_size"],
         )
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event_routing_backends', '0004_auto_20211025_1053'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routerconfiguration',
+            name='max_requests_per_second',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum number of requests sent to this router per second by all workers. Leave empty for no limit.', null=True, verbose_name='Max requests per second'),
+        ),
+        migrations.AddField(
+            model_name='routerconfiguration',
+            name='max_statements_per_second',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum number of events sent to this router per second by all workers. Leave empty for no limit.', null=True, verbose_name='Max statements per second'),
+        ),
+    ]
@@ -177,6 +177,20 @@ class RouterConfiguration(ConfigurationModel):
         verbose_name="Password", max_length=256, blank=True, null=True
     )
     configurations = EncryptedJSONField(blank=True, default=None)
+    max_requests_per_second = models.PositiveIntegerField(
+        verbose_name="Max requests per second",
+        blank=True,
+        null=True,
+        help_text="Maximum number of requests sent to this router per second by all workers. Leave empty for no limit.",
+    )
+    max_statements_per_second = models.PositiveIntegerField(
+        verbose_name="Max statements per second",
+        blank=True,
+        null=True,
+        help_text=(
+            "Maximum number of events sent to this router per second by all workers. Leave empty for no limit."
+        ),
+    )
     objects = RouterConfigurationManager()
 
     class Meta:
@@ -214,6 +228,20 @@ class RouterConfiguration(ConfigurationModel):
         router_configs = cls.objects.get_routers(backend_name)
         return router_configs if len(router_configs) > 0 else None
 
+    def get_rate_limit(self):
+        """
+        Return the rate limits of this router, as passed to `RateLimiter`.
+
+        Returns:
+            dict, or None if the router has no limits
+        """
+        if not self.max_requests_per_second and not self.max_statements_per_second:
+            return None
+        return {
+            "requests_per_second": self.max_requests_per_second,
+            "statements_per_second": self.max_statements_per_second,
+        }
+
     def get_allowed_host(self, original_event):
         """
         Return list of hosts to which the `transformed_event` is allowed to be sent.
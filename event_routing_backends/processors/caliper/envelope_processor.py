@@ -7,6 +7,52 @@ from pytz import UTC
 
 from event_routing_backends.helpers import convert_datetime_to_iso
 from event_routing_backends.processors.caliper.constants import CALIPER_EVENT_CONTEXT
+from event_routing_backends.utils import json_codec
+
+
+def is_envelope(event):
+    """
+    Return True if `event` is a Caliper envelope rather than a Caliper event.
+    """
+    return isinstance(event, dict) and 'sensor' in event and isinstance(event.get('data'), list)
+
+
+def merge_envelopes(envelopes, max_events, max_bytes):
+    """
+    Pack the events of several envelopes into as few envelopes as possible.
+
+    Consecutive envelopes that only differ by their `sendTime` and `data` are merged into
+    envelopes of up to `max_events` events and roughly `max_bytes` bytes of serialized events,
+    all sharing a single `sendTime`. An event larger than `max_bytes` gets an envelope of its own.
+
+    Arguments:
+        envelopes (list of dicts):  Caliper envelopes, e.g. as returned by `CaliperEnvelopeProcessor`
+        max_events (int):           maximum number of events per envelope
+        max_bytes (int):            maximum size of the serialized events of an envelope
+
+    Returns:
+        list of dicts
+    """
+    send_time = convert_datetime_to_iso(datetime.now(UTC))
+    merged = []
+    current_header = None
+    current_events = []
+    current_bytes = 0
+    for envelope in envelopes:
+        header = {key: value for key, value in envelope.items() if key not in ('sendTime', 'data')}
+        for event in envelope['data']:
+            event_bytes = len(json_codec.dumps_bytes(event))
+            if (
+                not merged or current_header != header or len(current_events) >= max_events or
+                current_bytes + event_bytes > max_bytes
+            ):
+                current_header = header
+                current_events = []
+                current_bytes = 0
+                merged.append(dict(envelope, sendTime=send_time, data=current_events))
+            current_events.append(event)
+            current_bytes += event_bytes
+    return merged
 
 
 class CaliperEnvelopeProcessor:
@@ -29,11 +75,12 @@ class CaliperEnvelopeProcessor:
         Returns:
             list of dicts
         """
+        send_time = convert_datetime_to_iso(datetime.now(UTC))
         enveloped_events = []
         for event in events:
             enveloped_events.append({
                 'sensor': self.sensor_id,
-                'sendTime': convert_datetime_to_iso(datetime.now(UTC)),
+                'sendTime': send_time,
                 'data': [event],
                 'dataVersion': CALIPER_EVENT_CONTEXT
             })
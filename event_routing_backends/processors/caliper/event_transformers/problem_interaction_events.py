@@ -1,9 +1,10 @@
 """
 Transformers for problem interaction events.
 """
-from event_routing_backends.helpers import get_anonymous_user_id, get_problem_block_id
+from event_routing_backends.helpers import get_anonymous_user_id
 from event_routing_backends.processors.caliper.registry import CaliperTransformersRegistry
 from event_routing_backends.processors.caliper.transformer import CaliperTransformer
+from event_routing_backends.utils.block_ids import get_problem_block_id
 
 EVENT_ACTION_MAP = {
     'problem_check': 'Submitted',
@@ -21,9 +21,10 @@ The (soon to be) updated event names are as following:
 - edx.video.position.changed
 - edx.video.completed (proposed)
 """
-from event_routing_backends.helpers import convert_seconds_to_iso, make_video_block_id
+from event_routing_backends.helpers import convert_seconds_to_iso
 from event_routing_backends.processors.caliper.registry import CaliperTransformersRegistry
 from event_routing_backends.processors.caliper.transformer import CaliperTransformer
+from event_routing_backends.utils.block_ids import make_video_block_id
 
 EVENTS_ACTION_MAP = {
     'load_video': 'Started',
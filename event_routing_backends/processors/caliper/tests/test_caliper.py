@@ -1,13 +1,12 @@
 """
 Test the caliper processor.
 """
-import json
-
 from django.test import SimpleTestCase
 from django.test.utils import override_settings
 from mock import MagicMock, call, patch, sentinel
 
 from event_routing_backends.processors.caliper.transformer_processor import CaliperProcessor
+from event_routing_backends.utils import json_codec
 
 
 @override_settings(CALIPER_EVENTS_ENABLED=True)
@@ -76,14 +75,14 @@ class TestCaliperProcessor(SimpleTestCase):
             call(
                 'Caliper version of edx event "{}" is: {}'.format(
                     self.sample_event.get('name'),
-                    json.dumps(transformed_event)
+                    json_codec.dumps(transformed_event)
                 )
             ),
             mocked_logger.debug.mock_calls
         )
 
         self.assertIn(
-            call(json.dumps(transformed_event)),
+            call(json_codec.dumps(transformed_event)),
             mocked_caliper_logger.info.mock_calls
         )
 
@@ -112,14 +111,14 @@ class TestCaliperProcessor(SimpleTestCase):
             call(
                 'Caliper version of edx event "{}" is: {}'.format(
                     self.sample_event.get('name'),
-                    json.dumps(transformed_event)
+                    json_codec.dumps(transformed_event)
                 )
             ),
             mocked_logger.debug.mock_calls
         )
 
         self.assertNotIn(
-            call(json.dumps(transformed_event)),
+            call(json_codec.dumps(transformed_event)),
             mocked_caliper_logger.info.mock_calls
         )
 
@@ -9,7 +9,11 @@ from pytz import UTC
 
 from event_routing_backends.helpers import convert_datetime_to_iso
 from event_routing_backends.processors.caliper.constants import CALIPER_EVENT_CONTEXT
-from event_routing_backends.processors.caliper.envelope_processor import CaliperEnvelopeProcessor
+from event_routing_backends.processors.caliper.envelope_processor import (
+    CaliperEnvelopeProcessor,
+    is_envelope,
+    merge_envelopes,
+)
 
 FROZEN_TIME = datetime(2013, 10, 3, 8, 24, 55, tzinfo=UTC)
 
@@ -37,3 +41,36 @@ class TestCaliperEnvelopeProcessor(TestCase):
             'data': [self.sample_event],
             'dataVersion': CALIPER_EVENT_CONTEXT
         }])
+
+    @patch('event_routing_backends.processors.caliper.envelope_processor.datetime')
+    def test_merge_envelopes(self, mocked_datetime):
+        mocked_datetime.now.return_value = FROZEN_TIME
+        events = [{'id': str(i), 'name': 'x' * 10} for i in range(5)]
+        envelopes = CaliperEnvelopeProcessor(sensor_id=self.sensor_id)(events)
+        envelopes[4] = dict(envelopes[4], sensor='http://other.sensor.com')
+        send_time = convert_datetime_to_iso(str(FROZEN_TIME))
+
+        merged = merge_envelopes(envelopes, max_events=3, max_bytes=1000)
+
+        self.assertEqual(merged, [
+            {'sensor': sensor, 'sendTime': send_time, 'data': data, 'dataVersion': CALIPER_EVENT_CONTEXT}
+            for sensor, data in [
+                (self.sensor_id, events[:3]),
+                (self.sensor_id, events[3:4]),
+                ('http://other.sensor.com', events[4:]),
+            ]
+        ])
+        # Events are never split, even if a single one is larger than max_bytes
+        self.assertEqual(
+            [len(envelope['data']) for envelope in merge_envelopes(envelopes[:4], max_events=10, max_bytes=70)],
+            [2, 2],
+        )
+        self.assertEqual(
+            [len(envelope['data']) for envelope in merge_envelopes(envelopes[:4], max_events=10, max_bytes=1)],
+            [1, 1, 1, 1],
+        )
+
+    def test_is_envelope(self):
+        self.assertTrue(is_envelope(CaliperEnvelopeProcessor(sensor_id=self.sensor_id)([self.sample_event])[0]))
+        self.assertFalse(is_envelope(self.sample_event))
+        self.assertFalse(is_envelope([self.sample_event]))
@@ -2,8 +2,10 @@
 Test the transformers for all of the currently supported events into Caliper format.
 """
 import os
+from uuid import UUID
 
 from django.test import TestCase
+from django.test.utils import override_settings
 
 from event_routing_backends.processors.caliper.registry import CaliperTransformersRegistry
 from event_routing_backends.processors.tests.transformers_test_mixin import (
@@ -52,3 +54,26 @@ class TestCaliperTransformers(CaliperTransformersFixturesTestMixin, Transformers
     """
     Test that supported events are transformed into Caliper format correctly.
     """
+
+    @override_settings(CALIPER_DETERMINISTIC_EVENT_IDS=True)
+    def test_deterministic_event_id(self):
+        raw_event = self.get_raw_event('edx.course.enrollment.activated.json')
+
+        transformed_event = self.registry.get_transformer(raw_event).transform()
+        replayed_event = self.registry.get_transformer(raw_event).transform()
+
+        self.assertEqual(transformed_event['id'], replayed_event['id'])
+        self.assertEqual(UUID(transformed_event['id']).version, 5)
+
+        raw_event['timestamp'] = '2020-01-01T00:00:00.000000+00:00'
+        later_event = self.registry.get_transformer(raw_event).transform()
+        self.assertNotEqual(transformed_event['id'], later_event['id'])
+
+    def test_random_event_id(self):
+        raw_event = self.get_raw_event('edx.course.enrollment.activated.json')
+
+        transformed_event = self.registry.get_transformer(raw_event).transform()
+        replayed_event = self.registry.get_transformer(raw_event).transform()
+
+        self.assertNotEqual(transformed_event['id'], replayed_event['id'])
+        self.assertEqual(UUID(transformed_event['id']).version, 4)
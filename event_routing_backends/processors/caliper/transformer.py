@@ -3,9 +3,10 @@ Base transformer to transform common event fields.
 """
 import uuid
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
-from event_routing_backends.helpers import convert_datetime_to_iso, get_anonymous_user_id
+from event_routing_backends.helpers import convert_datetime_to_iso, get_anonymous_user_id, get_uuid5
 from event_routing_backends.processors.caliper.constants import CALIPER_EVENT_CONTEXT
 from event_routing_backends.processors.mixins.base_transformer import BaseTransformerMixin
 
@@ -23,6 +24,44 @@ class CaliperTransformer(BaseTransformerMixin):
         'extensions',
     )
 
+    @classmethod
+    def get_external_id_type(cls):
+        """
+        Return 'CALIPER', actors are identified by their anonymous id.
+        """
+        return 'CALIPER'
+
+    def transform(self):
+        """
+        Transform the edX event, with a deterministic id if `CALIPER_DETERMINISTIC_EVENT_IDS` is enabled.
+
+        Returns:
+            dict
+        """
+        transformed_event = super().transform()
+        if getattr(settings, 'CALIPER_DETERMINISTIC_EVENT_IDS', False):
+            transformed_event['id'] = self.get_event_id(transformed_event).urn
+        return transformed_event
+
+    def get_event_id(self, transformed_event):
+        """
+        Generates the UUID for this event.
+
+        Uses the actor, event time, type and action of the transformed event to generate a UUID
+        which will be the same even if this event is re-processed.
+
+        Arguments:
+            transformed_event (dict): the transformed event
+
+        Returns:
+            UUID
+        """
+        # Warning! changing anything in these 2 lines or changing the "base_uuid" can invalidate
+        # the ids already stored by receivers. Please have a community discussion first before introducing
+        # any change in generation of UUID.
+        name = f"{transformed_event['actor']['id']}-{transformed_event['eventTime']}"
+        return get_uuid5(f"{transformed_event['type']}-{transformed_event['action']}", name)
+
     def base_transform(self, transformed_event):
         """
         Transform common Caliper fields.
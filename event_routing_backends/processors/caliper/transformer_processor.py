@@ -1,7 +1,6 @@
 """
 Caliper processor for transforming and routing events.
 """
-import json
 from logging import getLogger
 
 from eventtracking.processors.exceptions import NoBackendEnabled
@@ -9,6 +8,7 @@ from eventtracking.processors.exceptions import NoBackendEnabled
 from event_routing_backends.processors.caliper import CALIPER_EVENT_LOGGING_ENABLED, CALIPER_EVENTS_ENABLED
 from event_routing_backends.processors.caliper.registry import CaliperTransformersRegistry
 from event_routing_backends.processors.mixins.base_transformer_processor import BaseTransformerProcessorMixin
+from event_routing_backends.utils import json_codec
 
 logger = getLogger(__name__)
 caliper_logger = getLogger('caliper_tracking')
@@ -26,12 +26,13 @@ class CaliperProcessor(BaseTransformerProcessorMixin):
 
     registry = CaliperTransformersRegistry
 
-    def transform_event(self, event):
+    def transform_event(self, event, transformer=None):
         """
         Transform the event into IMS Caliper format.
 
         Arguments:
             event (dict):   Event to be transformed.
+            transformer (object):   Transformer of the event, if it has already been looked up
 
         Returns:
             dict:           transformed event
@@ -42,10 +43,10 @@ class CaliperProcessor(BaseTransformerProcessorMixin):
         if not CALIPER_EVENTS_ENABLED.is_enabled():
             raise NoBackendEnabled
 
-        transformed_event = super().transform_event(event)
+        transformed_event = super().transform_event(event, transformer)
 
         if transformed_event:
-            json_event = json.dumps(transformed_event)
+            json_event = json_codec.dumps(transformed_event)
 
             if CALIPER_EVENT_LOGGING_ENABLED.is_enabled():
                 caliper_logger.info(json_event)
@@ -3,10 +3,12 @@ Base Transformer Mixin to add or transform common data values.
 """
 
 import logging
+from operator import attrgetter, methodcaller
 
 from django.conf import settings
 
 from event_routing_backends import __version__
+from event_routing_backends.helpers import prefetch_courses, prefetch_users
 from event_routing_backends.models import get_value_from_dotted_path
 
 logger = logging.getLogger(__name__)
@@ -23,6 +25,40 @@ class BaseTransformerMixin:
     additional_fields = ()
     backend_name = None
 
+    # (field, resolver) pairs of `required_fields + additional_fields`, built once per class
+    _field_resolvers = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Build the field resolvers of every transformer class when it is defined.
+        """
+        super().__init_subclass__(**kwargs)
+        cls._field_resolvers = cls.get_field_resolvers()
+
+    @classmethod
+    def get_field_resolvers(cls):
+        """
+        Return how each transformed field gets its value.
+
+        A field gets the value of the class attribute of the same name if there is one,
+        otherwise the return value of its `get_<field>` method. The attributes are still looked up
+        on the instance for every event, so instance attributes and patched methods are used.
+
+        Returns:
+            tuple(tuple(str, callable)): the field name and a callable taking the transformer, or None if
+            the class has no value for the field
+        """
+        resolvers = []
+        for key in cls.required_fields + cls.additional_fields:
+            if hasattr(cls, key):
+                resolver = attrgetter(key)
+            elif hasattr(cls, f"get_{key}"):
+                resolver = methodcaller(f"get_{key}")
+            else:
+                resolver = None
+            resolvers.append((key, resolver))
+        return tuple(resolvers)
+
     def __init__(self, event):
         """
         Initialize the transformer with the event to be transformed.
@@ -66,6 +102,36 @@ class BaseTransformerMixin:
 
         return _find_nested(source_dict)
 
+    @classmethod
+    def prefetch(cls, transformers):
+        """
+        Load what the transformers of a batch need in bulk, before they transform their events one by one.
+
+        The users and courses of the events that are not cached yet are loaded by default.
+        Transformers can override this to share more work across the events of a batch.
+
+        Arguments:
+            transformers (list):    transformers of this class for the events of the batch
+        """
+        prefetch_users(
+            (transformer.extract_username_or_userid() for transformer in transformers),
+            cls.get_external_id_type(),
+        )
+        prefetch_courses(transformer.get_data('context.course_id') for transformer in transformers)
+
+    @classmethod
+    def get_external_id_type(cls):
+        """
+        Return the external type of the anonymous ids the users of the events are only needed for.
+
+        The users whose anonymous id of this type is cached are not prefetched. None means that the
+        users are needed for more than their anonymous id.
+
+        Returns:
+            str
+        """
+        return None
+
     def base_transform(self, transformed_event):
         """
         Transform the fields that are common for all events.
@@ -100,14 +166,12 @@ class BaseTransformerMixin:
         """
         transformed_event = self.base_transform({})
 
-        transforming_fields = self.required_fields + self.additional_fields
-        for key in transforming_fields:
-            if hasattr(self, key):
-                value = getattr(self, key)
-                transformed_event[key] = value
-            elif hasattr(self, f"get_{key}"):
-                value = getattr(self, f"get_{key}")()
-                transformed_event[key] = value
+        for key, resolver in self._field_resolvers:
+            if resolver is not None:
+                transformed_event[key] = resolver(self)
+            elif hasattr(self, key):
+                # Only set on the instance
+                transformed_event[key] = getattr(self, key)
             else:
                 raise ValueError(
                     'Cannot find value for "{}" in transformer {} for the edx event "{}"'.format(
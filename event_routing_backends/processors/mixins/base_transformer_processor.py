@@ -1,10 +1,13 @@
 """
 Base Processor Mixin for transformer processors.
 """
+from collections import defaultdict
 from logging import getLogger
 
 from eventtracking.processors.exceptions import NoBackendEnabled, NoTransformerImplemented
 
+from event_routing_backends.helpers import clear_prefetched
+
 logger = getLogger(__name__)
 
 
@@ -35,20 +38,86 @@ class BaseTransformerProcessorMixin:
         returned_events = []
         for event in events:
             try:
-                transformed_event = self.transform_event(event)
-                if not transformed_event:
-                    pass
-                elif isinstance(transformed_event, list):
-                    returned_events += transformed_event
-                else:
-                    returned_events.append(transformed_event)
+                returned_events += self.as_list(self.transform_event(event))
 
             # If the backend isn't enabled at all, early out
             except NoBackendEnabled:
                 break
         return returned_events
 
-    def transform_event(self, event):
+    @staticmethod
+    def as_list(transformed_event):
+        """
+        Return the transformed events of an event as a list.
+        """
+        if not transformed_event:
+            return []
+        if isinstance(transformed_event, list):
+            return transformed_event
+        return [transformed_event]
+
+    def transform_batch(self, events):
+        """
+        Transform a batch of events, and return the transformed events of each one.
+
+        Whatever the transformers of a batch of several events need is loaded in bulk first (see
+        `prefetch`), then the events are transformed one by one. An error transforming an event
+        doesn't stop the others from being transformed, it is returned in place of its transformed events.
+
+        Arguments:
+            events (list of dicts):   Events to be transformed.
+
+        Returns:
+            list: the transformed events (list of ANY) of each event, or the exception raised transforming it
+        """
+        try:
+            # A single event, e.g. one sent without batching, has nothing to share with others
+            transformers = self.prefetch(events) if len(events) > 1 else [None] * len(events)
+            results = []
+            for event, transformer in zip(events, transformers):
+                try:
+                    results.append(self.as_list(self.transform_event(event, transformer)))
+                except NoBackendEnabled:
+                    results.append([])
+                except Exception as exc:  # pylint: disable=broad-except
+                    results.append(exc)
+            return results
+        finally:
+            clear_prefetched()
+
+    def prefetch(self, events):
+        """
+        Let the transformers of a batch of events load what they need in bulk, once per transformer class.
+
+        Arguments:
+            events (list of dicts):   Events to be transformed.
+
+        Returns:
+            list: the transformer of each event, to transform it with, or None if it has none
+        """
+        if not self.registry:
+            return [None] * len(events)
+        event_transformers = []
+        transformers = defaultdict(list)
+        for event in events:
+            try:
+                transformer = self.registry.get_transformer(event)
+            except NoTransformerImplemented:
+                transformer = None
+            else:
+                transformers[type(transformer)].append(transformer)
+            event_transformers.append(transformer)
+
+        for transformer_class, class_transformers in transformers.items():
+            try:
+                transformer_class.prefetch(class_transformers)
+            except Exception:  # pylint: disable=broad-except
+                # The events are still transformed one by one, without the prefetched objects
+                logger.exception('Could not prefetch the data of %s events.', transformer_class.__name__)
+
+        return event_transformers
+
+    def transform_event(self, event, transformer=None):
         """
         Transform the event.
 
@@ -57,6 +126,7 @@ class BaseTransformerProcessorMixin:
 
         Arguments:
             event (dict):   Event to be transformed.
+            transformer (object):   Transformer of the event, if it has already been looked up
 
         Returns:
             ANY:           transformed event
@@ -64,7 +134,7 @@ class BaseTransformerProcessorMixin:
         event_name = event.get('name')
 
         try:
-            transformed_event = self.get_transformed_event(event)
+            transformed_event = self.get_transformed_event(event, transformer)
         except NoTransformerImplemented:
             logger.error('Could not get transformer for %s event.', event_name)
             return None
@@ -82,7 +152,7 @@ class BaseTransformerProcessorMixin:
 
         return transformed_event
 
-    def get_transformed_event(self, event):
+    def get_transformed_event(self, event, transformer=None):
         """
         Transform the event using the class's registry.
 
@@ -91,6 +161,7 @@ class BaseTransformerProcessorMixin:
 
         Arguments:
             event (dict):   Event to be transformed.
+            transformer (object):   Transformer of the event, if it has already been looked up
 
         Returns:
             ANY:           transformed event
@@ -105,4 +176,6 @@ class BaseTransformerProcessorMixin:
                                     transformer=self.__class__.__name__
                                 ))
             return None
-        return self.registry.get_transformer(event).transform()
+        if transformer is None:
+            transformer = self.registry.get_transformer(event)
+        return transformer.transform()
@@ -27,6 +27,20 @@ class ProcessorBaseFilter(OpenEdxPublicFilter):
         """
         return type("DynamicFilter", (cls,), {"filter_type": filter_type})
 
+    @classmethod
+    def has_pipeline(cls, filter_type):
+        """Return whether pipeline steps are configured for a filter, which may then change its result.
+
+        Arguments:
+            filter_type: String the defines the filter key on the OPEN_EDX_FILTERS_CONFIG
+                section
+
+        Returns:
+            bool
+        """
+        pipeline, _, _ = cls.generate_dynamic_filter(filter_type).get_pipeline_configuration()
+        return bool(pipeline)
+
     @classmethod
     def run_filter(cls, transformer, result):
         """
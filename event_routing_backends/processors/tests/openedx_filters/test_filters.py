@@ -1,5 +1,5 @@
 """Test cases for the filters file."""
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from mock import Mock, patch
 from openedx_filters.tooling import OpenEdxPublicFilter
 
@@ -39,3 +39,17 @@ class TestProcessorBaseFilter(TestCase):
 
         run_pipeline_mock.assert_called_once_with(transformer=transformer, result=input_value)
         self.assertEqual(run_pipeline_mock()["result"], result)
+
+    def test_has_pipeline(self):
+        """This checks whether pipeline steps are configured for a filter.
+
+        Expected behavior:
+            - has_pipeline returns True only for the filters with pipeline steps
+        """
+        with override_settings(OPEN_EDX_FILTERS_CONFIG={
+            "test_filter": {"pipeline": ["path.to.step"], "fail_silently": False},
+            "empty_filter": {"pipeline": [], "fail_silently": False},
+        }):
+            self.assertTrue(ProcessorBaseFilter.has_pipeline("test_filter"))
+            self.assertFalse(ProcessorBaseFilter.has_pipeline("empty_filter"))
+            self.assertFalse(ProcessorBaseFilter.has_pipeline("other_filter"))
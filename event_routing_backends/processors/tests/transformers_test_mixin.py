@@ -39,6 +39,15 @@ class DummyTransformer(BaseTransformerMixin):
     required_fields = ('does_not_exist',)
 
 
+class FieldsTransformer(BaseTransformerMixin):
+    required_fields = ('type', 'action')
+    additional_fields = ('instance_field',)
+    type = 'Event'
+
+    def get_action(self):
+        return 'Viewed'
+
+
 class TransformersFixturesTestMixin:
     """
     Mixin to help test event transforms using "raw" and "expected" fixture data.
@@ -139,6 +148,33 @@ class TransformersTestMixin:
                 'name': 'test_event'
             }).transform()
 
+    def test_field_resolvers(self):
+        self.assertEqual(DummyTransformer.get_field_resolvers(), (('does_not_exist', None),))
+        self.assertEqual(
+            [key for key, _ in FieldsTransformer.get_field_resolvers()], ['type', 'action', 'instance_field']
+        )
+
+        transformer = FieldsTransformer({'name': 'test_event'})
+        transformer.instance_field = 'value'
+        self.assertEqual(
+            transformer.transform(), {'type': 'Event', 'action': 'Viewed', 'instance_field': 'value'}
+        )
+
+        with patch.object(FieldsTransformer, 'get_action', return_value='Paused'):
+            self.assertEqual(transformer.transform()['action'], 'Paused')
+
+    @patch('event_routing_backends.processors.mixins.base_transformer.prefetch_courses')
+    @patch('event_routing_backends.processors.mixins.base_transformer.prefetch_users')
+    def test_prefetch(self, mocked_prefetch_users, mocked_prefetch_courses):
+        raw_event = self.get_raw_event('edx.course.enrollment.activated.json')
+        transformer = self.registry.get_transformer(raw_event)
+
+        type(transformer).prefetch([transformer])
+
+        self.assertEqual(list(mocked_prefetch_users.call_args[0][0]), [raw_event['data']['user_id']])
+        self.assertEqual(mocked_prefetch_users.call_args[0][1], type(transformer).get_external_id_type())
+        self.assertEqual(list(mocked_prefetch_courses.call_args[0][0]), [raw_event['context']['course_id']])
+
     def test_required_field_transformer(self):
         self.registry.register('test_event')(DummyTransformer)
         with self.assertRaises(ValueError):
@@ -7,3 +7,20 @@ class EventNotDispatched(Exception):
     """
     Raise this exception when an event is not dispatched
     """
+
+    def __init__(self, *args, retry_after=None):
+        """
+        Arguments:
+            retry_after (float): seconds the receiver asked to wait before sending again, if any
+        """
+        super().__init__(*args)
+        self.retry_after = retry_after
+
+
+class EventRejected(EventNotDispatched):
+    """
+    Raise this exception when the receiver rejects the events themselves, e.g. with a 400 response
+
+    Sending the same events again fails the same way, but splitting a rejected batch finds the
+    events that cause it.
+    """
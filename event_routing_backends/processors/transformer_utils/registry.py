@@ -17,6 +17,10 @@ class TransformerRegistry:
     """
     mapping = {}
 
+    # Incremented whenever a transformer is registered in any registry, so that
+    # callers caching the registered event names know when to recompute them.
+    revision = 0
+
     @classmethod
     def validate_mapping_exists(cls):
         """
@@ -68,6 +72,7 @@ class TransformerRegistry:
                     )
                 )
                 cls.mapping[event_key] = transformer
+            TransformerRegistry.revision += 1
             return transformer
 
         return __inner__
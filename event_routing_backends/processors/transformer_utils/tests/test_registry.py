@@ -35,3 +35,10 @@ class TestTransformerRegistry(TestCase):
         self.assertEqual(TransformerRegistry.get_transformer({
             'name': 'test.key'
         }), mocked_transformer2())
+
+    def test_register_increments_revision(self):
+        revision = TransformerRegistry.revision
+
+        TransformerRegistry.register('test.revision')(MagicMock())
+
+        self.assertEqual(TransformerRegistry.revision, revision + 1)
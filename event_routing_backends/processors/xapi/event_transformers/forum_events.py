@@ -6,6 +6,7 @@ from tincan import Activity, ActivityDefinition, LanguageMap, Verb
 
 from event_routing_backends.processors.openedx_filters.decorators import openedx_filter
 from event_routing_backends.processors.xapi import constants
+from event_routing_backends.processors.xapi.fragments import get_constant_activity_definition
 from event_routing_backends.processors.xapi.registry import XApiTransformersRegistry
 from event_routing_backends.processors.xapi.transformer import XApiTransformer
 
@@ -57,9 +58,7 @@ class BaseForumThreadTransformer(XApiTransformer):
                     lms_root_url=settings.LMS_ROOT_URL,
                     discussion_id=discussion
                 ),
-                definition=ActivityDefinition(
-                    type=constants.XAPI_ACTIVITY_DISCUSSION,
-                )
+                definition=get_constant_activity_definition(constants.XAPI_ACTIVITY_DISCUSSION),
             )
         ]
 
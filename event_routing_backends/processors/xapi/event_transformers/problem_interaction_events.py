@@ -5,7 +5,6 @@ import json
 
 from tincan import Activity, ActivityDefinition, Extensions, LanguageMap, Result
 
-from event_routing_backends.helpers import get_problem_block_id
 from event_routing_backends.processors.openedx_filters.decorators import openedx_filter
 from event_routing_backends.processors.xapi import constants
 from event_routing_backends.processors.xapi.registry import XApiTransformersRegistry
@@ -16,6 +15,7 @@ from event_routing_backends.processors.xapi.transformer import (
     XApiTransformer,
     XApiVerbTransformerMixin,
 )
+from event_routing_backends.utils.block_ids import get_problem_block_id
 
 # map open edx problems interation types to xAPI valid interaction types
 INTERACTION_TYPES_MAP = {
@@ -34,11 +34,12 @@ The (soon to be) updated event names are as following:
 from django.conf import settings
 from tincan import Activity, ActivityDefinition, Extensions, Result
 
-from event_routing_backends.helpers import convert_seconds_to_float, make_video_block_id
+from event_routing_backends.helpers import convert_seconds_to_float
 from event_routing_backends.processors.openedx_filters.decorators import openedx_filter
 from event_routing_backends.processors.xapi import constants
 from event_routing_backends.processors.xapi.registry import XApiTransformersRegistry
 from event_routing_backends.processors.xapi.transformer import XApiTransformer, XApiVerbTransformerMixin
+from event_routing_backends.utils.block_ids import make_video_block_id
 
 VERB_MAP = {
     'load_video': {
@@ -0,0 +1,82 @@
+"""
+Constant fragments of xAPI statements, built and serialized once per process.
+
+Verbs and activity definitions that only depend on constants are shared by every statement
+using them. They must never be modified, build a new object instead. For that reason objects
+returned through an openedx filter, whose pipeline steps may change them in place, are not
+taken from here while a pipeline is configured for the filter.
+"""
+from functools import lru_cache
+
+from tincan import ActivityDefinition, LanguageMap, Verb
+
+from event_routing_backends.processors.xapi import constants
+
+
+def build_verb(verb_id, display):
+    """
+    Return a new verb with the given id and English display name.
+
+    Arguments:
+        verb_id (str):  IRI of the verb
+        display (str):  English display name of the verb
+
+    Returns:
+        `Verb`
+    """
+    return Verb(id=verb_id, display=LanguageMap({constants.EN: display}))
+
+
+@lru_cache(maxsize=None)
+def get_constant_verb(verb_id, display):
+    """
+    Return the shared verb with the given id and English display name.
+
+    Arguments:
+        verb_id (str):  IRI of the verb
+        display (str):  English display name of the verb
+
+    Returns:
+        `Verb`
+    """
+    return build_verb(verb_id, display)
+
+
+@lru_cache(maxsize=None)
+def get_constant_activity_definition(activity_type):
+    """
+    Return the shared activity definition of the given type, without name or extensions.
+
+    Arguments:
+        activity_type (str):    IRI of the activity type
+
+    Returns:
+        `ActivityDefinition`
+    """
+    return ActivityDefinition(type=activity_type)
+
+
+def get_verb_json(verb):
+    """
+    Return the JSON of a verb, the same as `verb.to_json()`, serialized once per distinct verb.
+
+    The verb is looked up by value, so verbs built by filters or modified since get the JSON
+    of their current id and display.
+
+    Arguments:
+        verb (Verb):    verb of a statement
+
+    Returns:
+        str
+    """
+    display = verb.display
+    return _get_verb_json(verb.id, tuple(display.items()) if display is not None else None)
+
+
+@lru_cache(maxsize=1024)
+def _get_verb_json(verb_id, display_items):
+    """
+    Return the JSON of the verb with the given id and display items.
+    """
+    display = LanguageMap(dict(display_items)) if display_items is not None else None
+    return Verb(id=verb_id, display=display).to_json()
@@ -0,0 +1,44 @@
+"""
+Test the constant fragments of xAPI statements.
+"""
+from django.test import SimpleTestCase
+from tincan import LanguageMap, Verb
+
+from event_routing_backends.processors.xapi import constants
+from event_routing_backends.processors.xapi.fragments import (
+    get_constant_activity_definition,
+    get_constant_verb,
+    get_verb_json,
+)
+
+
+class TestFragments(SimpleTestCase):
+    """
+    Test cases for the constant fragments of xAPI statements.
+    """
+
+    def test_constant_fragments_are_shared(self):
+        verb = get_constant_verb(constants.XAPI_VERB_PASSED, constants.PASSED)
+
+        self.assertIs(get_constant_verb(constants.XAPI_VERB_PASSED, constants.PASSED), verb)
+        self.assertEqual(verb.to_json(), Verb(
+            id=constants.XAPI_VERB_PASSED,
+            display=LanguageMap({constants.EN: constants.PASSED}),
+        ).to_json())
+        self.assertIs(
+            get_constant_activity_definition(constants.XAPI_ACTIVITY_DISCUSSION),
+            get_constant_activity_definition(constants.XAPI_ACTIVITY_DISCUSSION),
+        )
+        self.assertEqual(get_constant_activity_definition(constants.XAPI_ACTIVITY_DISCUSSION).type,
+                         constants.XAPI_ACTIVITY_DISCUSSION)
+
+    def test_get_verb_json(self):
+        verb = Verb(id=constants.XAPI_VERB_PASSED, display=LanguageMap({constants.EN: constants.PASSED}))
+
+        self.assertEqual(get_verb_json(verb), verb.to_json())
+        verb_without_display = Verb(id=constants.XAPI_VERB_PASSED)
+        self.assertEqual(get_verb_json(verb_without_display), verb_without_display.to_json())
+
+        # Verbs are looked up by value
+        verb.display = LanguageMap({constants.EN: constants.FAILED})
+        self.assertEqual(get_verb_json(verb), verb.to_json())
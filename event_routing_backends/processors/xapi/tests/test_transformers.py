@@ -4,6 +4,7 @@ Test the transformers for all of the currently supported events into xAPI format
 import hashlib
 import json
 import os
+from unittest.mock import patch
 
 from django.test import TestCase
 from django.test.utils import override_settings
@@ -103,3 +104,29 @@ class TestXApiTransformers(XApiTransformersFixturesTestMixin, TransformersTestMi
         self.assertEqual(
             action_json, json.dumps({"objectType": "Agent", "mbox_sha1sum": mbox_sha1sum})
         )
+
+    def test_verb_map_verb_copied_for_filter_pipeline(self):
+        raw_event = self.get_raw_event('edx.ui.lms.sequence.next_selected.json')
+        verb = self.registry.get_transformer(raw_event).get_verb()
+        self.assertIs(self.registry.get_transformer(raw_event).get_verb(), verb)
+
+        with patch(
+            'event_routing_backends.processors.xapi.transformer.ProcessorBaseFilter.has_pipeline', return_value=True
+        ) as mock_has_pipeline, patch(
+            'event_routing_backends.processors.openedx_filters.filters.ProcessorBaseFilter.run_pipeline',
+            side_effect=lambda transformer, result: {'result': result},
+        ):
+            filtered_verb = self.registry.get_transformer(raw_event).get_verb()
+
+        mock_has_pipeline.assert_called_with(
+            'event_routing_backends.processors.xapi.transformer.xapi_transformer.get_verb'
+        )
+        self.assertIsNot(filtered_verb, verb)
+        self.assertEqual(filtered_verb.to_json(), verb.to_json())
+
+    def test_get_external_id_type(self):
+        self.assertEqual(XApiTransformer.get_external_id_type(), 'XAPI')
+        for ifi_type in ('mbox', 'mbox_sha1sum'):
+            with override_settings(XAPI_AGENT_IFI_TYPE=ifi_type):
+                # The users are needed for their email
+                self.assertIsNone(XApiTransformer.get_external_id_type())
@@ -5,10 +5,12 @@ import uuid
 
 from django.test import SimpleTestCase
 from django.test.utils import override_settings
+from eventtracking.processors.exceptions import NoTransformerImplemented
 from mock import MagicMock, call, patch, sentinel
 from tincan import Activity, Statement
 
 from event_routing_backends.processors.xapi.transformer_processor import XApiProcessor
+from event_routing_backends.utils import json_codec
 
 
 @override_settings(XAPI_EVENTS_ENABLED=True)
@@ -61,7 +63,7 @@ class TestXApiProcessor(SimpleTestCase):
 
         self.processor([self.sample_event])
 
-        self.assertIn(call.info(transformed_event.to_json()), mocked_logger.mock_calls)
+        self.assertIn(call.info(json_codec.dumps(transformed_event.as_version())), mocked_logger.mock_calls)
 
     @patch(
         'event_routing_backends.processors.xapi.transformer_processor.XApiTransformersRegistry.get_transformer'
@@ -76,7 +78,7 @@ class TestXApiProcessor(SimpleTestCase):
         mocked_get_transformer.return_value = mocked_transformer
 
         self.processor([self.sample_event])
-        self.assertIn(call.info(transformed_event.to_json()), mocked_logger.mock_calls)
+        self.assertIn(call.info(json_codec.dumps(transformed_event.as_version())), mocked_logger.mock_calls)
 
     @patch(
         'event_routing_backends.processors.xapi.transformer_processor.XApiTransformersRegistry.get_transformer'
@@ -113,3 +115,62 @@ class TestXApiProcessor(SimpleTestCase):
         backend.registry = None
         self.assertFalse(backend([self.sample_event]))
         mocked_logger.exception.assert_called_once()
+
+    @patch.object(XApiProcessor, 'prefetch')
+    @patch(
+        'event_routing_backends.processors.xapi.transformer_processor.XApiTransformersRegistry.get_transformer'
+    )
+    @patch('event_routing_backends.processors.mixins.base_transformer_processor.clear_prefetched')
+    def test_transform_batch(self, mocked_clear_prefetched, mocked_get_transformer, mocked_prefetch):
+        transformed_event = Statement()
+        transformed_event.object = Activity(id=str(uuid.uuid4()))
+        mocked_transformer = MagicMock()
+        mocked_transformer.transform.side_effect = [transformed_event, ValueError('Generic Error')]
+        mocked_prefetch.return_value = [mocked_transformer, mocked_transformer]
+        events = [self.sample_event, {'name': 'other'}]
+
+        results = self.processor.transform_batch(events)
+
+        self.assertEqual(results[0], [json_codec.loads(json_codec.dumps(transformed_event.as_version()))])
+        self.assertIsInstance(results[1], ValueError)
+        mocked_prefetch.assert_called_once_with(events)
+        # The transformers looked up by the prefetch are used
+        mocked_get_transformer.assert_not_called()
+        mocked_clear_prefetched.assert_called_once_with()
+
+    @patch.object(XApiProcessor, 'prefetch')
+    @patch(
+        'event_routing_backends.processors.xapi.transformer_processor.XApiTransformersRegistry.get_transformer'
+    )
+    def test_transform_batch_single_event(self, mocked_get_transformer, mocked_prefetch):
+        transformed_event = Statement()
+        transformed_event.object = Activity(id=str(uuid.uuid4()))
+        mocked_get_transformer.return_value.transform.return_value = transformed_event
+
+        results = self.processor.transform_batch([self.sample_event])
+
+        self.assertEqual(results, [[json_codec.loads(json_codec.dumps(transformed_event.as_version()))]])
+        mocked_prefetch.assert_not_called()
+        mocked_get_transformer.assert_called_once_with(self.sample_event)
+
+    @patch(
+        'event_routing_backends.processors.xapi.transformer_processor.XApiTransformersRegistry.get_transformer'
+    )
+    @patch('event_routing_backends.processors.mixins.base_transformer_processor.logger')
+    def test_prefetch(self, mocked_logger, mocked_get_transformer):
+        class Transformer:
+            prefetch = MagicMock()
+
+        class FailingTransformer:
+            prefetch = MagicMock(side_effect=Exception)
+
+        transformers = [Transformer(), FailingTransformer(), Transformer()]
+        mocked_get_transformer.side_effect = transformers + [NoTransformerImplemented]
+
+        self.assertEqual(self.processor.prefetch([self.sample_event] * 4), transformers + [None])
+
+        Transformer.prefetch.assert_called_once_with([transformers[0], transformers[2]])
+        FailingTransformer.prefetch.assert_called_once_with([transformers[1]])
+        mocked_logger.exception.assert_called_once_with(
+            'Could not prefetch the data of %s events.', 'FailingTransformer'
+        )
@@ -15,13 +15,16 @@ from tincan import (
     LanguageMap,
     Statement,
     StatementRef,
-    Verb,
 )
 
 from event_routing_backends.helpers import get_anonymous_user_id, get_course_from_id, get_user_email, get_uuid5
 from event_routing_backends.processors.mixins.base_transformer import BaseTransformerMixin
 from event_routing_backends.processors.openedx_filters.decorators import openedx_filter
+from event_routing_backends.processors.openedx_filters.filters import ProcessorBaseFilter
 from event_routing_backends.processors.xapi import constants
+from event_routing_backends.processors.xapi.fragments import build_verb, get_constant_verb, get_verb_json
+
+GET_VERB_FILTER_TYPE = "event_routing_backends.processors.xapi.transformer.xapi_transformer.get_verb"
 
 
 class XApiTransformer(BaseTransformerMixin):
@@ -33,6 +36,15 @@ class XApiTransformer(BaseTransformerMixin):
         'verb',
     )
 
+    @classmethod
+    def get_external_id_type(cls):
+        """
+        Return 'XAPI', unless actors are identified by the email of the users.
+        """
+        if settings.XAPI_AGENT_IFI_TYPE in ('mbox', 'mbox_sha1sum'):
+            return None
+        return 'XAPI'
+
     def transform(self):
         """
         Return transformed `Statement` object.
@@ -77,7 +89,7 @@ class XApiTransformer(BaseTransformerMixin):
         actor = self.get_actor()
         event_timestamp = self.get_timestamp()
         uuid_str = f'{actor.to_json()}-{event_timestamp}'
-        return get_uuid5(self.get_verb().to_json(), uuid_str)
+        return get_uuid5(get_verb_json(self.get_verb()), uuid_str)
 
     @openedx_filter(filter_type="event_routing_backends.processors.xapi.transformer.xapi_transformer.get_actor")
     def get_actor(self):
@@ -102,7 +114,7 @@ class XApiTransformer(BaseTransformerMixin):
             )
         return agent
 
-    @openedx_filter(filter_type="event_routing_backends.processors.xapi.transformer.xapi_transformer.get_verb")
+    @openedx_filter(filter_type=GET_VERB_FILTER_TYPE)
     def get_verb(self):
         """
         This intercepts the super verb value or the attribute class `_verb` in order to allow the openedx
@@ -192,10 +204,10 @@ class XApiVerbTransformerMixin:
         else:
             verb = self.verb_map[event_name]
 
-        return Verb(
-            id=verb['id'],
-            display=LanguageMap({constants.EN: verb['display']})
-        )
+        # The get_verb filter pipeline may change the verb in place, so it gets one of its own
+        if ProcessorBaseFilter.has_pipeline(GET_VERB_FILTER_TYPE):
+            return build_verb(verb['id'], verb['display'])
+        return get_constant_verb(verb['id'], verb['display'])
 
 
 class OneToManyXApiTransformerMixin:
@@ -296,7 +308,7 @@ class OneToManyChildXApiTransformerMixin:
         actor = self.get_actor()
         event_timestamp = self.get_timestamp()
         name = f'{actor.to_json()}-{event_timestamp}'
-        namespace_key = f'{self.get_verb().to_json()}-{self.child_id}'
+        namespace_key = f'{get_verb_json(self.get_verb())}-{self.child_id}'
         return get_uuid5(namespace_key, name)
 
     def get_context(self):
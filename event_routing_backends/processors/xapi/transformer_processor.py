@@ -1,7 +1,6 @@
 """
 xAPI processor for transforming and routing events.
 """
-import json
 from logging import getLogger
 
 from eventtracking.processors.exceptions import NoBackendEnabled
@@ -9,6 +8,7 @@ from eventtracking.processors.exceptions import NoBackendEnabled
 from event_routing_backends.processors.mixins.base_transformer_processor import BaseTransformerProcessorMixin
 from event_routing_backends.processors.xapi import XAPI_EVENT_LOGGING_ENABLED, XAPI_EVENTS_ENABLED
 from event_routing_backends.processors.xapi.registry import XApiTransformersRegistry
+from event_routing_backends.utils import json_codec
 
 logger = getLogger(__name__)
 xapi_logger = getLogger('xapi_tracking')
@@ -26,12 +26,13 @@ class XApiProcessor(BaseTransformerProcessorMixin):
 
     registry = XApiTransformersRegistry
 
-    def transform_event(self, event):
+    def transform_event(self, event, transformer=None):
         """
         Transform the event into IMS xAPI format.
 
         Arguments:
             event (dict):   Event to be transformed.
+            transformer (object):   Transformer of the event, if it has already been looked up
 
         Returns:
             ANY:            transformed event
@@ -42,7 +43,7 @@ class XApiProcessor(BaseTransformerProcessorMixin):
         if not XAPI_EVENTS_ENABLED.is_enabled():
             raise NoBackendEnabled
 
-        transformed_events = super().transform_event(event)
+        transformed_events = super().transform_event(event, transformer)
         if not transformed_events:
             return None
 
@@ -51,7 +52,8 @@ class XApiProcessor(BaseTransformerProcessorMixin):
 
         returned_events = []
         for transformed_event in transformed_events:
-            event_json = transformed_event.to_json()
+            # Equivalent to Statement.to_json(), but using the configured JSON codec
+            event_json = json_codec.dumps(transformed_event.as_version())
 
             if not transformed_event.object or not transformed_event.object.id:
                 logger.debug('xAPI statement of edx event "{}" has no object id: {}'.format(event["name"], event_json))
@@ -61,6 +63,6 @@ class XApiProcessor(BaseTransformerProcessorMixin):
                 xapi_logger.info(event_json)
 
             logger.debug('xAPI statement of edx event "{}" is: {}'.format(event["name"], event_json))
-            returned_events.append(json.loads(event_json))
+            returned_events.append(json_codec.loads(event_json))
 
         return returned_events
@@ -11,10 +11,31 @@ def plugin_settings(settings):
     """
     settings.CALIPER_EVENTS_ENABLED = False
     settings.CALIPER_EVENT_LOGGING_ENABLED = False
+    # .. toggle_name: CALIPER_DETERMINISTIC_EVENT_IDS
+    # .. toggle_implementation: DjangoSetting
+    # .. toggle_default: False
+    # .. toggle_use_cases: opt_in
+    # .. toggle_creation_date: 2026-10-19
+    # .. toggle_description: Generate the id of Caliper events as a UUID5 of their actor, eventTime and action,
+    #    like the id of xAPI statements, rather than a random UUID4. The same tracking event then always gets
+    #    the same id, so receivers can drop the duplicates sent by retries and replays.
+    settings.CALIPER_DETERMINISTIC_EVENT_IDS = False
     settings.XAPI_EVENTS_ENABLED = True
     settings.XAPI_EVENT_LOGGING_ENABLED = True
     settings.EVENT_ROUTING_BACKEND_MAX_RETRIES = 3
     settings.EVENT_ROUTING_BACKEND_COUNTDOWN = 30
+    # .. setting_name: EVENT_ROUTING_BACKEND_MAX_COUNTDOWN
+    # .. setting_default: 3600
+    # .. setting_description: Maximum delay in seconds before retrying a failed dispatch task. Retries are
+    #    delayed by a random time of up to EVENT_ROUTING_BACKEND_COUNTDOWN doubled on every retry, capped by
+    #    this setting, or by the Retry-After delay sent by the receiver.
+    settings.EVENT_ROUTING_BACKEND_MAX_COUNTDOWN = 3600
+    # .. setting_name: EVENT_ROUTING_BACKEND_RETRY_BUDGET
+    # .. setting_default: 0
+    # .. setting_description: Maximum number of failed dispatch tasks retried per minute for each route URL,
+    #    counted across all workers in Redis. Tasks failing once the budget is exhausted are not retried.
+    #    0 for no limit.
+    settings.EVENT_ROUTING_BACKEND_RETRY_BUDGET = 0
     settings.EVENT_ROUTING_BACKEND_BULK_DOWNLOAD_MAX_RETRIES = 3
     settings.EVENT_ROUTING_BACKEND_BULK_DOWNLOAD_COUNTDOWN = 1
     # .. toggle_name: EVENT_ROUTING_BACKEND_BATCHING_ENABLED
@@ -37,6 +58,133 @@ def plugin_settings(settings):
     #    the batch of events will be sent to the event routing backend. This setting is only used if
     #    EVENT_ROUTING_BACKEND_BATCHING_ENABLED.
     settings.EVENT_ROUTING_BACKEND_BATCH_INTERVAL = 60
+    # .. toggle_name: EVENT_ROUTING_BACKEND_COALESCING_ENABLED
+    # .. toggle_implementation: DjangoSetting
+    # .. toggle_default: False
+    # .. toggle_use_cases: opt_in
+    # .. toggle_creation_date: 2026-10-19
+    # .. toggle_description: Coalesce the non-persistent dispatch_event tasks run by each Celery worker process
+    #    into bulk requests of up to EVENT_ROUTING_BACKEND_COALESCE_MAX_EVENTS events per host, sent at the latest
+    #    EVENT_ROUTING_BACKEND_COALESCE_MAX_DELAY_MS milliseconds after their first event. Buffered events are lost
+    #    if the worker process is killed. Business critical events are never coalesced.
+    settings.EVENT_ROUTING_BACKEND_COALESCING_ENABLED = False
+    # .. setting_name: EVENT_ROUTING_BACKEND_COALESCE_MAX_EVENTS
+    # .. setting_default: 100
+    # .. setting_description: Number of coalesced events that triggers a bulk request. Only used if
+    #    EVENT_ROUTING_BACKEND_COALESCING_ENABLED.
+    settings.EVENT_ROUTING_BACKEND_COALESCE_MAX_EVENTS = 100
+    # .. setting_name: EVENT_ROUTING_BACKEND_COALESCE_MAX_DELAY_MS
+    # .. setting_default: 500
+    # .. setting_description: Maximum time in milliseconds an event waits to be coalesced with others. Only used
+    #    if EVENT_ROUTING_BACKEND_COALESCING_ENABLED.
+    settings.EVENT_ROUTING_BACKEND_COALESCE_MAX_DELAY_MS = 500
+    # .. setting_name: EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD
+    # .. setting_default: 'events'
+    # .. setting_description: How events are passed to dispatch_bulk_events Celery tasks. 'events' passes the list
+    #    of events. 'compressed' passes them as deflate compressed, base64 encoded JSON. 'claim_check' stores
+    #    compressed batches of at least EVENT_ROUTING_BACKEND_CLAIM_CHECK_MIN_SIZE bytes in Redis and only passes
+    #    their key, smaller batches are passed compressed.
+    settings.EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD = 'events'
+    # .. setting_name: EVENT_ROUTING_BACKEND_CLAIM_CHECK_MIN_SIZE
+    # .. setting_default: 65536
+    # .. setting_description: Compressed size in bytes from which batches are stored in Redis rather than passed
+    #    to the task. Only used if EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD is 'claim_check'.
+    settings.EVENT_ROUTING_BACKEND_CLAIM_CHECK_MIN_SIZE = 65536
+    # .. setting_name: EVENT_ROUTING_BACKEND_CLAIM_CHECK_TTL
+    # .. setting_default: 86400
+    # .. setting_description: Seconds batches stored in Redis are kept if their task never runs. Tasks delete
+    #    them once done. Only used if EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD is 'claim_check'.
+    settings.EVENT_ROUTING_BACKEND_CLAIM_CHECK_TTL = 86400
+    # .. setting_name: EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_EVENTS
+    # .. setting_default: 1
+    # .. setting_description: Maximum number of Caliper events per envelope when events are sent in bulk. With
+    #    the default of 1, a bulk request holds an array of single event envelopes. With a greater value, the
+    #    events are packed into envelopes sharing one sendTime and each envelope is sent with its own request,
+    #    as most Caliper endpoints expect.
+    settings.EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_EVENTS = 1
+    # .. setting_name: EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_BYTES
+    # .. setting_default: 1000000
+    # .. setting_description: Approximate maximum size in bytes of the events of a Caliper envelope. Only used if
+    #    EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_EVENTS is greater than 1.
+    settings.EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_BYTES = 1000000
+    # .. setting_name: EVENT_ROUTING_BACKEND_BATCH_QUEUE
+    # .. setting_default: 'list'
+    # .. setting_description: Redis structure used to queue events for batching. 'list' pushes events to
+    #    a Redis list that any process can pop whole. 'stream' adds them to a Redis stream read through a
+    #    consumer group, so flushes on different nodes share the work and stuck entries are claimed again.
+    #    This setting is only used if EVENT_ROUTING_BACKEND_BATCHING_ENABLED.
+    settings.EVENT_ROUTING_BACKEND_BATCH_QUEUE = 'list'
+    # .. setting_name: EVENT_ROUTING_BACKEND_STREAM_MAXLEN
+    # .. setting_default: 1000000
+    # .. setting_description: Approximate maximum number of entries kept in the batching stream. The oldest
+    #    entries are dropped beyond this. Only used if EVENT_ROUTING_BACKEND_BATCH_QUEUE is 'stream'.
+    settings.EVENT_ROUTING_BACKEND_STREAM_MAXLEN = 1000000
+    # .. setting_name: EVENT_ROUTING_BACKEND_STREAM_CLAIM_IDLE_TIME
+    # .. setting_default: 300
+    # .. setting_description: Seconds after which batching stream entries read but not acknowledged by a
+    #    process are claimed by another one. Only used if EVENT_ROUTING_BACKEND_BATCH_QUEUE is 'stream'.
+    settings.EVENT_ROUTING_BACKEND_STREAM_CLAIM_IDLE_TIME = 300
+    # .. toggle_name: EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION
+    # .. toggle_implementation: DjangoSetting
+    # .. toggle_default: False
+    # .. toggle_use_cases: opt_in
+    # .. toggle_creation_date: 2026-10-19
+    # .. toggle_description: Compress the events stored in the Redis batching, dead and quarantine queues
+    #    with deflate and a preset dictionary of tracking event fragments, which makes them about a third of
+    #    their JSON size. Queued events of either format are read correctly whatever the value of this setting.
+    settings.EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION = False
+    # .. setting_name: EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE
+    # .. setting_default: 0
+    # .. setting_description: Maximum number of events kept in the Redis dead queue of each backend, 0 for no
+    #    limit. Failed batches that don't fit are written to EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER, or
+    #    dropped if it is not set.
+    settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE = 0
+    # .. setting_name: EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER
+    # .. setting_default: None
+    # .. setting_description: Apache Libcloud storage provider constant, e.g. 'S3' or 'LOCAL', to write failed
+    #    batches to once the dead queue is full.
+    settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER = None
+    # .. setting_name: EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_CONFIG
+    # .. setting_default: {}
+    # .. setting_description: Configuration of EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER, with the same keys
+    #    as the transform_tracking_logs destination_config: 'container', 'prefix' and the driver arguments such
+    #    as 'key' and 'secret'.
+    settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_CONFIG = {}
+    # .. setting_name: EVENT_ROUTING_BACKEND_JSON_CODEC
+    # .. setting_default: 'auto'
+    # .. setting_description: JSON implementation used to parse and serialize events in the tracking log
+    #    parser, the batching and dead queues, the xAPI and Caliper processors and the bulk transform output.
+    #    Possible values are 'auto' (use orjson if it is installed, otherwise the standard library), 'json'
+    #    and 'orjson'.
+    settings.EVENT_ROUTING_BACKEND_JSON_CODEC = 'auto'
+    # .. setting_name: EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_TTL
+    # .. setting_default: 60
+    # .. setting_description: Seconds during which a username or user id that was not found is not looked up
+    #    again by each process, so the events of bots and deleted accounts don't query the database for every
+    #    event. 0 disables the cache. A user created in the meantime is only found once this time has passed.
+    settings.EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_TTL = 60
+    # .. setting_name: EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_SIZE
+    # .. setting_default: 10000
+    # .. setting_description: Maximum number of unknown usernames and user ids remembered by each process,
+    #    the least recently used are forgotten first. Only used if EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_TTL
+    #    is greater than 0.
+    settings.EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_SIZE = 10000
+    # .. setting_name: EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE
+    # .. setting_default: 'default'
+    # .. setting_description: Alias of the Django cache, e.g. a Redis or memcached cache, in which the anonymous
+    #    user ids of the xAPI actors and Caliper users are shared by all processes. Entries are only written if
+    #    they are absent, so processes warm each other up. None to only cache the ids in each process.
+    settings.EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE = 'default'
+    # .. setting_name: EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE_TTL
+    # .. setting_default: 86400
+    # .. setting_description: Seconds for which anonymous user ids are kept in the cache of each process and in
+    #    EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE.
+    settings.EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE_TTL = 86400
+    # .. setting_name: EVENT_ROUTING_BACKEND_EXTERNAL_ID_LOCAL_CACHE_SIZE
+    # .. setting_default: 10000
+    # .. setting_description: Maximum number of anonymous user ids cached by each process, the least recently
+    #    used are forgotten first. 0 to only use EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE.
+    settings.EVENT_ROUTING_BACKEND_EXTERNAL_ID_LOCAL_CACHE_SIZE = 10000
     # .. setting_name: XAPI_AGENT_IFI_TYPE
     # .. setting_default: 'external_id'
     # .. setting_description: This setting can be used to specify the type of inverse functional identifier
@@ -15,6 +15,14 @@ def plugin_settings(settings):
         'EVENT_ROUTING_BACKEND_COUNTDOWN',
         settings.EVENT_ROUTING_BACKEND_COUNTDOWN
     )
+    settings.EVENT_ROUTING_BACKEND_MAX_COUNTDOWN = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_MAX_COUNTDOWN',
+        settings.EVENT_ROUTING_BACKEND_MAX_COUNTDOWN
+    )
+    settings.EVENT_ROUTING_BACKEND_RETRY_BUDGET = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_RETRY_BUDGET',
+        settings.EVENT_ROUTING_BACKEND_RETRY_BUDGET
+    )
     settings.EVENT_ROUTING_BACKEND_BATCH_SIZE = settings.ENV_TOKENS.get(
         'EVENT_ROUTING_BACKEND_BATCH_SIZE',
         settings.EVENT_ROUTING_BACKEND_BATCH_SIZE
@@ -27,6 +35,90 @@ def plugin_settings(settings):
         'EVENT_ROUTING_BACKEND_BATCH_INTERVAL',
         settings.EVENT_ROUTING_BACKEND_BATCH_INTERVAL
     )
+    settings.EVENT_ROUTING_BACKEND_BATCH_QUEUE = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_BATCH_QUEUE',
+        settings.EVENT_ROUTING_BACKEND_BATCH_QUEUE
+    )
+    settings.EVENT_ROUTING_BACKEND_COALESCING_ENABLED = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_COALESCING_ENABLED',
+        settings.EVENT_ROUTING_BACKEND_COALESCING_ENABLED
+    )
+    settings.EVENT_ROUTING_BACKEND_COALESCE_MAX_EVENTS = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_COALESCE_MAX_EVENTS',
+        settings.EVENT_ROUTING_BACKEND_COALESCE_MAX_EVENTS
+    )
+    settings.EVENT_ROUTING_BACKEND_COALESCE_MAX_DELAY_MS = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_COALESCE_MAX_DELAY_MS',
+        settings.EVENT_ROUTING_BACKEND_COALESCE_MAX_DELAY_MS
+    )
+    settings.EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD',
+        settings.EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD
+    )
+    settings.EVENT_ROUTING_BACKEND_CLAIM_CHECK_MIN_SIZE = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_CLAIM_CHECK_MIN_SIZE',
+        settings.EVENT_ROUTING_BACKEND_CLAIM_CHECK_MIN_SIZE
+    )
+    settings.EVENT_ROUTING_BACKEND_CLAIM_CHECK_TTL = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_CLAIM_CHECK_TTL',
+        settings.EVENT_ROUTING_BACKEND_CLAIM_CHECK_TTL
+    )
+    settings.EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_EVENTS = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_EVENTS',
+        settings.EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_EVENTS
+    )
+    settings.EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_BYTES = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_BYTES',
+        settings.EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_BYTES
+    )
+    settings.EVENT_ROUTING_BACKEND_STREAM_MAXLEN = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_STREAM_MAXLEN',
+        settings.EVENT_ROUTING_BACKEND_STREAM_MAXLEN
+    )
+    settings.EVENT_ROUTING_BACKEND_STREAM_CLAIM_IDLE_TIME = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_STREAM_CLAIM_IDLE_TIME',
+        settings.EVENT_ROUTING_BACKEND_STREAM_CLAIM_IDLE_TIME
+    )
+    settings.EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION',
+        settings.EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION
+    )
+    settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE',
+        settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE
+    )
+    settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER',
+        settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER
+    )
+    settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_CONFIG = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_CONFIG',
+        settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_CONFIG
+    )
+    settings.EVENT_ROUTING_BACKEND_JSON_CODEC = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_JSON_CODEC',
+        settings.EVENT_ROUTING_BACKEND_JSON_CODEC
+    )
+    settings.EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_TTL = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_TTL',
+        settings.EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_TTL
+    )
+    settings.EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_SIZE = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_SIZE',
+        settings.EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_SIZE
+    )
+    settings.EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE',
+        settings.EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE
+    )
+    settings.EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE_TTL = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE_TTL',
+        settings.EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE_TTL
+    )
+    settings.EVENT_ROUTING_BACKEND_EXTERNAL_ID_LOCAL_CACHE_SIZE = settings.ENV_TOKENS.get(
+        'EVENT_ROUTING_BACKEND_EXTERNAL_ID_LOCAL_CACHE_SIZE',
+        settings.EVENT_ROUTING_BACKEND_EXTERNAL_ID_LOCAL_CACHE_SIZE
+    )
     settings.CALIPER_EVENTS_ENABLED = settings.ENV_TOKENS.get(
         'CALIPER_EVENTS_ENABLED',
         settings.CALIPER_EVENTS_ENABLED
@@ -35,6 +127,10 @@ def plugin_settings(settings):
         'CALIPER_EVENT_LOGGING_ENABLED',
         settings.CALIPER_EVENT_LOGGING_ENABLED
     )
+    settings.CALIPER_DETERMINISTIC_EVENT_IDS = settings.ENV_TOKENS.get(
+        'CALIPER_DETERMINISTIC_EVENT_IDS',
+        settings.CALIPER_DETERMINISTIC_EVENT_IDS
+    )
     settings.XAPI_EVENTS_ENABLED = settings.ENV_TOKENS.get(
         'XAPI_EVENTS_ENABLED',
         settings.XAPI_EVENTS_ENABLED
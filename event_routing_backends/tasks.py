@@ -2,12 +2,18 @@
 Celery tasks.
 """
 from celery import shared_task
+from celery.signals import worker_process_shutdown, worker_shutdown
 from celery.utils.log import get_task_logger
 from celery_utils.persist_on_failure import LoggedPersistOnFailureTask
 from django.conf import settings
 
-from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched
+from event_routing_backends.helpers import get_dispatched_event_id
+from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched, EventRejected
+from event_routing_backends.utils import task_payload
+from event_routing_backends.utils.coalescer import flush_coalescer, get_coalescer
 from event_routing_backends.utils.http_client import HttpClient
+from event_routing_backends.utils.rate_limiter import RateLimiter, get_client_config
+from event_routing_backends.utils.retry import consume_retry_budget, get_retry_countdown
 from event_routing_backends.utils.xapi_lrs_client import LrsClient
 
 logger = get_task_logger(__name__)
@@ -18,6 +24,40 @@ ROUTER_STRATEGY_MAPPING = {
 }
 
 
+def get_retry(task, exc, host_config, get_args=None, **kwargs):
+    """
+    Schedule the retry of a failed dispatch task.
+
+    The retry is delayed with exponential backoff and jitter, or by the delay the receiver
+    asked for. It is not scheduled if the task reached its maximum number of retries or if the
+    retry budget of the route is exhausted.
+
+    Arguments:
+        task (object)           : celery task object to retry
+        exc (EventNotDispatched): exception the task failed with
+        host_config (dict)      : contains configurations for the host.
+        get_args (callable)     : returns the arguments of the retry, only called if the task is retried
+        kwargs                  : extra arguments of `task.retry`
+
+    Returns:
+        Exception: exception for the task to raise
+    """
+    max_retries = getattr(settings, 'EVENT_ROUTING_BACKEND_MAX_RETRIES', 3)
+    if max_retries is not None and task.request.retries >= max_retries:
+        return exc
+    if not consume_retry_budget(host_config.get('url', '')):
+        logger.warning('Retry budget of {} is exhausted, the task is not retried'.format(host_config.get('url')))
+        return exc
+    if get_args:
+        kwargs['args'] = get_args()
+    return task.retry(
+        exc=exc,
+        countdown=get_retry_countdown(task.request.retries, exc.retry_after),
+        max_retries=max_retries,
+        **kwargs
+    )
+
+
 @shared_task(bind=True, base=LoggedPersistOnFailureTask)
 def dispatch_event_persistent(self, event_name, event, router_type, host_config):
     """
@@ -45,9 +85,53 @@ def dispatch_event(self, event_name, event, router_type, host_config):
         router_type (str)   : decides the client to use for sending the event
         host_config (dict)  : contains configurations for the host.
     """
+    if getattr(settings, 'EVENT_ROUTING_BACKEND_COALESCING_ENABLED', False) and not self.request.is_eager:
+        get_coalescer(send_coalesced_events).add(event, router_type, host_config)
+        return
     send_event(self, event_name, event, router_type, host_config)
 
 
+def send_coalesced_events(events, router_type, host_config):
+    """
+    Send the events coalesced from `dispatch_event` tasks with a single bulk request.
+
+    The events that can't be delivered are handed over to a `dispatch_bulk_events` task, to be
+    retried like any bulk dispatch.
+
+    Arguments:
+        events (list[dict])     : list of event dictionaries to be delivered.
+        router_type (str)       : decides the client to use for sending the event
+        host_config (dict)      : contains configurations for the host.
+    """
+    try:
+        client_class = ROUTER_STRATEGY_MAPPING[router_type]
+    except KeyError:
+        logger.error('Unsupported routing strategy detected: {}'.format(router_type))
+        return
+
+    try:
+        client = client_class(**get_client_config(host_config))
+        failed_events, _ = bulk_send_with_splitting(client, events, RateLimiter.from_host_config(host_config))
+    except EventNotDispatched:
+        failed_events = events
+    if failed_events:
+        logger.warning('Could not send {} of {} coalesced events using client: {}, retrying them in bulk'.format(
+            len(failed_events), len(events), client_class
+        ))
+        dispatch_bulk_events.delay(task_payload.pack_events(failed_events), router_type, host_config)
+    else:
+        logger.debug('Successfully dispatched {} coalesced events using client: {}'.format(len(events), client_class))
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_coalesced_events(**kwargs):
+    """
+    Send the events still buffered by the coalescer before the worker process exits.
+    """
+    flush_coalescer()
+
+
 def send_event(task, event_name, event, router_type, host_config):
     """
     Send event to configured client.
@@ -66,7 +150,10 @@ def send_event(task, event_name, event, router_type, host_config):
         return
 
     try:
-        client = client_class(**host_config)
+        client = client_class(**get_client_config(host_config))
+        rate_limiter = RateLimiter.from_host_config(host_config)
+        if rate_limiter:
+            rate_limiter.wait()
         client.send(event, event_name)
         logger.debug(
             'Successfully dispatched transformed version of edx event "{}" using client: {}'.format(
@@ -87,9 +174,7 @@ def send_event(task, event_name, event, router_type, host_config):
         # the celery task till it succeeds or reaches max retries.
         if not task:
             raise exc
-        raise task.retry(exc=exc, countdown=getattr(settings, 'EVENT_ROUTING_BACKEND_COUNTDOWN', 30),
-                         max_retries=getattr(settings, ''
-                                                       'EVENT_ROUTING_BACKEND_MAX_RETRIES', 3))
+        raise get_retry(task, exc, host_config) from exc
 
 
 @shared_task(bind=True)
@@ -99,17 +184,70 @@ def dispatch_bulk_events(self, events, router_type, host_config):
 
     Arguments:
         self (object)       : celery task object to perform celery actions
-        events (list[dict]) : list of event dictionaries to be delivered.
+        events (list or dict) : list of event dictionaries to be delivered, or their payload
+                                from `task_payload.pack_events`
         router_type (str)   : decides the client to use for sending the event
         host_config (dict)  : contains configurations for the host.
     """
-    bulk_send_events(self, events, router_type, host_config)
+    try:
+        bulk_send_events(self, task_payload.unpack_events(events), router_type, host_config)
+    finally:
+        # Retries get their own payload
+        task_payload.release_events(events)
+
+
+def bulk_send_with_splitting(client, events, rate_limiter=None):
+    """
+    Send a batch of events, splitting it to isolate the events the receiver rejects.
+
+    When the receiver rejects a batch because of its content, the batch is split in halves
+    that are sent separately, down to single events. Single events that are still rejected
+    are logged and dropped, sending them again would fail the same way. Other failures
+    (outages, credentials, rate limits) don't depend on the content, so the batch is not split.
+
+    Arguments:
+        client (object)                 : client to send the events with
+        events (list[dict])             : list of event dictionaries to be delivered.
+        rate_limiter (RateLimiter)      : rate limits of the router, if any
+
+    Returns:
+        tuple(list[dict], float): events that were not delivered and should be retried, and the
+            longest delay the receiver asked to wait before sending them again, if any
+    """
+    try:
+        if rate_limiter:
+            rate_limiter.wait(len(events))
+        accepted_ids = client.bulk_send(events)
+    except EventRejected:
+        if len(events) == 1:
+            logger.error('Event rejected by the receiver and dropped: {}'.format(events[0]))
+            return [], None
+        middle = len(events) // 2
+        failed_head, retry_after_head = bulk_send_with_splitting(client, events[:middle], rate_limiter)
+        failed_tail, retry_after_tail = bulk_send_with_splitting(client, events[middle:], rate_limiter)
+        retry_after = max(
+            (delay for delay in (retry_after_head, retry_after_tail) if delay is not None), default=None
+        )
+        return failed_head + failed_tail, retry_after
+    except EventNotDispatched as exc:
+        return events, exc.retry_after
+
+    if accepted_ids is None:
+        return [], None
+    # An LRS returns the IDs of the statements it stored, any statement missing from them was not stored
+    accepted_ids = {str(accepted_id) for accepted_id in accepted_ids}
+    return [
+        event for event in events
+        if get_dispatched_event_id(event) and str(get_dispatched_event_id(event)) not in accepted_ids
+    ], None
 
 
 def bulk_send_events(task, events, router_type, host_config):
     """
     Send event to configured client.
 
+    Only the events that could not be delivered are retried, see `bulk_send_with_splitting`.
+
     Arguments:
         task (object, optional) : celery task object to perform celery actions
         events (list[dict])     : list of event dictionaries to be delivered.
@@ -122,9 +260,14 @@ def bulk_send_events(task, events, router_type, host_config):
         logger.error('Unsupported routing strategy detected: {}'.format(router_type))
         return
 
+    failed_events = events
     try:
-        client = client_class(**host_config)
-        client.bulk_send(events)
+        client = client_class(**get_client_config(host_config))
+        failed_events, retry_after = bulk_send_with_splitting(
+            client, events, RateLimiter.from_host_config(host_config)
+        )
+        if failed_events:
+            raise EventNotDispatched(retry_after=retry_after)
         logger.debug(
             'Successfully bulk dispatched transformed versions of {} events using client: {}'.format(
                 len(events),
@@ -134,7 +277,7 @@ def bulk_send_events(task, events, router_type, host_config):
     except EventNotDispatched as exc:
         logger.exception(
             'Exception occurred while trying to bulk dispatch {} events using client: {}'.format(
-                len(events),
+                len(failed_events),
                 client_class
             ),
             exc_info=True
@@ -144,5 +287,8 @@ def bulk_send_events(task, events, router_type, host_config):
         # the celery task till it succeeds or reaches max retries.
         if not task:
             raise exc
-        raise task.retry(exc=exc, countdown=getattr(settings, 'EVENT_ROUTING_BACKEND_COUNTDOWN', 30),
-                         max_retries=getattr(settings, 'EVENT_ROUTING_BACKEND_MAX_RETRIES', 3))
+        # The payload of the retry is only stored once the retry is going to happen
+        raise get_retry(
+            task, exc, host_config,
+            get_args=lambda: (task_payload.pack_events(failed_events), router_type, host_config),
+        ) from exc
@@ -0,0 +1,72 @@
+"""
+Test the block id helpers.
+"""
+from ddt import data, ddt, unpack
+from django.test import SimpleTestCase
+
+from event_routing_backends.utils.block_ids import (
+    get_block_id_from_event_referrer,
+    get_block_version,
+    get_course_key_parts,
+    get_problem_block_id,
+    make_video_block_id,
+)
+
+
+@ddt
+class TestBlockIds(SimpleTestCase):
+    """
+    Test cases for the block id helpers.
+    """
+
+    @data(
+        ('course-v1:edX+DemoX+Demo_Course', ('block-v1', 'edX+DemoX+Demo_Course')),
+        ('ccx-v1:edX+DemoX+Demo_Course+ccx@1', ('ccx-block-v1', 'edX+DemoX+Demo_Course+ccx@1')),
+        ('edX/DemoX/Demo_Course', ('block-edX/DemoX/Demo_Course', None)),
+    )
+    @unpack
+    def test_get_course_key_parts(self, course_id, expected):
+        self.assertEqual(get_course_key_parts(course_id), expected)
+        self.assertEqual(get_block_version(course_id), expected[0])
+
+    def test_course_key_parts_are_cached(self):
+        get_course_key_parts.cache_clear()
+
+        make_video_block_id('abc', 'course-v1:edX+Cached+Course')
+        make_video_block_id('def', 'course-v1:edX+Cached+Course')
+
+        self.assertEqual(get_course_key_parts.cache_info().misses, 1)
+        self.assertEqual(get_course_key_parts.cache_info().hits, 1)
+
+    def test_make_video_block_id(self):
+        self.assertEqual(
+            make_video_block_id('abc', 'course-v1:edX+DemoX+Demo_Course'),
+            'block-v1:edX+DemoX+Demo_Course+type@video+block@abc'
+        )
+        with self.assertRaises(ValueError):
+            make_video_block_id('abc', 'edX/DemoX/Demo_Course')
+
+    @data(
+        (None, None),
+        ('https://lms.example.com/courses/course-v1:edX+DemoX+Demo_Course/courseware/', None),
+        ('https://lms.example.com/xblock/?activate_block_id=', None),
+        (
+            'https://lms.example.com/courseware/?child=first&activate_block_id=block-v1%3AedX%2BDemoX%2BDemo_Course'
+            '%2Btype%40problem%2Bblock%40abc',
+            'block-v1:edX+DemoX+Demo_Course+type@problem+block@abc'
+        ),
+    )
+    @unpack
+    def test_get_block_id_from_event_referrer(self, referrer, expected):
+        self.assertEqual(get_block_id_from_event_referrer(referrer), expected)
+
+    def test_get_problem_block_id(self):
+        self.assertEqual(
+            get_problem_block_id(None, 'input_abc_2_1', 'course-v1:edX+DemoX+Demo_Course'),
+            'block-v1:edX+DemoX+Demo_Course+type@problem+block@abc'
+        )
+        self.assertEqual(
+            get_problem_block_id('https://lms.example.com/?activate_block_id=xyz', 'input_abc_2_1', 'course-v1:a+b+c'),
+            'xyz'
+        )
+        self.assertIsNone(get_problem_block_id(None, None, 'course-v1:edX+DemoX+Demo_Course'))
@@ -0,0 +1,77 @@
+"""
+Test the coalescing of single event dispatch tasks.
+"""
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+
+from event_routing_backends.utils import coalescer
+from event_routing_backends.utils.coalescer import DispatchCoalescer, flush_coalescer, get_coalescer
+
+HOST_1 = {'url': 'http://test1.com', 'auth_scheme': None}
+HOST_2 = {'url': 'http://test2.com', 'auth_scheme': None}
+
+
+class TestDispatchCoalescer(TestCase):
+    """
+    Test cases for DispatchCoalescer.
+    """
+
+    def test_full_buffer_is_sent(self):
+        send_batch = MagicMock()
+        dispatch_coalescer = DispatchCoalescer(send_batch, max_events=2, max_delay=60)
+
+        dispatch_coalescer.add({'id': '1'}, 'XAPI_LRS', HOST_1)
+        dispatch_coalescer.add({'id': '2'}, 'XAPI_LRS', HOST_2)
+        send_batch.assert_not_called()
+        # Host configurations that are equal but not the same object share a buffer
+        dispatch_coalescer.add({'id': '3'}, 'XAPI_LRS', dict(reversed(HOST_1.items())))
+
+        send_batch.assert_called_once_with([{'id': '1'}, {'id': '3'}], 'XAPI_LRS', HOST_1)
+        self.assertEqual(len(dispatch_coalescer.buffers), 1)
+
+    def test_buffer_is_sent_after_delay(self):
+        sent = threading.Event()
+        send_batch = MagicMock(side_effect=lambda *args: sent.set())
+        dispatch_coalescer = DispatchCoalescer(send_batch, max_events=100, max_delay=0.05)
+
+        dispatch_coalescer.add({'id': '1'}, 'AUTH_HEADERS', HOST_1)
+        dispatch_coalescer.add({'id': '2'}, 'AUTH_HEADERS', HOST_1)
+
+        self.assertTrue(sent.wait(5))
+        send_batch.assert_called_once_with([{'id': '1'}, {'id': '2'}], 'AUTH_HEADERS', HOST_1)
+        self.assertEqual(dispatch_coalescer.buffers, {})
+        self.assertTrue(dispatch_coalescer.thread.daemon)
+
+    def test_flush(self):
+        send_batch = MagicMock(side_effect=[Exception('boom'), None])
+        dispatch_coalescer = DispatchCoalescer(send_batch, max_events=100, max_delay=60)
+        dispatch_coalescer.add({'id': '1'}, 'XAPI_LRS', HOST_1)
+        dispatch_coalescer.add({'id': '2'}, 'XAPI_LRS', HOST_2)
+
+        with patch('event_routing_backends.utils.coalescer.logger') as mock_logger:
+            dispatch_coalescer.flush()
+
+        self.assertEqual(send_batch.call_count, 2)
+        mock_logger.exception.assert_called_once_with('Could not send 1 coalesced events')
+        self.assertEqual(dispatch_coalescer.buffers, {})
+
+    @override_settings(EVENT_ROUTING_BACKEND_COALESCE_MAX_EVENTS=10, EVENT_ROUTING_BACKEND_COALESCE_MAX_DELAY_MS=250)
+    @patch('event_routing_backends.utils.coalescer.os.getpid')
+    def test_get_coalescer_per_process(self, mock_getpid):
+        self.addCleanup(setattr, coalescer, '_coalescer', None)
+        send_batch = MagicMock()
+        mock_getpid.return_value = 1
+
+        first = get_coalescer(send_batch)
+        self.assertIs(get_coalescer(send_batch), first)
+        self.assertEqual((first.max_events, first.max_delay), (10, 0.25))
+
+        first.buffers['key'] = coalescer.EventBuffer('XAPI_LRS', HOST_1, 0)
+        first.buffers['key'].events.append({'id': '1'})
+        mock_getpid.return_value = 2
+        # Buffers inherited from the parent process are not sent by the child
+        flush_coalescer()
+        send_batch.assert_not_called()
+        self.assertIsNot(get_coalescer(send_batch), first)
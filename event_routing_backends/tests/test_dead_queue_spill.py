@@ -0,0 +1,50 @@
+"""
+Test the object storage for spilled dead queue batches.
+"""
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from event_routing_backends.utils.dead_queue_spill import DeadQueueSpillStorage, get_spill_storage
+
+
+class TestDeadQueueSpillStorage(SimpleTestCase):
+    """
+    Test the spill storage with the libcloud LOCAL driver.
+    """
+
+    def setUp(self):
+        super().setUp()
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(tmp_dir.cleanup)
+        os.mkdir(os.path.join(tmp_dir.name, 'spill'))
+        self.settings = {
+            'EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER': 'LOCAL',
+            'EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_CONFIG': {
+                'key': tmp_dir.name, 'container': 'spill', 'prefix': 'erb/',
+            },
+        }
+
+    def test_not_configured(self):
+        self.assertIsNone(get_spill_storage())
+
+    def test_spill_and_read(self):
+        with override_settings(**self.settings):
+            storage = get_spill_storage()
+        self.assertIsInstance(storage, DeadQueueSpillStorage)
+        first = [{'name': 'a', 'data': {'key': 'é'}}, {'name': 'b'}]
+        second = [{'name': 'c'}]
+
+        first_name = storage.spill('xapi', first)
+        second_name = storage.spill('xapi', second)
+        storage.spill('caliper', second)
+
+        self.assertTrue(first_name.startswith('erb/dead_queue_xapi/'))
+        self.assertTrue(first_name.endswith('.jsonl.gz'))
+        spilled = storage.list_spilled('xapi')
+        self.assertEqual([obj.name for obj in spilled], [first_name, second_name])
+        self.assertEqual([storage.read(obj) for obj in spilled], [first, second])
+
+        storage.delete(spilled[0])
+        self.assertEqual([obj.name for obj in storage.list_spilled('xapi')], [second_name])
@@ -1,18 +1,29 @@
 """
 Test the helper methods.
 """
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
-from ddt import data, ddt
-from django.test import TestCase
+from dateutil.parser import parse
+from ddt import data, ddt, unpack
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
 from event_routing_backends.helpers import (
+    clear_courses,
+    clear_external_user_ids,
+    clear_prefetched,
+    clear_unknown_users,
+    convert_datetime_to_iso,
+    convert_iso_string_to_iso,
     get_anonymous_user_id,
     get_block_id_from_event_referrer,
     get_course_from_id,
+    get_dispatched_event_id,
     get_user,
     get_user_email,
     get_uuid5,
+    prefetch_courses,
+    prefetch_users,
 )
 from event_routing_backends.tests.factories import UserFactory
 
@@ -27,6 +38,10 @@ class TestHelpers(TestCase):
         super().setUp()
         self.edx_user = UserFactory.create(username='edx', email='edx@example.com')
         UserFactory.create(username='10228945687', email='edx@example.com')
+        clear_unknown_users()
+        self.addCleanup(clear_unknown_users)
+        self.addCleanup(clear_external_user_ids)
+        self.addCleanup(cache.clear)
 
     def test_get_block_id_from_event_referrer_with_error(self):
         sample_event = {
@@ -41,6 +56,7 @@ class TestHelpers(TestCase):
             mock_pr_user.return_value = None
             email = get_user_email('unknown')
             self.assertEqual(email, 'unknown@example.com')
+        clear_unknown_users()
         with patch('event_routing_backends.helpers.get_potentially_retired_user_by_username') as mock_pr_user:
             mock_pr_user.side_effect = Exception('User not found')
             email = get_user_email('unknown')
@@ -59,6 +75,55 @@ class TestHelpers(TestCase):
         with self.assertRaises(ValueError):
             get_anonymous_user_id('12345678', 'XAPI')
 
+    @patch('event_routing_backends.helpers.ExternalId')
+    def test_get_anonymous_user_id_cached(self, mocked_external_id):
+        mocked_external_id.add_new_user_id.return_value = (MagicMock(external_user_id='edx-xapi-id'), True)
+
+        self.assertEqual(get_anonymous_user_id('edx', 'XAPI'), 'edx-xapi-id')
+        self.assertEqual(get_anonymous_user_id('edx', 'XAPI'), 'edx-xapi-id')
+        mocked_external_id.add_new_user_id.assert_called_once()
+
+        # Another process finds the id in the shared cache
+        clear_external_user_ids()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_anonymous_user_id('edx', 'XAPI'), 'edx-xapi-id')
+        mocked_external_id.add_new_user_id.assert_called_once()
+
+        mocked_external_id.add_new_user_id.return_value = (MagicMock(external_user_id='edx-caliper-id'), True)
+        self.assertEqual(get_anonymous_user_id('edx', 'CALIPER'), 'edx-caliper-id')
+        self.assertEqual(mocked_external_id.add_new_user_id.call_count, 2)
+
+    def test_get_anonymous_user_id_shared_cache_first_write_kept(self):
+        def create_anonymous_user_id(username_or_id, external_type):
+            # Another process caches the id while this one creates it
+            with patch('event_routing_backends.helpers.create_anonymous_user_id', return_value='first-id'):
+                get_anonymous_user_id(username_or_id, external_type)
+            clear_external_user_ids()
+            return 'second-id'
+
+        with patch('event_routing_backends.helpers.create_anonymous_user_id', side_effect=create_anonymous_user_id):
+            self.assertEqual(get_anonymous_user_id('edx', 'XAPI'), 'second-id')
+
+        clear_external_user_ids()
+        self.assertEqual(get_anonymous_user_id('edx', 'XAPI'), 'first-id')
+
+    @override_settings(EVENT_ROUTING_BACKEND_EXTERNAL_ID_CACHE=None)
+    @patch('event_routing_backends.helpers.ExternalId')
+    def test_get_anonymous_user_id_without_shared_cache(self, mocked_external_id):
+        mocked_external_id.add_new_user_id.return_value = (MagicMock(external_user_id='edx-xapi-id'), True)
+
+        self.assertEqual(get_anonymous_user_id('edx', 'XAPI'), 'edx-xapi-id')
+        clear_external_user_ids()
+        self.assertEqual(get_anonymous_user_id('edx', 'XAPI'), 'edx-xapi-id')
+
+        self.assertEqual(mocked_external_id.add_new_user_id.call_count, 2)
+
+    def test_get_dispatched_event_id(self):
+        self.assertEqual(get_dispatched_event_id({'id': 'abc'}), 'abc')
+        self.assertEqual(get_dispatched_event_id({'sensor': 'lms', 'data': [{'id': 'abc'}]}), 'abc')
+        self.assertIsNone(get_dispatched_event_id({'sensor': 'lms', 'data': [{'id': 'a'}, {'id': 'b'}]}))
+        self.assertIsNone(get_dispatched_event_id({'name': 'no id'}))
+
     def test_get_uuid5(self):
         actor = '''{
             "objectType": "Agent",
@@ -125,3 +190,133 @@ class TestHelpers(TestCase):
         user = get_user(str(right_user.id))
 
         self.assertEqual(right_user, user)
+
+    def test_prefetch_users(self):
+        right_user = UserFactory.create(username='testing', email='testing@example.com')
+        # Create user with the previous user id as username.
+        UserFactory.create(username=right_user.id, email='wrong-testing@example.com')
+        self.addCleanup(clear_prefetched)
+
+        with self.assertNumQueries(2):
+            prefetch_users(['edx', '10228945687', str(right_user.id), None, 'unknown'])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user('edx'), self.edx_user)
+            self.assertEqual(get_user(right_user.id), right_user)
+            self.assertEqual(get_user('10228945687').username, '10228945687')
+            prefetch_users(['edx'])
+
+        clear_prefetched()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user('edx'), self.edx_user)
+
+    @patch('event_routing_backends.helpers.get_potentially_retired_user_by_username', return_value=None)
+    @patch('event_routing_backends.helpers.create_anonymous_user_id', return_value='anonymous-id')
+    def test_prefetch_users_skips_cached(self, mock_create_anonymous_user_id, mock_pr_user):
+        self.addCleanup(clear_prefetched)
+        get_anonymous_user_id('edx', 'XAPI')
+        get_user('unknown')
+
+        with self.assertNumQueries(0):
+            prefetch_users(['edx', 'unknown'], 'XAPI')
+
+        # The anonymous id of another type is not cached, so the user is still needed
+        with self.assertNumQueries(1):
+            prefetch_users(['edx', 'unknown'], 'CALIPER')
+        mock_create_anonymous_user_id.assert_called_once_with('edx', 'XAPI')
+        mock_pr_user.assert_called_once_with('unknown')
+
+    @patch('event_routing_backends.helpers.increment')
+    @patch('event_routing_backends.helpers.get_potentially_retired_user_by_username')
+    def test_get_user_unknown_cached(self, mock_pr_user, mock_increment):
+        mock_pr_user.return_value = None
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_user('unknown'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_user('unknown'))
+            self.assertEqual(get_user_email('unknown'), 'unknown@example.com')
+            with self.assertRaises(ValueError):
+                get_anonymous_user_id('unknown', 'XAPI')
+
+        mock_pr_user.assert_called_once_with('unknown')
+        self.assertEqual(
+            [call.args[0] for call in mock_increment.call_args_list],
+            [
+                'event_routing_backends.unknown_user_cache.misses',
+                'event_routing_backends.unknown_user_cache.hits',
+                'event_routing_backends.unknown_user_cache.hits',
+                'event_routing_backends.unknown_user_cache.hits',
+            ]
+        )
+        self.assertEqual(get_user('edx'), self.edx_user)
+
+        UserFactory.create(username='unknown')
+        clear_unknown_users()
+        self.assertEqual(get_user('unknown').username, 'unknown')
+
+    @override_settings(EVENT_ROUTING_BACKEND_UNKNOWN_USER_CACHE_TTL=0)
+    @patch('event_routing_backends.helpers.get_potentially_retired_user_by_username')
+    def test_get_user_unknown_not_cached(self, mock_pr_user):
+        mock_pr_user.return_value = None
+
+        self.assertIsNone(get_user('unknown'))
+        self.assertIsNone(get_user('unknown'))
+
+        self.assertEqual(mock_pr_user.call_count, 2)
+
+    @patch('event_routing_backends.helpers.CourseKey')
+    @patch('event_routing_backends.helpers.get_course_overviews')
+    def test_prefetch_courses(self, mock_get_course_overviews, mock_course_key):
+        course = MagicMock(id='course-v1:edX+Prefetched+Course')
+        mock_course_key.from_string.side_effect = lambda course_id: course_id
+        mock_get_course_overviews.return_value = [course]
+        self.addCleanup(clear_courses)
+
+        prefetch_courses([course.id, course.id, None])
+
+        mock_get_course_overviews.assert_called_once_with([course.id])
+        self.assertEqual(get_course_from_id(course.id), course)
+        # Cached courses are not loaded again, by later batches either
+        prefetch_courses([course.id])
+        mock_get_course_overviews.assert_called_once()
+
+    @patch('event_routing_backends.helpers.CourseKey')
+    @patch('event_routing_backends.helpers.get_course_overviews')
+    def test_get_course_from_id_cached(self, mock_get_course_overviews, mock_course_key):
+        course = MagicMock(id='course-v1:edX+Cached+Course')
+        mock_course_key.from_string.side_effect = lambda course_id: course_id
+        mock_get_course_overviews.return_value = [course]
+        self.addCleanup(clear_courses)
+
+        self.assertEqual(get_course_from_id(course.id), course)
+        self.assertEqual(get_course_from_id(course.id), course)
+        prefetch_courses([course.id])
+        mock_get_course_overviews.assert_called_once_with([course.id])
+
+        mock_get_course_overviews.return_value = []
+        with self.assertRaises(ValueError):
+            get_course_from_id('course-v1:edX+Missing+Course')
+
+    @data(
+        ('2020-01-01T12:12:12.123456+00:00', '2020-01-01T12:12:12.123Z'),
+        ('2020-01-01T12:12:12.123456Z', '2020-01-01T12:12:12.123Z'),
+        ('2020-01-01 12:12:12+05:30', '2020-01-01T06:42:12.000Z'),
+        ('2020-01-01T12:12:12.1234567-0100', '2020-01-01T13:12:12.123Z'),
+        ('Wed, 01 Jan 2020 12:12:12 GMT', '2020-01-01T12:12:12.000Z'),
+        ('2020-01-01T12:12:12.123456 UTC', '2020-01-01T12:12:12.123Z'),
+    )
+    @unpack
+    def test_convert_datetime_to_iso(self, datetime_string, expected):
+        self.assertEqual(convert_datetime_to_iso(datetime_string), expected)
+
+    @patch('event_routing_backends.helpers.parse', wraps=parse)
+    def test_convert_datetime_to_iso_fast_path(self, mock_parse):
+        convert_iso_string_to_iso.cache_clear()
+
+        self.assertEqual(convert_datetime_to_iso('2021-02-03T04:05:06.789+00:00'), '2021-02-03T04:05:06.789Z')
+        self.assertEqual(convert_datetime_to_iso('2021-02-03T04:05:06.789+00:00'), '2021-02-03T04:05:06.789Z')
+        mock_parse.assert_not_called()
+        self.assertEqual(convert_iso_string_to_iso.cache_info().hits, 1)
+
+        self.assertEqual(convert_datetime_to_iso('Feb 3 2021 04:05:06 UTC'), '2021-02-03T04:05:06.000Z')
+        mock_parse.assert_called_once_with('Feb 3 2021 04:05:06 UTC')
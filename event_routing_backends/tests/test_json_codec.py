@@ -0,0 +1,80 @@
+"""
+Test the pluggable JSON codec.
+"""
+import json
+from datetime import datetime, timezone
+from unittest import skipUnless
+from unittest.mock import patch
+
+from ddt import data, ddt
+from django.test import SimpleTestCase, override_settings
+
+from event_routing_backends.utils import json_codec
+
+CODECS = [json_codec.CODEC_JSON] + ([json_codec.CODEC_ORJSON] if json_codec.orjson else [])
+
+
+@ddt
+class TestJSONCodec(SimpleTestCase):
+    """
+    Test the JSON codecs and their selection.
+    """
+
+    def setUp(self):
+        super().setUp()
+        json_codec._get_codec.cache_clear()  # pylint: disable=protected-access
+        self.addCleanup(json_codec._get_codec.cache_clear)  # pylint: disable=protected-access
+
+    @data(*CODECS)
+    def test_round_trip(self, name):
+        event = {
+            'name': 'edx.course.enrollment.activated',
+            'timestamp': datetime(2024, 1, 2, 3, 4, 5, 678),
+            'event_time': datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            'data': {'course_id': 'course-v1:edX+DemoX+Demo_Course', 'title': 'Déjà vu', 1: None},
+        }
+        with override_settings(EVENT_ROUTING_BACKEND_JSON_CODEC=name):
+            codec = json_codec.get_json_codec()
+            self.assertEqual(codec.name, name)
+            serialized = json_codec.dumps(event)
+            self.assertEqual(json_codec.dumps_bytes(event), serialized.encode('utf-8'))
+            self.assertEqual(json_codec.loads(serialized), json_codec.loads(serialized.encode('utf-8')))
+
+        # Whatever the codec, the values match what eventtracking itself would write
+        self.assertEqual(json.loads(serialized), {
+            'name': 'edx.course.enrollment.activated',
+            'timestamp': '2024-01-02T03:04:05.000678+00:00',
+            'event_time': '2024-01-02T03:04:05+00:00',
+            'data': {'course_id': 'course-v1:edX+DemoX+Demo_Course', 'title': 'Déjà vu', '1': None},
+        })
+
+    @skipUnless(json_codec.orjson, 'orjson is not installed')
+    def test_orjson_falls_back_to_stdlib(self):
+        with override_settings(EVENT_ROUTING_BACKEND_JSON_CODEC=json_codec.CODEC_ORJSON):
+            self.assertEqual(json.loads(json_codec.dumps({'big': 2 ** 70})), {'big': 2 ** 70})
+
+    def test_loads_error(self):
+        for name in CODECS:
+            with override_settings(EVENT_ROUTING_BACKEND_JSON_CODEC=name):
+                with self.assertRaises(json.JSONDecodeError):
+                    json_codec.loads('{"name": "broken" "data": {}}')
+
+    def test_auto(self):
+        with override_settings(EVENT_ROUTING_BACKEND_JSON_CODEC=json_codec.CODEC_AUTO):
+            self.assertEqual(json_codec.get_json_codec().name, CODECS[-1])
+
+        json_codec._get_codec.cache_clear()  # pylint: disable=protected-access
+        with patch.object(json_codec, 'orjson', None):
+            with override_settings(EVENT_ROUTING_BACKEND_JSON_CODEC=json_codec.CODEC_AUTO):
+                self.assertEqual(json_codec.get_json_codec().name, json_codec.CODEC_JSON)
+
+    def test_orjson_not_installed(self):
+        with patch.object(json_codec, 'orjson', None):
+            with override_settings(EVENT_ROUTING_BACKEND_JSON_CODEC=json_codec.CODEC_ORJSON):
+                with self.assertRaises(ImportError):
+                    json_codec.get_json_codec()
+
+    def test_unknown_codec(self):
+        with override_settings(EVENT_ROUTING_BACKEND_JSON_CODEC='simplejson'):
+            with self.assertRaises(ValueError):
+                json_codec.get_json_codec()
@@ -46,6 +46,13 @@ class TestRouterConfiguration(TestCase, RouterTestMixin):
     def test_str_method(self):
         self.assertIsNotNone(str(RouterConfiguration()))
 
+    def test_get_rate_limit(self):
+        self.assertIsNone(RouterConfiguration().get_rate_limit())
+        self.assertEqual(
+            RouterConfiguration(max_statements_per_second=100).get_rate_limit(),
+            {'requests_per_second': None, 'statements_per_second': 100},
+        )
+
     def test_enabled_router_is_returned(self):
         first_router = RouterConfigurationFactory(
             configurations='{}',
@@ -0,0 +1,61 @@
+"""
+Test the encoding of queued events.
+"""
+import glob
+import json
+import os
+
+from django.test import SimpleTestCase, override_settings
+
+from event_routing_backends.processors import tests as processor_tests
+from event_routing_backends.utils import json_codec, queue_encoding
+
+FIXTURES = glob.glob(os.path.join(os.path.dirname(processor_tests.__file__), 'fixtures', 'current', '*.json'))
+
+
+class TestQueueEncoding(SimpleTestCase):
+    """
+    Test the encoding of queued events.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.events = []
+        for path in sorted(FIXTURES):
+            with open(path, encoding='utf-8') as f:
+                self.events.append(json.load(f))
+
+    def test_json_by_default(self):
+        event = self.events[0]
+        self.assertEqual(queue_encoding.encode(event), json_codec.dumps(event))
+
+    @override_settings(EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION=True)
+    def test_compressed_round_trip(self):
+        for event in self.events:
+            payload = queue_encoding.encode(event)
+            self.assertEqual(payload[0], queue_encoding.FORMAT_DEFLATE_V1)
+            self.assertEqual(queue_encoding.decode(payload), event)
+
+        # The preset dictionary makes a real difference on tracking events
+        compressed = sum(len(queue_encoding.encode(event)) for event in self.events)
+        uncompressed = sum(len(json_codec.dumps_bytes(event)) for event in self.events)
+        self.assertLess(compressed, uncompressed * 0.5)
+
+    def test_mixed_formats(self):
+        event = self.events[0]
+        with override_settings(EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION=True):
+            compressed = queue_encoding.encode(event)
+        queue = [
+            compressed,
+            json_codec.dumps(event),
+            json_codec.dumps_bytes(event),
+            b'\n' + json_codec.dumps_bytes(event),
+        ]
+
+        self.assertEqual([queue_encoding.decode(payload) for payload in queue], [event] * 4)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            queue_encoding.decode(b'\x7f' + b'garbage')
+        with self.assertRaises(ValueError):
+            queue_encoding.decode(b'\x02' + b'garbage')
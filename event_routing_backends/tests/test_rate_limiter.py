@@ -0,0 +1,69 @@
+"""
+Test the router rate limiter.
+"""
+from unittest.mock import patch
+
+from django.test import TestCase
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from event_routing_backends.utils.rate_limiter import TOKEN_BUCKET_SCRIPT, RateLimiter, get_client_config
+
+
+@patch('event_routing_backends.utils.rate_limiter.time.time', return_value=1000.0)
+@patch('event_routing_backends.utils.rate_limiter.get_redis_connection')
+class TestRateLimiter(TestCase):
+    """
+    Test cases for RateLimiter.
+    """
+
+    def test_acquire(self, mock_get_redis_connection, _):
+        redis = mock_get_redis_connection.return_value
+        redis.register_script.return_value.return_value = b'1.5'
+        rate_limiter = RateLimiter('http://test.com', requests_per_second=5, statements_per_second=100)
+
+        self.assertEqual(rate_limiter.acquire(250), 1.5)
+
+        redis.register_script.assert_called_once_with(TOKEN_BUCKET_SCRIPT)
+        redis.register_script.return_value.assert_called_once_with(
+            keys=[
+                'event_routing_rate_limit_http://test.com_requests',
+                'event_routing_rate_limit_http://test.com_statements',
+            ],
+            args=[1000.0, 5, 1, 100, 250],
+        )
+
+    def test_acquire_without_limits(self, mock_get_redis_connection, _):
+        self.assertEqual(RateLimiter('http://test.com').acquire(10), 0.0)
+        mock_get_redis_connection.assert_not_called()
+
+    def test_acquire_redis_error(self, mock_get_redis_connection, _):
+        mock_get_redis_connection.return_value.register_script.return_value.side_effect = RedisConnectionError
+
+        self.assertEqual(RateLimiter('http://test.com', requests_per_second=5).acquire(), 0.0)
+
+    @patch('event_routing_backends.utils.rate_limiter.time.sleep')
+    def test_wait(self, mock_sleep, mock_get_redis_connection, _):
+        script = mock_get_redis_connection.return_value.register_script.return_value
+        script.side_effect = [b'0', b'0.25']
+        rate_limiter = RateLimiter('http://test.com', requests_per_second=5)
+
+        rate_limiter.wait()
+        mock_sleep.assert_not_called()
+        rate_limiter.wait()
+        mock_sleep.assert_called_once_with(0.25)
+
+    def test_get_interval(self, *_):
+        self.assertEqual(RateLimiter('http://test.com', requests_per_second=2).get_interval(100), 0.5)
+        self.assertEqual(RateLimiter('http://test.com', 2, 50).get_interval(100), 2)
+        self.assertEqual(RateLimiter('http://test.com').get_interval(100), 0)
+
+    def test_from_host_config(self, *_):
+        self.assertIsNone(RateLimiter.from_host_config({'url': 'http://test.com'}))
+
+        host_config = {'url': 'http://test.com', 'rate_limit': {'requests_per_second': 3}}
+        rate_limiter = RateLimiter.from_host_config(host_config)
+
+        self.assertEqual(rate_limiter.route_url, 'http://test.com')
+        self.assertEqual(rate_limiter.requests_per_second, 3)
+        self.assertIsNone(rate_limiter.statements_per_second)
+        self.assertEqual(get_client_config(host_config), {'url': 'http://test.com'})
@@ -0,0 +1,67 @@
+"""
+Test the retry delays and retry budgets of the dispatch tasks.
+"""
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from event_routing_backends.utils.http_client import parse_retry_after
+from event_routing_backends.utils.retry import consume_retry_budget, get_retry_countdown
+
+
+@override_settings(EVENT_ROUTING_BACKEND_COUNTDOWN=30, EVENT_ROUTING_BACKEND_MAX_COUNTDOWN=600)
+class TestRetry(TestCase):
+    """
+    Test cases for the retry helpers.
+    """
+
+    @patch('event_routing_backends.utils.retry.random.uniform', side_effect=lambda low, high: high)
+    def test_get_retry_countdown_backoff(self, _):
+        self.assertEqual([get_retry_countdown(retries) for retries in range(6)], [30, 60, 120, 240, 480, 600])
+
+    def test_get_retry_countdown_jitter(self):
+        countdowns = {get_retry_countdown(3) for _ in range(20)}
+
+        self.assertGreater(len(countdowns), 1)
+        self.assertTrue(all(0 <= countdown <= 240 for countdown in countdowns))
+
+    @patch('event_routing_backends.utils.retry.random.uniform', return_value=5)
+    def test_get_retry_countdown_retry_after(self, mock_uniform):
+        self.assertEqual(get_retry_countdown(0, retry_after=120), 125)
+        mock_uniform.assert_called_once_with(0, 30)
+        self.assertEqual(get_retry_countdown(0, retry_after=86400), 605)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120.0)
+        self.assertEqual(parse_retry_after('-1'), 0.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+        retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=90), usegmt=True)
+        self.assertAlmostEqual(parse_retry_after(retry_at), 90, delta=2)
+
+    @patch('event_routing_backends.utils.retry.get_redis_connection')
+    def test_consume_retry_budget_disabled(self, mock_get_redis_connection):
+        self.assertTrue(consume_retry_budget('http://test.com'))
+        mock_get_redis_connection.assert_not_called()
+
+    @override_settings(EVENT_ROUTING_BACKEND_RETRY_BUDGET=2)
+    @patch('event_routing_backends.utils.retry.time.time', return_value=600)
+    @patch('event_routing_backends.utils.retry.get_redis_connection')
+    def test_consume_retry_budget(self, mock_get_redis_connection, _):
+        pipeline = mock_get_redis_connection.return_value.pipeline.return_value
+        pipeline.execute.side_effect = [[1, True], [2, True], [3, True]]
+
+        self.assertEqual([consume_retry_budget('http://test.com') for _ in range(3)], [True, True, False])
+        pipeline.incr.assert_called_with('event_routing_retry_budget_http://test.com_10')
+        pipeline.expire.assert_called_with('event_routing_retry_budget_http://test.com_10', 120)
+
+    @override_settings(EVENT_ROUTING_BACKEND_RETRY_BUDGET=2)
+    @patch('event_routing_backends.utils.retry.get_redis_connection')
+    def test_consume_retry_budget_redis_error(self, mock_get_redis_connection):
+        mock_get_redis_connection.return_value = MagicMock()
+        mock_get_redis_connection.return_value.pipeline.return_value.execute.side_effect = RedisConnectionError
+
+        self.assertTrue(consume_retry_budget('http://test.com'))
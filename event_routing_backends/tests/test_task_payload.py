@@ -0,0 +1,71 @@
+"""
+Test the encoding of bulk dispatch task payloads.
+"""
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from event_routing_backends.utils import json_codec
+from event_routing_backends.utils.task_payload import pack_events, release_events, unpack_events
+
+EVENTS = [{'id': str(i), 'verb': {'id': 'http://adlnet.gov/expapi/verbs/answered'}} for i in range(50)]
+
+
+@patch('event_routing_backends.utils.task_payload.get_redis_connection')
+class TestTaskPayload(TestCase):
+    """
+    Test cases for the bulk task payloads.
+    """
+
+    def test_events(self, mock_get_redis_connection):
+        self.assertIs(pack_events(EVENTS), EVENTS)
+        self.assertIs(unpack_events(EVENTS), EVENTS)
+        release_events(EVENTS)
+        mock_get_redis_connection.assert_not_called()
+
+    @override_settings(EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD='compressed')
+    def test_compressed(self, mock_get_redis_connection):
+        payload = pack_events(EVENTS)
+
+        self.assertEqual(payload['format'], 'deflate')
+        # The payload must go through the Celery JSON serializer
+        self.assertEqual(json_codec.loads(json_codec.dumps(payload)), payload)
+        self.assertLess(len(payload['data']), len(json_codec.dumps_bytes(EVENTS)) / 5)
+        self.assertEqual(unpack_events(payload), EVENTS)
+        release_events(payload)
+        mock_get_redis_connection.assert_not_called()
+
+    @override_settings(
+        EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD='claim_check',
+        EVENT_ROUTING_BACKEND_CLAIM_CHECK_MIN_SIZE=100,
+        EVENT_ROUTING_BACKEND_CLAIM_CHECK_TTL=60,
+    )
+    def test_claim_check(self, mock_get_redis_connection):
+        redis = mock_get_redis_connection.return_value
+
+        payload = pack_events(EVENTS)
+
+        self.assertEqual(payload['format'], 'claim_check')
+        key, data = redis.set.call_args.args
+        self.assertEqual(key, payload['key'])
+        self.assertEqual(redis.set.call_args.kwargs, {'ex': 60})
+        redis.get.return_value = data
+        self.assertEqual(unpack_events(payload), EVENTS)
+        redis.get.assert_called_once_with(key)
+        release_events(payload)
+        redis.delete.assert_called_once_with(key)
+
+        # Small batches are passed compressed
+        self.assertEqual(pack_events(EVENTS[:1])['format'], 'deflate')
+
+    def test_claim_check_expired(self, mock_get_redis_connection):
+        mock_get_redis_connection.return_value.get.return_value = None
+
+        self.assertEqual(unpack_events({'format': 'claim_check', 'key': 'event_routing_bulk_payload_1'}), [])
+
+    @override_settings(EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD='pickle')
+    def test_unknown(self, _):
+        with self.assertRaises(ValueError):
+            pack_events(EVENTS)
+        with self.assertRaises(ValueError):
+            unpack_events({'format': 'pickle'})
@@ -0,0 +1,60 @@
+"""
+Test the in-process cache with expiring entries.
+"""
+from unittest import TestCase
+from unittest.mock import patch
+
+from event_routing_backends.utils.ttl_cache import TTLCache
+
+
+class TestTTLCache(TestCase):
+    """
+    Test the TTLCache class.
+    """
+
+    @patch('event_routing_backends.utils.ttl_cache.time.monotonic')
+    def test_expiry(self, mock_monotonic):
+        cache = TTLCache(maxsize=10)
+        mock_monotonic.return_value = 100
+        cache.set('key', 'value', ttl=10)
+
+        mock_monotonic.return_value = 109
+        self.assertEqual(cache.get('key'), 'value')
+        mock_monotonic.return_value = 110
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(len(cache), 0)
+
+        cache.set('key', 'value', ttl=None)
+        mock_monotonic.return_value = 10 ** 9
+        self.assertEqual(cache.get('key'), 'value')
+
+    def test_eviction(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+        cache.get('a')
+        cache.set('c', 3, ttl=60)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_disabled(self):
+        cache = TTLCache(maxsize=0)
+        cache.set('a', 1, ttl=60)
+        self.assertEqual(cache.get('a', 'default'), 'default')
+
+        cache = TTLCache(maxsize=10)
+        cache.set('a', 1, ttl=0)
+        self.assertIsNone(cache.get('a'))
+
+    def test_delete_and_clear(self):
+        cache = TTLCache(maxsize=10)
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+
+        cache.delete('a')
+        cache.delete('missing')
+        self.assertIsNone(cache.get('a'))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
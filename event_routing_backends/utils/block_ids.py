@@ -0,0 +1,137 @@
+"""
+Block ids of the problems and videos of tracking events.
+
+The block version prefix and the course key fragment of a block id only depend on the
+course id, so they are derived once per course and cached, as are the block ids found in
+the `activate_block_id` parameter of referrer URLs.
+"""
+from functools import lru_cache
+from urllib.parse import parse_qs, urlparse
+
+BLOCK_ID_FORMAT = '{block_version}:{course_id}+type@{block_type}+block@{block_id}'
+
+
+@lru_cache(maxsize=1024)
+def get_course_key_parts(course_id):
+    """
+    Return the block version prefix and the course key fragment of a course id.
+
+    Arguments:
+        course_id (str):    course id, e.g. `course-v1:edX+DemoX+Demo_Course`
+
+    Returns:
+        tuple(str, str): e.g. `('block-v1', 'edX+DemoX+Demo_Course')`, the fragment is None if
+        the course id has none
+    """
+    course_id_array = course_id.split(':')
+    block_version = "block-{0}".format(course_id_array[0].split("-")[-1])
+    if "ccx" in course_id_array[0]:
+        block_version = "ccx-{block_version}".format(block_version=block_version)
+    return block_version, course_id_array[1] if len(course_id_array) > 1 else None
+
+
+def make_block_id(course_id, block_type, block_id):
+    """
+    Return the usage key of a block of a course.
+
+    Arguments:
+        course_id (str):    course id
+        block_type (str):   type of the block, e.g. `problem`
+        block_id (str):     id of the block within the course
+
+    Returns:
+        str
+
+    Raises:
+        ValueError: if the course id has no course key fragment
+    """
+    block_version, course_key = get_course_key_parts(course_id)
+    if course_key is None:
+        raise ValueError(f'Cannot make a block id for course {course_id}.')
+    return BLOCK_ID_FORMAT.format(
+        block_version=block_version,
+        course_id=course_key,
+        block_type=block_type,
+        block_id=block_id
+    )
+
+
+@lru_cache(maxsize=1024)
+def get_block_id_from_event_referrer(referrer):
+    """
+    Derive and return block id from event referrer.
+
+    Arguments:
+        referrer (str):   referrer string.
+
+    Returns:
+        str or None
+    """
+    if referrer is None:
+        return None
+    # parse_qs leaves out blank values
+    return parse_qs(urlparse(referrer).query).get('activate_block_id', [None])[0]
+
+
+def get_block_id_from_event_data(data, course_id):
+    """
+    Derive and return block id from event data.
+
+    Arguments:
+        data (str):   data string.
+        course_id       (str) : course key string
+
+    Returns:
+        str or None
+    """
+    if data is None or course_id is None:
+        return None
+    data_array = data.split('_')
+    if len(data_array) > 1 and get_course_key_parts(course_id)[1] is not None:
+        return make_block_id(course_id, 'problem', data_array[1])
+    return None  # pragma: no cover
+
+
+def get_problem_block_id(referrer, data, course_id):
+    """
+    Derive and return block id from event data.
+
+    Arguments:
+        referrer (str):   referrer string.
+        data (str):   data string.
+        course_id       (str) : course key string
+
+    Returns:
+        str or None
+    """
+    block_id = get_block_id_from_event_referrer(referrer)
+    if block_id is None:
+        block_id = get_block_id_from_event_data(data, course_id)
+    return block_id
+
+
+def make_video_block_id(video_id, course_id):
+    """
+    Return formatted video block id for provided video and course.
+
+    Arguments:
+        video_id        (str) : id for the video object
+        course_id       (str) : course key string
+
+    Returns:
+        str
+    """
+    return make_block_id(course_id, 'video', video_id)
+
+
+def get_block_version(course_id):
+    """
+    Return versioned block id.
+
+    Arguments:
+        course_id (str):    course id
+
+    Returns:
+        str
+    """
+    return get_course_key_parts(course_id)[0]
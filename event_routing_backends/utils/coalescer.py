@@ -0,0 +1,154 @@
+"""
+Worker side coalescing of single event dispatch tasks into micro-batches.
+
+With `EVENT_ROUTING_BACKEND_COALESCING_ENABLED`, the `dispatch_event` tasks don't send their
+event themselves but add it to an in-memory buffer of the worker process, one per host. A
+buffer is sent with a single bulk request once it holds
+`EVENT_ROUTING_BACKEND_COALESCE_MAX_EVENTS` events, or by a background thread once its first
+event has waited `EVENT_ROUTING_BACKEND_COALESCE_MAX_DELAY_MS` milliseconds. Buffered events
+are lost if the worker process is killed, so only non-persistent events are coalesced.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """
+    Events waiting to be sent to the same host.
+    """
+
+    def __init__(self, router_type, host_config, deadline):
+        """
+        Initialize an empty buffer.
+
+        Arguments:
+            router_type (str):  decides the client to use for sending the events
+            host_config (dict): contains configurations for the host.
+            deadline (float):   `time.monotonic()` value at which the buffer must be sent
+        """
+        self.router_type = router_type
+        self.host_config = host_config
+        self.deadline = deadline
+        self.events = []
+
+
+class DispatchCoalescer:
+    """
+    Buffers of the events waiting to be sent by one worker process.
+    """
+
+    def __init__(self, send_batch, max_events, max_delay):
+        """
+        Initialize the coalescer.
+
+        Arguments:
+            send_batch (callable): called with (events, router_type, host_config) to send a buffer
+            max_events (int):      number of events that triggers sending a buffer
+            max_delay (float):     seconds after which a buffer is sent, however many events it holds
+        """
+        self.send_batch = send_batch
+        self.max_events = max_events
+        self.max_delay = max_delay
+        self.buffers = {}
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def add(self, event, router_type, host_config):
+        """
+        Buffer an event, and send its buffer right away if it is full.
+        """
+        key = (router_type, json.dumps(host_config, sort_keys=True))
+        with self.condition:
+            buffer = self.buffers.get(key)
+            if buffer is None:
+                buffer = EventBuffer(router_type, host_config, time.monotonic() + self.max_delay)
+                self.buffers[key] = buffer
+                self.start()
+                self.condition.notify()
+            buffer.events.append(event)
+            if len(buffer.events) < self.max_events:
+                return
+            del self.buffers[key]
+        self.send(buffer)
+
+    def start(self):
+        """
+        Start the thread sending the buffers that reach their deadline, if it isn't running.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name='event-routing-coalescer', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        """
+        Send buffers as they reach their deadline.
+        """
+        while True:
+            with self.condition:
+                now = time.monotonic()
+                due = [key for key, buffer in self.buffers.items() if buffer.deadline <= now]
+                buffers = [self.buffers.pop(key) for key in due]
+                if not buffers:
+                    next_deadline = min((buffer.deadline for buffer in self.buffers.values()), default=None)
+                    self.condition.wait(None if next_deadline is None else next_deadline - now)
+                    continue
+            for buffer in buffers:
+                self.send(buffer)
+
+    def flush(self):
+        """
+        Send all the buffered events, e.g. when the worker shuts down.
+        """
+        with self.condition:
+            buffers = list(self.buffers.values())
+            self.buffers.clear()
+        for buffer in buffers:
+            self.send(buffer)
+
+    def send(self, buffer):
+        """
+        Send a buffer, logging errors so that the sending thread keeps running.
+        """
+        try:
+            self.send_batch(buffer.events, buffer.router_type, buffer.host_config)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Could not send {} coalesced events'.format(len(buffer.events)))
+
+
+_coalescer = None
+_coalescer_pid = None
+
+
+def get_coalescer(send_batch):
+    """
+    Return the coalescer of the current process, creating it on first use.
+
+    Every forked worker process gets its own buffers and sending thread.
+
+    Arguments:
+        send_batch (callable): called with (events, router_type, host_config) to send a buffer
+    """
+    global _coalescer, _coalescer_pid  # pylint: disable=global-statement
+    if _coalescer is None or _coalescer_pid != os.getpid():
+        _coalescer = DispatchCoalescer(
+            send_batch,
+            getattr(settings, 'EVENT_ROUTING_BACKEND_COALESCE_MAX_EVENTS', 100),
+            getattr(settings, 'EVENT_ROUTING_BACKEND_COALESCE_MAX_DELAY_MS', 500) / 1000,
+        )
+        _coalescer_pid = os.getpid()
+    return _coalescer
+
+
+def flush_coalescer():
+    """
+    Send the events buffered by the coalescer of the current process, if any.
+    """
+    if _coalescer is not None and _coalescer_pid == os.getpid():
+        _coalescer.flush()
@@ -0,0 +1,103 @@
+"""
+Object storage for failed events that don't fit in the Redis dead queue.
+
+When `EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE` is reached, failed batches are written as
+gzipped newline delimited JSON files to the Apache Libcloud container configured with
+`EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER` and `EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_CONFIG`,
+the same providers and configuration keys `transform_tracking_logs` supports. The
+`recover_failed_events` command reads them back.
+"""
+import gzip
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from django.conf import settings
+from libcloud.storage.providers import get_driver
+from libcloud.storage.types import Provider
+
+from event_routing_backends.utils import json_codec
+
+SPILL_OBJECT_PREFIX_FORMAT = '{}dead_queue_{}/'
+
+
+class DeadQueueSpillStorage:
+    """
+    Libcloud container holding spilled dead queue batches, one file per batch.
+    """
+
+    def __init__(self, driver, container_name, prefix):
+        """
+        Initialize the storage.
+
+        Arguments:
+            driver (StorageDriver): libcloud storage driver
+            container_name (str):   name of the container to write to
+            prefix (str):           prefix of the object names
+        """
+        self.driver = driver
+        self.container_name = container_name
+        self.prefix = prefix
+
+    def get_object_prefix(self, backend_name):
+        """
+        Return the prefix of the spilled files of a backend.
+        """
+        return SPILL_OBJECT_PREFIX_FORMAT.format(self.prefix, backend_name)
+
+    def spill(self, backend_name, events):
+        """
+        Write a batch of failed events to a new file.
+
+        Arguments:
+            backend_name (str):  name of the router backend
+            events (list[dict]): failed events
+
+        Returns:
+            str: name of the file
+        """
+        data = gzip.compress(b''.join(json_codec.dumps_bytes(event) + b'\n' for event in events))
+        # Timestamps first, so that listing the files returns them in the order they were written
+        object_name = '{}{:%Y%m%dT%H%M%S%f}_{}.jsonl.gz'.format(
+            self.get_object_prefix(backend_name), datetime.now(timezone.utc), uuid4().hex
+        )
+        container = self.driver.get_container(self.container_name)
+        self.driver.upload_object_via_stream(iterator=iter([data]), container=container, object_name=object_name)
+        return object_name
+
+    def list_spilled(self, backend_name):
+        """
+        Return the spilled files of a backend, oldest first.
+        """
+        container = self.driver.get_container(self.container_name)
+        objects = self.driver.iterate_container_objects(container, self.get_object_prefix(backend_name))
+        return sorted(objects, key=lambda obj: obj.name)
+
+    def read(self, obj):
+        """
+        Return the events stored in a spilled file.
+        """
+        data = gzip.decompress(b''.join(self.driver.download_object_as_stream(obj)))
+        return [json_codec.loads(line) for line in data.splitlines() if line]
+
+    def delete(self, obj):
+        """
+        Delete a spilled file once its events have been handled.
+        """
+        self.driver.delete_object(obj)
+
+
+def get_spill_storage():
+    """
+    Return the configured spill storage, or None if spilling is not configured.
+
+    Returns:
+        DeadQueueSpillStorage
+    """
+    provider = getattr(settings, 'EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_PROVIDER', None)
+    if not provider:
+        return None
+    config = dict(settings.EVENT_ROUTING_BACKEND_DEAD_QUEUE_SPILL_CONFIG)
+    container_name = config.pop('container')
+    prefix = config.pop('prefix', '')
+    driver = get_driver(getattr(Provider, provider))(**config)
+    return DeadQueueSpillStorage(driver, container_name, prefix)
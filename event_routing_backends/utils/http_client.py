@@ -1,15 +1,49 @@
 """
 A generic HTTP Client.
 """
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from logging import getLogger
 
 import requests
+from django.conf import settings
 
 from event_routing_backends.models import RouterConfiguration
-from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched
+from event_routing_backends.processors.caliper.envelope_processor import is_envelope, merge_envelopes
+from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched, EventRejected
 
 logger = getLogger(__name__)
 
+# Client errors that are about the request as a whole (credentials, URL, rate limits) rather than its content
+NON_REJECTION_CLIENT_ERRORS = {401, 403, 404, 407, 408, 429}
+
+
+def parse_retry_after(value):
+    """
+    Return the delay in seconds of a `Retry-After` header, given either as seconds or as an HTTP date.
+
+    Returns:
+        float: the delay, or None if the header is missing or invalid
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_rejection(status_code):
+    """
+    Return True if the response status code means that the receiver rejected the content of the request.
+    """
+    return 400 <= status_code < 500 and status_code not in NON_REJECTION_CLIENT_ERRORS
+
 
 class HttpClient:
     """
@@ -62,11 +96,60 @@ class HttpClient:
         """
         Send the list of events to a configured remote.
 
+        If `EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_EVENTS` is greater than 1, Caliper envelopes
+        are merged into envelopes of several events, each sent with its own request.
+
         Arguments:
             events (list[dict]) :   list of event payloads to send to host.
 
         Returns:
-            requests.Response object
+            list[str]: IDs of the delivered events when envelopes are merged, otherwise None
+        """
+        max_events = getattr(settings, 'EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_EVENTS', 1)
+        if max_events > 1 and events and all(is_envelope(event) for event in events):
+            return self.send_envelopes(merge_envelopes(
+                events,
+                max_events,
+                getattr(settings, 'EVENT_ROUTING_BACKEND_CALIPER_ENVELOPE_MAX_BYTES', 1000000),
+            ))
+        self.post(events, len(events))
+        return None
+
+    def send_envelopes(self, envelopes):
+        """
+        Send Caliper envelopes one request at a time.
+
+        If an envelope fails after others have been delivered, the events of the delivered
+        envelopes are returned so that only the others are sent again.
+
+        Arguments:
+            envelopes (list[dict]) :   Caliper envelopes to send to host.
+
+        Returns:
+            list[str]: IDs of the delivered events
+        """
+        delivered_ids = []
+        for envelope in envelopes:
+            try:
+                self.post(envelope, len(envelope['data']))
+            except EventNotDispatched:
+                if not delivered_ids:
+                    raise
+                return delivered_ids
+            delivered_ids.extend(event.get('id') for event in envelope['data'])
+        return delivered_ids
+
+    def post(self, payload, count):
+        """
+        POST a bulk payload to the configured remote.
+
+        Arguments:
+            payload (list or dict) :   JSON payload
+            count (int)            :   number of events in the payload, for logging
+
+        Raises:
+            EventRejected: if the remote rejected the payload because of its content
+            EventNotDispatched: if the payload could not be sent for another reason
         """
         headers = self.HEADERS.copy()
         headers.update(self.get_auth_header())
@@ -74,12 +157,12 @@ class HttpClient:
         options = self.options.copy()
         options.update({
             'url': self.URL,
-            'json': events,
+            'json': payload,
             'headers': headers,
         })
         if self.AUTH_SCHEME == RouterConfiguration.AUTH_BASIC:
             options.update({'auth': (self.username, self.password)})
-        logger.debug('Sending caliper version of {} edx events to {}'.format(len(events), self.URL))
+        logger.debug('Sending caliper version of {} edx events to {}'.format(count, self.URL))
         response = requests.post(**options)   # pylint: disable=missing-timeout
 
         if not 200 <= response.status_code < 300:
@@ -88,11 +171,12 @@ class HttpClient:
                 'Response: '
                 '{}'.format(
                     response.request.method,
-                    len(events), self.URL,
+                    count, self.URL,
                     response.status_code,
                     response.text
                 ))
-            raise EventNotDispatched
+            exception_class = EventRejected if is_rejection(response.status_code) else EventNotDispatched
+            raise exception_class(retry_after=parse_retry_after(response.headers.get('Retry-After')))
 
     def send(self, event, event_name):
         """
@@ -128,4 +212,4 @@ class HttpClient:
                     response.status_code,
                     response.text
                 ))
-            raise EventNotDispatched
+            raise EventNotDispatched(retry_after=parse_retry_after(response.headers.get('Retry-After')))
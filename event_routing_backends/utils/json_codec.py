@@ -0,0 +1,139 @@
+"""
+JSON encoding and decoding for events moving through the pipeline.
+
+All places that parse or serialize events (tracking log parsing, the Redis batching and
+dead queues, the xAPI and Caliper processors and the bulk transform file writer) go
+through this module, so the implementation can be swapped in one place.
+
+`orjson` is used when it is installed, otherwise the standard library `json` module.
+The `EVENT_ROUTING_BACKEND_JSON_CODEC` setting can force one or the other.
+"""
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from eventtracking.backends.logger import DateTimeJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+CODEC_AUTO = 'auto'
+CODEC_JSON = 'json'
+CODEC_ORJSON = 'orjson'
+
+
+class StdlibJSONCodec:
+    """
+    JSON codec using the standard library.
+
+    Datetimes are serialized as UTC ISO 8601 strings, as eventtracking does.
+    """
+
+    name = CODEC_JSON
+
+    def dumps(self, obj):
+        """
+        Serialize `obj` to a JSON string.
+        """
+        return json.dumps(obj, cls=DateTimeJSONEncoder)
+
+    def dumps_bytes(self, obj):
+        """
+        Serialize `obj` to UTF-8 encoded JSON.
+        """
+        return self.dumps(obj).encode('utf-8')
+
+    def loads(self, data):
+        """
+        Deserialize a JSON string or UTF-8 encoded bytes.
+        """
+        return json.loads(data)
+
+
+class OrjsonJSONCodec(StdlibJSONCodec):
+    """
+    JSON codec using orjson.
+
+    Output is compact and not ASCII escaped, but otherwise decodes to the same values as
+    `StdlibJSONCodec`: datetimes are passed through to the same UTC ISO 8601 conversion, and
+    non-string dict keys are allowed. Anything orjson refuses to serialize (e.g. integers
+    larger than 64 bits) falls back to the standard library. Note that orjson decodes such
+    integers as floats.
+    """
+
+    name = CODEC_ORJSON
+
+    def __init__(self):
+        """
+        Initialize the codec.
+        """
+        self.options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        self.default = DateTimeJSONEncoder().default
+
+    def dumps(self, obj):
+        """
+        Serialize `obj` to a JSON string.
+        """
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def dumps_bytes(self, obj):
+        """
+        Serialize `obj` to UTF-8 encoded JSON.
+        """
+        try:
+            return orjson.dumps(obj, default=self.default, option=self.options)
+        except TypeError:
+            return StdlibJSONCodec.dumps(self, obj).encode('utf-8')
+
+    def loads(self, data):
+        """
+        Deserialize a JSON string or UTF-8 encoded bytes.
+        """
+        return orjson.loads(data)
+
+
+@lru_cache
+def _get_codec(name):
+    """
+    Return the codec instance for the given setting value.
+    """
+    if name == CODEC_ORJSON or (name == CODEC_AUTO and orjson):
+        if not orjson:
+            raise ImportError('EVENT_ROUTING_BACKEND_JSON_CODEC is "orjson" but orjson is not installed.')
+        return OrjsonJSONCodec()
+    if name in (CODEC_AUTO, CODEC_JSON):
+        return StdlibJSONCodec()
+    raise ValueError(f'Unknown EVENT_ROUTING_BACKEND_JSON_CODEC "{name}".')
+
+
+def get_json_codec():
+    """
+    Return the configured JSON codec.
+
+    Returns:
+        StdlibJSONCodec
+    """
+    return _get_codec(getattr(settings, 'EVENT_ROUTING_BACKEND_JSON_CODEC', CODEC_AUTO))
+
+
+def dumps(obj):
+    """
+    Serialize `obj` to a JSON string with the configured codec.
+    """
+    return get_json_codec().dumps(obj)
+
+
+def dumps_bytes(obj):
+    """
+    Serialize `obj` to UTF-8 encoded JSON with the configured codec.
+    """
+    return get_json_codec().dumps_bytes(obj)
+
+
+def loads(data):
+    """
+    Deserialize a JSON string or UTF-8 encoded bytes with the configured codec.
+    """
+    return get_json_codec().loads(data)
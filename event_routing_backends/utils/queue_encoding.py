@@ -0,0 +1,92 @@
+"""
+Encoding of the events stored in the Redis batching, dead and quarantine queues.
+
+Events are stored as JSON text by default. With `EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION`
+enabled they are stored as a one byte format version followed by the JSON text compressed
+with raw deflate and a preset dictionary of common tracking event fragments. JSON text can
+never start with a control character, so `decode` reads payloads of any format, and queues
+holding a mix of them drain correctly after the setting is changed either way.
+"""
+import json
+import zlib
+
+from django.conf import settings
+
+from event_routing_backends.utils import json_codec
+
+FORMAT_DEFLATE_V1 = 1
+
+# Shape of a typical tracking event as it reaches the events router. The dictionary below is
+# built from it and must never change once released: payloads compressed with it can only be
+# decompressed with the exact same bytes. Add a new format version for a new dictionary.
+_DICTIONARY_V1_SAMPLE = {
+    'name': 'edx.ui.lms.sequence.next_selected',
+    'event_type': 'edx.ui.lms.sequence.next_selected',
+    'event_source': 'browser',
+    'context': {
+        'accept_language': 'en-US,en;q=0.9',
+        'agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                 'Chrome/120.0.0.0 Safari/537.36',
+        'client_id': '',
+        'course_id': 'course-v1:',
+        'course_user_tags': {},
+        'enterprise_uuid': '',
+        'event_source': 'server',
+        'host': '',
+        'ip': '',
+        'module': {'display_name': '', 'usage_key': 'block-v1:+type@problem+block@'},
+        'org_id': '',
+        'page': 'https://',
+        'path': '/courses/course-v1:/xblock/block-v1:+type@sequential+block@/handler/xmodule_handler/',
+        'referer': 'https:///courses/course-v1:/courseware/',
+        'session': '',
+        'user_id': 0,
+        'username': '',
+    },
+    'data': {
+        'id': 'block-v1:+type@vertical+block@',
+        'problem_id': 'block-v1:+type@problem+block@',
+        'course_id': 'course-v1:',
+        'user_id': 0,
+        'answers': {}, 'attempts': 1, 'correct_map': {}, 'grade': 1, 'max_grade': 1, 'state': {},
+        'submission': {}, 'success': 'correct', 'current_time': 0, 'duration': 0, 'code': 'html5',
+        'mode': 'audit', 'event_transaction_id': '', 'event_transaction_type': 'edx.grades.problem.submitted',
+    },
+    'timestamp': '2024-01-01T00:00:00.000000+00:00',
+    'time': '2024-01-01T00:00:00.000000+00:00',
+}
+# Both the compact (orjson) and the standard library JSON spellings, the most common last.
+ZLIB_DICTIONARY_V1 = (
+    json.dumps(_DICTIONARY_V1_SAMPLE, separators=(',', ':')) + json.dumps(_DICTIONARY_V1_SAMPLE)
+).encode('utf-8')
+
+
+def encode(event):
+    """
+    Serialize an event for a Redis queue, compressed if `EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION` is enabled.
+
+    Returns:
+        str or bytes
+    """
+    if not getattr(settings, 'EVENT_ROUTING_BACKEND_QUEUE_COMPRESSION', False):
+        return json_codec.dumps(event)
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS, zdict=ZLIB_DICTIONARY_V1)
+    return bytes([FORMAT_DEFLATE_V1]) + compressor.compress(json_codec.dumps_bytes(event)) + compressor.flush()
+
+
+def decode(payload):
+    """
+    Deserialize an event read from a Redis queue, whatever format it was stored in.
+
+    Arguments:
+        payload (str or bytes): queued event
+
+    Returns:
+        dict
+    """
+    if isinstance(payload, str) or payload[0] >= 0x20 or payload[:1] in b'\t\n\r':
+        return json_codec.loads(payload)
+    if payload[0] == FORMAT_DEFLATE_V1:
+        decompressor = zlib.decompressobj(wbits=-zlib.MAX_WBITS, zdict=ZLIB_DICTIONARY_V1)
+        return json_codec.loads(decompressor.decompress(payload[1:]) + decompressor.flush())
+    raise ValueError(f'Unknown queued event format {payload[0]}.')
@@ -0,0 +1,125 @@
+"""
+Rate limiting of the requests and statements sent to each router.
+
+The limits are set per `RouterConfiguration` and shared by every worker through token buckets
+stored in Redis. Each send reserves its tokens up front, going into debt if the bucket doesn't
+hold enough, and then waits until the debt is paid back at the configured rate. Batches larger
+than a bucket are never starved this way, and concurrent senders queue up behind each other.
+"""
+import logging
+import time
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY = 'rate_limit'
+RATE_LIMIT_BUCKET_FORMAT = 'event_routing_rate_limit_{}_{}'
+
+# KEYS: one bucket per limit. ARGV: the current time, then the rate and the number of tokens to
+# take from each bucket. Buckets hold at most one second of tokens. Returns the seconds to wait.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local requested = tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or rate
+    local elapsed = math.max(0, now - (tonumber(bucket[2]) or now))
+    tokens = math.min(rate, tokens + elapsed * rate) - requested
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(math.max(0, -tokens) / rate) + 2)
+    if tokens < 0 then
+        wait = math.max(wait, -tokens / rate)
+    end
+end
+return tostring(wait)
+"""
+
+
+class RateLimiter:
+    """
+    Requests per second and statements per second limits of a router.
+    """
+
+    def __init__(self, route_url, requests_per_second=None, statements_per_second=None):
+        """
+        Initialize the limiter.
+
+        Arguments:
+            route_url (str):               URL of the router, identifies its buckets
+            requests_per_second (int):     maximum number of requests per second, None for no limit
+            statements_per_second (int):   maximum number of statements per second, None for no limit
+        """
+        self.route_url = route_url
+        self.requests_per_second = requests_per_second
+        self.statements_per_second = statements_per_second
+
+    @classmethod
+    def from_host_config(cls, host_config):
+        """
+        Return the limiter of the router a task sends to, or None if it has no limits.
+        """
+        rate_limit = host_config.get(RATE_LIMIT_KEY)
+        if not rate_limit:
+            return None
+        return cls(host_config.get('url', ''), **rate_limit)
+
+    def get_buckets(self, statements):
+        """
+        Return (key, rate, tokens) of each bucket a send of `statements` statements takes tokens from.
+        """
+        buckets = []
+        if self.requests_per_second:
+            buckets.append(('requests', self.requests_per_second, 1))
+        if self.statements_per_second:
+            buckets.append(('statements', self.statements_per_second, statements))
+        return [
+            (RATE_LIMIT_BUCKET_FORMAT.format(self.route_url, name), rate, tokens) for name, rate, tokens in buckets
+        ]
+
+    def acquire(self, statements=1):
+        """
+        Reserve the tokens for one request sending `statements` statements.
+
+        Returns:
+            float: seconds to wait before sending. 0 if Redis can't be reached.
+        """
+        buckets = self.get_buckets(statements)
+        if not buckets:
+            return 0.0
+        args = [time.time()]
+        for _, rate, tokens in buckets:
+            args.extend([rate, tokens])
+        try:
+            redis = get_redis_connection()
+            wait = redis.register_script(TOKEN_BUCKET_SCRIPT)(keys=[key for key, _, _ in buckets], args=args)
+        except RedisError:
+            logger.exception('Could not check the rate limit of {}'.format(self.route_url))
+            return 0.0
+        return float(wait)
+
+    def wait(self, statements=1):
+        """
+        Block until one request sending `statements` statements is allowed.
+        """
+        delay = self.acquire(statements)
+        if delay > 0:
+            logger.info('Rate limit of {} reached, waiting {:.2f} seconds'.format(self.route_url, delay))
+            time.sleep(delay)
+
+    def get_interval(self, statements):
+        """
+        Return the minimum time in seconds between two requests sending `statements` statements.
+        """
+        intervals = [tokens / rate for _, rate, tokens in self.get_buckets(statements)]
+        return max(intervals, default=0.0)
+
+
+def get_client_config(host_config):
+    """
+    Return the host configurations without the rate limits, as expected by the clients.
+    """
+    return {key: value for key, value in host_config.items() if key != RATE_LIMIT_KEY}
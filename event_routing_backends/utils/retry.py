@@ -0,0 +1,66 @@
+"""
+Retry delays and retry budgets of the dispatch tasks.
+
+Failed dispatches are retried with exponential backoff and full jitter, so that tasks failing
+together during an outage don't all come back at the same time. A `Retry-After` delay sent by
+the receiver is honored. `EVENT_ROUTING_BACKEND_RETRY_BUDGET` caps the retries per minute of
+each route across all workers, with a counter in Redis, so that retries can't crowd out new events.
+"""
+import logging
+import random
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+RETRY_BUDGET_KEY_FORMAT = 'event_routing_retry_budget_{}_{}'
+RETRY_BUDGET_WINDOW = 60
+
+
+def get_retry_countdown(retries, retry_after=None):
+    """
+    Return the delay in seconds before the next retry of a task.
+
+    Arguments:
+        retries (int):              number of times the task has been retried already
+        retry_after (float):        delay requested by the receiver, if any
+
+    Returns:
+        float
+    """
+    base = getattr(settings, 'EVENT_ROUTING_BACKEND_COUNTDOWN', 30)
+    cap = getattr(settings, 'EVENT_ROUTING_BACKEND_MAX_COUNTDOWN', 3600)
+    if retry_after is not None:
+        # Spread the retries over one base countdown after the requested delay
+        return min(cap, retry_after) + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * 2 ** retries))
+
+
+def consume_retry_budget(route_url):
+    """
+    Take one retry from the budget of a route for the current minute.
+
+    The budget is not enforced if Redis can't be reached.
+
+    Arguments:
+        route_url (str): URL the events are sent to
+
+    Returns:
+        bool: False if the budget of the route is exhausted and the task should not be retried
+    """
+    budget = getattr(settings, 'EVENT_ROUTING_BACKEND_RETRY_BUDGET', 0)
+    if not budget:
+        return True
+    key = RETRY_BUDGET_KEY_FORMAT.format(route_url, int(time.time() // RETRY_BUDGET_WINDOW))
+    try:
+        pipeline = get_redis_connection().pipeline()
+        pipeline.incr(key)
+        pipeline.expire(key, RETRY_BUDGET_WINDOW * 2)
+        used, _ = pipeline.execute()
+    except RedisError:
+        logger.exception('Could not check the retry budget of {}'.format(route_url))
+        return True
+    return used <= budget
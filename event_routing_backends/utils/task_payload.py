@@ -0,0 +1,88 @@
+"""
+Encoding of the events passed to `dispatch_bulk_events` Celery tasks.
+
+`EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD` selects what goes through the broker:
+
+* ``events``: the list of events, as is.
+* ``compressed``: the events as deflate compressed, base64 encoded JSON, which works with the
+  Celery JSON serializer.
+* ``claim_check``: compressed events larger than `EVENT_ROUTING_BACKEND_CLAIM_CHECK_MIN_SIZE`
+  bytes are stored in Redis for `EVENT_ROUTING_BACKEND_CLAIM_CHECK_TTL` seconds, and only their
+  key is passed. Smaller batches are passed compressed.
+
+Tasks read payloads of any mode, whatever the current value of the setting.
+"""
+import base64
+import logging
+import zlib
+from uuid import uuid4
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from event_routing_backends.utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_EVENTS = 'events'
+PAYLOAD_COMPRESSED = 'compressed'
+PAYLOAD_CLAIM_CHECK = 'claim_check'
+
+FORMAT_DEFLATE = 'deflate'
+FORMAT_CLAIM_CHECK = 'claim_check'
+CLAIM_CHECK_KEY_FORMAT = 'event_routing_bulk_payload_{}'
+
+
+def pack_events(events):
+    """
+    Return the payload passing `events` to a `dispatch_bulk_events` task.
+
+    Arguments:
+        events (list[dict]): list of processed event dictionaries
+
+    Returns:
+        list or dict
+    """
+    mode = getattr(settings, 'EVENT_ROUTING_BACKEND_BULK_TASK_PAYLOAD', PAYLOAD_EVENTS)
+    if mode == PAYLOAD_EVENTS:
+        return events
+    if mode not in (PAYLOAD_COMPRESSED, PAYLOAD_CLAIM_CHECK):
+        raise ValueError(f'Unknown bulk task payload mode {mode}.')
+
+    data = zlib.compress(json_codec.dumps_bytes(events))
+    if mode == PAYLOAD_CLAIM_CHECK and len(data) >= getattr(settings, 'EVENT_ROUTING_BACKEND_CLAIM_CHECK_MIN_SIZE', 0):
+        key = CLAIM_CHECK_KEY_FORMAT.format(uuid4().hex)
+        get_redis_connection().set(key, data, ex=getattr(settings, 'EVENT_ROUTING_BACKEND_CLAIM_CHECK_TTL', 86400))
+        return {'format': FORMAT_CLAIM_CHECK, 'key': key}
+    return {'format': FORMAT_DEFLATE, 'data': base64.b64encode(data).decode('ascii')}
+
+
+def unpack_events(payload):
+    """
+    Return the events passed to a `dispatch_bulk_events` task.
+
+    Arguments:
+        payload (list or dict): task payload returned by `pack_events`
+
+    Returns:
+        list[dict]: the events, empty if their claim check has expired
+    """
+    if isinstance(payload, list):
+        return payload
+    if payload['format'] == FORMAT_DEFLATE:
+        return json_codec.loads(zlib.decompress(base64.b64decode(payload['data'])))
+    if payload['format'] == FORMAT_CLAIM_CHECK:
+        data = get_redis_connection().get(payload['key'])
+        if data is None:
+            logger.error('Events of claim check {} have expired, they are lost'.format(payload['key']))
+            return []
+        return json_codec.loads(zlib.decompress(data))
+    raise ValueError('Unknown bulk task payload format {}.'.format(payload['format']))
+
+
+def release_events(payload):
+    """
+    Delete the stored events of a payload once its task is done with them.
+    """
+    if isinstance(payload, dict) and payload.get('format') == FORMAT_CLAIM_CHECK:
+        get_redis_connection().delete(payload['key'])
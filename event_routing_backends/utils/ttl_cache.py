@@ -0,0 +1,70 @@
+"""
+Bounded in-process cache with expiring entries.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Cache of up to `maxsize` entries that expire after their own time to live, if they have one.
+
+    Once full, the least recently used entries are evicted first. The cache is local to the
+    process and safe to use from several threads.
+    """
+
+    def __init__(self, maxsize):
+        """
+        Initialize the cache.
+
+        Arguments:
+            maxsize (int):  maximum number of entries
+        """
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value of a key, or default if it is missing or has expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        """
+        Store the value of a key for ttl seconds, or until it is evicted if ttl is None.
+        """
+        if self.maxsize <= 0 or (ttl is not None and ttl <= 0):
+            return
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove a key from the cache.
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all the entries.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,13 +1,15 @@
 """
 An LRS client for xAPI stores.
 """
+import json
 from json.decoder import JSONDecodeError
 from logging import getLogger
 
 from tincan.remote_lrs import RemoteLRS
 
 from event_routing_backends.models import RouterConfiguration
-from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched
+from event_routing_backends.processors.transformer_utils.exceptions import EventNotDispatched, EventRejected
+from event_routing_backends.utils.http_client import is_rejection, parse_retry_after
 
 logger = getLogger(__name__)
 
@@ -77,7 +79,11 @@ class LrsClient:
             statement_data (List[Statement]) : a list of transformed xAPI statements
 
         Returns:
-            requests.Response object
+            list[str]: IDs of the statements stored by the LRS, or None if it did not return them
+
+        Raises:
+            EventRejected: if the LRS rejected the statements, e.g. because one of them is malformed
+            EventNotDispatched: if the statements could not be sent for another reason
         """
         logger.debug('Sending {} xAPI statements to {}'.format(len(statement_data), self.URL))
         response = None
@@ -90,7 +96,7 @@ class LrsClient:
             )
 
         if not response:
-            return
+            return None
 
         if not response.success:
             if response.response.code == 409:
@@ -100,7 +106,15 @@ class LrsClient:
                 logger.warning('{} request failed for sending xAPI statement of edx events to {}. '
                                'Response code: {}. Response: {}'.format(response.request.method, self.URL,
                                                                         response.response.code, response.data))
-                raise EventNotDispatched
+                exception_class = EventRejected if is_rejection(response.response.code) else EventNotDispatched
+                raise exception_class(retry_after=parse_retry_after(response.response.getheader('Retry-After')))
+            return None
+
+        try:
+            statement_ids = json.loads(response.data)
+        except (TypeError, ValueError):
+            return None
+        return statement_ids if isinstance(statement_ids, list) else None
 
     def send(self, statement_data, event_name):
         """
@@ -126,4 +140,4 @@ class LrsClient:
                 logger.warning('{} request failed for sending xAPI statement of edx event "{}" to {}. '
                                'Response code: {}. Response: {}'.format(response.request.method, event_name, self.URL,
                                                                         response.response.code, response.data))
-                raise EventNotDispatched
+                raise EventNotDispatched(retry_after=parse_retry_after(response.response.getheader('Retry-After')))
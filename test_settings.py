@@ -49,6 +49,8 @@ EVENT_TRACKING_BACKENDS = {}
 XAPI_AGENT_IFI_TYPE = 'external_id'
 EVENT_ROUTING_BACKEND_BATCHING_ENABLED = False
 EVENT_ROUTING_BACKEND_BATCH_INTERVAL = 100
+EVENT_ROUTING_BACKEND_BATCH_QUEUE = 'list'
+EVENT_ROUTING_BACKEND_DEAD_QUEUE_MAX_SIZE = 0
 EVENT_TRACKING_ENABLED = True
 EVENT_TRACKING_BACKENDS = {
     "event_transformer": {